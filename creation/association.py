@@ -0,0 +1,235 @@
+"""association.py
+
+Association measures between basic types, calculated for all pairs of basic
+types at once with NumPy.
+
+Usage:
+
+   $ python3 association.py --class-pairs [<corelex version>] [options]
+   $ python3 association.py --semcor-pairs [options]
+
+   options:
+      --measure M         pmi, npmi, llr or dice (default llr)
+      --min-count N       leave out pairs that co-occur less than N times
+                          (default 5)
+      --min-frequency N   leave out pairs with a basic type that occurs less
+                          than N times (default 5)
+
+The first reads the class pair counts file created by corelex.py, for example
+data/corelex-2.0-class_pair_counts-nouns-all.tab, where each line has the number
+of sense pairs of the same lemma for a pair of basic types. The second reads
+data/corelex-3.1-semcor_pairs-nouns.tab, created by semcor_cl.py, with a line
+for each pair of senses of the same lemma that occur in the same SemCor document.
+Both write a table with the measures for each pair of basic types, sorted on the
+chosen measure:
+
+   data/corelex-2.0-class_pair_association-nouns.tab
+   data/corelex-3.1-semcor_pairs_association-nouns.tab
+
+The second also writes data/corelex-3.1-semcor_pairs-nouns.f2.sunr, which has
+the number of pairs for each combination of basic types, sorted on frequency.
+This is the file that semcor_cl.Parallel reads, it used to be created with
+"cut -f2 | sort | uniq -c | sort -nr".
+
+The co-occurrence counts are taken as a list of events, for example sense pairs,
+where each event has two basic types. Basic type x occurs in f(x) of the N
+events and x and y occur together in c(x, y) events, which gives the usual two
+by two contingency table for each pair. The measures are:
+
+   pmi    log2(c(x, y) * N / (f(x) * f(y)))
+   npmi   pmi / -log2(c(x, y) / N), between -1 and 1
+   llr    log-likelihood ratio G2 of the contingency table, negative if the
+          pair occurs less often than expected
+   dice   2 * c(x, y) / (f(x) + f(y))
+
+Events with two senses of the same basic type count for N and f(x), but pairs of
+a basic type with itself are not included in the tables.
+
+"""
+
+import sys
+import itertools
+
+from utils import open_file
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+MEASURES = ('pmi', 'npmi', 'llr', 'dice')
+
+
+class AssociationTable(object):
+
+    """Association measures for all pairs of items, calculated as arrays with
+    one element for each pair.
+
+    Instance variables:
+
+    pairs
+        Sorted list of (x, y) pairs with x < y.
+
+    counts
+        Array with the co-occurrence count of each pair.
+
+    frequencies1, frequencies2
+        Arrays with the frequencies of the first and second item of each pair.
+
+    total
+        The number of events.
+
+    pmi, npmi, llr, dice
+        Arrays with the measures for each pair.
+
+    """
+
+    def __init__(self, pair_counts, item_counts, total):
+        """Takes a dictionary { (x, y) ==> count } with x < y, a dictionary with
+        the frequency of each item and the total number of events."""
+        if numpy is None:
+            raise ImportError("AssociationTable needs NumPy")
+        self.pairs = sorted(pair_counts)
+        self.total = total
+        self.counts = numpy.array([pair_counts[pair] for pair in self.pairs], dtype=float)
+        self.frequencies1 = numpy.array([item_counts[x] for x, y in self.pairs], dtype=float)
+        self.frequencies2 = numpy.array([item_counts[y] for x, y in self.pairs], dtype=float)
+        self._calculate()
+
+    def __str__(self):
+        return "<AssociationTable pairs=%d events=%d>" % (len(self.pairs), self.total)
+
+    def _calculate(self):
+        n = float(self.total)
+        c, f1, f2 = self.counts, self.frequencies1, self.frequencies2
+        with numpy.errstate(divide='ignore', invalid='ignore'):
+            self.pmi = numpy.log2(c * n / (f1 * f2))
+            self.npmi = numpy.where(c < n, self.pmi / -numpy.log2(c / n), 1.0)
+            self.dice = 2 * c / (f1 + f2)
+            # observed and expected counts of the four cells of the contingency
+            # table, cells with an observed count of zero add nothing to G2
+            observed = (c, f1 - c, f2 - c, n - f1 - f2 + c)
+            expected = (f1 * f2 / n, f1 * (n - f2) / n, (n - f1) * f2 / n,
+                        (n - f1) * (n - f2) / n)
+            g2 = 2 * sum([numpy.where(o > 0, o * numpy.log(o / e), 0.0)
+                          for o, e in zip(observed, expected)])
+        self.llr = numpy.where(c < expected[0], -g2, g2)
+
+    def rows(self, measure='llr', min_count=1, min_frequency=1):
+        """Return a list of (x, y, count, f(x), f(y), pmi, npmi, llr, dice)
+        tuples, sorted on the measure with the highest value first, for the
+        pairs that occur at least min_count times and whose items occur at
+        least min_frequency times."""
+        if measure not in MEASURES:
+            raise ValueError("unknown measure: %s" % measure)
+        selected = (self.counts >= min_count) \
+            & (self.frequencies1 >= min_frequency) & (self.frequencies2 >= min_frequency)
+        positions = numpy.flatnonzero(selected)
+        # lexsort sorts on the last key first, ties keep the order of the pairs
+        values = getattr(self, measure)[positions]
+        positions = positions[numpy.lexsort((positions, -values))]
+        return [self.pairs[i] + (int(self.counts[i]), int(self.frequencies1[i]),
+                                 int(self.frequencies2[i]), float(self.pmi[i]),
+                                 float(self.npmi[i]), float(self.llr[i]), float(self.dice[i]))
+                for i in positions]
+
+    def write(self, fname, measure='llr', min_count=1, min_frequency=1):
+        rows = self.rows(measure, min_count, min_frequency)
+        print("Writing %d pairs to %s" % (len(rows), fname))
+        with open_file(fname, 'w') as fh:
+            fh.write("# x\ty\tcount\tf(x)\tf(y)\tpmi\tnpmi\tllr\tdice\n")
+            for row in rows:
+                fh.write("%s\t%s\t%d\t%d\t%d\t%.4f\t%.4f\t%.2f\t%.4f\n" % row)
+
+
+def events_table(events):
+    """Create an AssociationTable from an iterable of (x, y, count) triples, where
+    each triple stands for count events with items x and y."""
+    pair_counts = {}
+    item_counts = {}
+    total = 0
+    for x, y, count in events:
+        total += count
+        item_counts[x] = item_counts.get(x, 0) + count
+        if x != y:
+            item_counts[y] = item_counts.get(y, 0) + count
+            pair = (x, y) if x < y else (y, x)
+            pair_counts[pair] = pair_counts.get(pair, 0) + count
+    return AssociationTable(pair_counts, item_counts, total)
+
+
+def read_class_pair_counts(fname):
+    """Generate (basic type, basic type, count) triples from a class pair counts
+    file written by CoreLexTypeGenerator."""
+    with open_file(fname) as fh:
+        for line in fh:
+            count, class_pair = line.rstrip('\n').split('\t')
+            bt1, bt2 = class_pair.split(' * ')
+            yield bt1, bt2, int(count)
+
+
+def semcor_events(dn_spair2df, wordnet):
+    """Generate (basic type, basic type, count) triples from the dn_spair2df
+    dictionary of a SemCorF instance, where the count is the number of documents
+    with both senses. Synsets with more than one basic type give an event for
+    each combination of basic types."""
+    for (lemma, sid1, sid2), df in dn_spair2df.items():
+        types1 = sorted(wordnet.get_noun_synset(sid1).basic_types)
+        types2 = sorted(wordnet.get_noun_synset(sid2).basic_types)
+        for bt1, bt2 in itertools.product(types1, types2):
+            yield bt1, bt2, df
+
+
+def read_semcor_pairs(fname, frequencies=None):
+    """Generate (basic type, basic type, 1) triples from a semcor pairs file
+    written by SemCorF, one for each line and each combination of basic types.
+    If a dictionary is given the number of lines for each value of the second
+    field is added to it."""
+    with open_file(fname) as fh:
+        for line in fh:
+            joined_basic_types = line.split('\t')[1]
+            if frequencies is not None:
+                frequencies[joined_basic_types] = frequencies.get(joined_basic_types, 0) + 1
+            types1, types2 = joined_basic_types.split(' ')
+            for bt1, bt2 in itertools.product(types1.split('|'), types2.split('|')):
+                yield bt1, bt2, 1
+
+
+def write_frequencies(frequencies, fname):
+    """Write the values with their frequencies, highest frequency first, as
+    "sort | uniq -c | sort -nr" does but with a tab after the frequency, which
+    is what semcor_cl.Parallel splits the lines on."""
+    print("Writing", fname)
+    with open_file(fname, 'w') as fh:
+        for value, count in sorted(frequencies.items(), key=lambda item: (-item[1], item[0])):
+            fh.write("%d\t%s\n" % (count, value))
+
+
+def _option(name, default):
+    return sys.argv[sys.argv.index(name) + 1] if name in sys.argv else default
+
+
+if __name__ == '__main__':
+
+    measure = _option('--measure', 'llr')
+    min_count = int(_option('--min-count', 5))
+    min_frequency = int(_option('--min-frequency', 5))
+
+    if len(sys.argv) > 1 and sys.argv[1] == '--class-pairs':
+        version = sys.argv[2] if len(sys.argv) > 2 and not sys.argv[2].startswith('--') \
+            else open("../VERSION").read().strip()
+        table = events_table(read_class_pair_counts(
+            "data/corelex-%s-class_pair_counts-nouns-all.tab" % version))
+        table.write("data/corelex-%s-class_pair_association-nouns.tab" % version,
+                    measure, min_count, min_frequency)
+
+    elif len(sys.argv) > 1 and sys.argv[1] == '--semcor-pairs':
+        frequencies = {}
+        table = events_table(read_semcor_pairs("data/corelex-3.1-semcor_pairs-nouns.tab", frequencies))
+        table.write("data/corelex-3.1-semcor_pairs_association-nouns.tab",
+                    measure, min_count, min_frequency)
+        write_frequencies(frequencies, "data/corelex-3.1-semcor_pairs-nouns.f2.sunr")
+
+    else:
+        exit(__doc__)
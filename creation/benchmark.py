@@ -0,0 +1,218 @@
+"""benchmark.py
+
+Scaling benchmark for creating CoreLex, on synthetic WordNets of several sizes
+(see synthetic.py), so it can be run without the WordNet download.
+
+Usage:
+
+   $ python3 benchmark.py [--scales S,...] [--output FILE] [--seed N]
+                          [--gloss-words G] [--keep DIR]
+
+   S,...   sizes relative to WordNet 3.1, separated by commas (default 1,3,10)
+   FILE    JSON file the results are written to (default data/benchmark.json)
+   N       seed for the synthetic WordNets (default 0)
+   G       average number of words in a gloss, by default this is 10 or, for
+           scales where glosses of that length do not fit, the largest length
+           that does (see below)
+   DIR     directory where the synthetic WordNets and the files created by
+           CoreLex are kept, by default they are written to a temporary
+           directory which is removed afterwards
+
+For each scale a synthetic WordNet is created and the following steps are timed,
+all in a new Python process so the scales do not influence each other:
+
+   synthetic                creating and writing the synthetic WordNet
+   wordnet_init             WordNet('3.1'), which loads the index, data and
+                            sense files
+   propagation              WordNet.add_basic_types(), which adds the basic
+                            types to all noun and verb synsets
+   cltype_generator         CoreLexTypeGenerator for nouns and verbs
+   cltype_generator_counts  the same with counts_only=True
+   basic_type_relations     create_basic_type_relations() for nouns, which
+                            collects, tests and writes the relations between
+                            basic types
+
+The synthetic WordNet has its own basic type inventory, which replaces the one
+in cltypes in the process that runs the steps. The JSON file has the times in
+seconds, the sizes of the synthetic WordNet and the peak memory use for each
+scale, together with the Python version and the platform. A table with the
+times is printed at the end, for example:
+
+   $ python3 benchmark.py --scales 0.1,1
+   $ python3 benchmark.py --scales 10 --output data/benchmark10.json
+
+Synset identifiers are byte offsets with eight digits, which limits the data
+files to 10**8 bytes. This allows a scale of about 7 with the default gloss
+length, so by default larger scales get shorter glosses, and a scale of about 11
+with one word per gloss (see synthetic.max_gloss_words()). Larger scales, like
+100, cannot be represented in the WordNet format and are not supported. Scales
+that fail get the error and the end of the output of the process in the JSON
+file instead of the times. Memory use grows linearly, a scale of 1 needs about
+600 MB.
+
+"""
+
+import os
+import sys
+import ast
+import json
+import time
+import shutil
+import platform
+import resource
+import tempfile
+import subprocess
+
+from synthetic import max_gloss_words
+
+
+# the steps that are timed, in the order they are run
+STEPS = ('synthetic', 'wordnet_init', 'propagation', 'cltype_generator',
+         'cltype_generator_counts', 'basic_type_relations')
+
+DEFAULT_SCALES = (1, 3, 10)
+
+
+def run_scale(scale, directory, seed=0, gloss_words=10):
+    """Create a synthetic WordNet in the directory and run and time all steps.
+    Returns a dictionary with the results. This changes the working directory
+    and the basic type inventory in cltypes, so it should run in its own
+    process, see benchmark()."""
+    # importing corelex reads ../VERSION, so this happens before changing the
+    # working directory
+    import cltypes
+    import wordnet
+    import corelex
+    from synthetic import SyntheticWordNet
+    timings = {}
+    start = time.perf_counter()
+    swn = SyntheticWordNet(scale=scale, seed=seed, gloss_words=gloss_words)
+    swn.write(directory)
+    timings['synthetic'] = time.perf_counter() - start
+    wordnet.WORDNET_DIR = os.path.join(directory, 'WordNet-%s/')
+    cltypes.BASIC_TYPES_3_1 = swn.basic_types()
+    os.makedirs(os.path.join(directory, 'data'), exist_ok=True)
+    os.chdir(directory)
+
+    start = time.perf_counter()
+    wn = wordnet.WordNet('3.1')
+    timings['wordnet_init'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    wn.add_basic_types()
+    timings['propagation'] = time.perf_counter() - start
+
+    for step, counts_only in (('cltype_generator', False), ('cltype_generator_counts', True)):
+        start = time.perf_counter()
+        for category in (wordnet.NOUN, wordnet.VERB):
+            corelex.CoreLexTypeGenerator(wn, category, counts_only=counts_only, output_dir='data')
+        timings[step] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    corelex.create_basic_type_relations(wn, '3.1', 'n')
+    timings['basic_type_relations'] = time.perf_counter() - start
+
+    noun_bytes, verb_bytes = swn.size()
+    return {'scale': scale,
+            'gloss_words': gloss_words,
+            'noun_synsets': len(swn.nouns.words),
+            'verb_synsets': len(swn.verbs.words),
+            'noun_lemmas': len(wn.lemma_index()[wordnet.NOUN]),
+            'verb_lemmas': len(wn.lemma_index()[wordnet.VERB]),
+            'data_bytes': noun_bytes + verb_bytes,
+            'seconds': timings,
+            'max_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0}
+
+
+def benchmark(scales, seed=0, gloss_words=None, keep=None):
+    """Run all steps for each scale, each in a new process, and return the
+    results. The process writes its results to a JSON file and its output to a
+    log file, both in the directory of the scale. Without gloss_words each scale
+    gets the longest glosses that fit, see synthetic.max_gloss_words(). Raises
+    ValueError if one of the scales is too large for the WordNet format."""
+    for scale in scales:
+        if max_gloss_words(scale) is None:
+            raise ValueError("scale %s is too large for eight digit synset identifiers" % scale)
+    lengths = {scale: max_gloss_words(scale) if gloss_words is None else gloss_words
+               for scale in scales}
+    root = keep if keep is not None else tempfile.mkdtemp()
+    results = []
+    try:
+        for scale in scales:
+            directory = os.path.abspath(os.path.join(root, 'scale-%s' % scale))
+            os.makedirs(directory, exist_ok=True)
+            results_file = os.path.join(directory, 'results.json')
+            log_file = os.path.join(directory, 'log.txt')
+            print("Running scale %s in %s" % (scale, directory))
+            command = [sys.executable, os.path.abspath(__file__), '--run', str(scale), directory,
+                       '--seed', str(seed), '--gloss-words', str(lengths[scale])]
+            with open(log_file, 'w') as log:
+                process = subprocess.run(command, stdout=log, stderr=subprocess.STDOUT)
+            if process.returncode == 0:
+                with open(results_file) as fh:
+                    results.append(json.load(fh))
+            else:
+                with open(log_file) as fh:
+                    tail = fh.read()[-2000:]
+                results.append({'scale': scale, 'gloss_words': lengths[scale],
+                                'error': "exit status %d" % process.returncode,
+                                'output': tail})
+    finally:
+        if keep is None:
+            shutil.rmtree(root)
+    return results
+
+
+def write_results(results, fname, seed, gloss_words):
+    print("Writing", fname)
+    with open(fname, 'w') as fh:
+        json.dump({'created': time.strftime('%Y-%m-%d %H:%M:%S'),
+                   'python': platform.python_version(),
+                   'platform': platform.platform(),
+                   'cpus': os.cpu_count(),
+                   'seed': seed,
+                   'gloss_words': gloss_words,
+                   'results': results}, fh, indent=2)
+
+
+def print_results(results):
+    print("\n%-8s %10s %10s" % ('scale', 'synsets', 'memory')
+          + ''.join([" %12s" % step[:12] for step in STEPS]))
+    for result in results:
+        if 'error' in result:
+            print("%-8s %s" % (result['scale'], result['error']))
+            continue
+        print("%-8s %10d %7d MB" % (result['scale'], result['noun_synsets'] + result['verb_synsets'],
+                                   result['max_rss_mb'])
+              + ''.join([" %11.2fs" % result['seconds'][step] for step in STEPS]))
+
+
+def _option(name, default):
+    return sys.argv[sys.argv.index(name) + 1] if name in sys.argv else default
+
+
+if __name__ == '__main__':
+
+    seed = int(_option('--seed', 0))
+    gloss_words = _option('--gloss-words', None)
+    gloss_words = None if gloss_words is None else float(gloss_words)
+
+    if len(sys.argv) > 3 and sys.argv[1] == '--run':
+        directory = sys.argv[3]
+        result = run_scale(ast.literal_eval(sys.argv[2]), directory, seed,
+                           10 if gloss_words is None else gloss_words)
+        with open(os.path.join(directory, 'results.json'), 'w') as fh:
+            json.dump(result, fh, indent=2)
+
+    elif len(sys.argv) > 1 and sys.argv[1] in ('-h', '--help'):
+        exit(__doc__)
+
+    else:
+        scales = [ast.literal_eval(s) for s in _option('--scales', '').split(',') if s] \
+            or list(DEFAULT_SCALES)
+        try:
+            results = benchmark(scales, seed, gloss_words, _option('--keep', None))
+        except ValueError as e:
+            exit("%s, see --help" % e)
+        write_results(results, _option('--output', 'data/benchmark.json'), seed, gloss_words)
+        print_results(results)
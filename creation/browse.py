@@ -45,6 +45,7 @@ class UserLoop(object):
     WORD_MODE = 'WORD_MODE'
     SYNSET_MODE = 'SYNSET_MODE'
     STATS_MODE = 'STATS_MODE'
+    GLOSS_MODE = 'GLOSS_MODE'
 
     PROMPT = "\n%s " % bold('>>')
     
@@ -55,6 +56,8 @@ class UserLoop(object):
         self.synset_idx = wordnet.synset_index()
         self.mode = UserLoop.MAIN_MODE
         self.search_term = None
+        self.gloss_query = None
+        self.back_mode = UserLoop.WORD_MODE
         self.mapping = []
         self.mapping_idx = {}
         self.choices = []
@@ -74,14 +77,18 @@ class UserLoop(object):
                 self._synset_mode()
             elif self.mode == UserLoop.STATS_MODE:
                 self._stats_mode()
+            elif self.mode == UserLoop.GLOSS_MODE:
+                self._gloss_mode()
     
     def _main_mode(self):
-        self._action_print_choices(search(self.category), stats(), end())
+        self._action_print_choices(search(self.category), search_glosses(), stats(), end())
         choice = input(UserLoop.PROMPT)
         if choice == 'q':
             exit()
         elif choice.startswith('s '):
             self._action_search(choice)
+        elif choice.startswith('g '):
+            self._action_gloss_search(choice)
         elif choice == 'a':
             self.mode = UserLoop.STATS_MODE
         else:
@@ -100,16 +107,40 @@ class UserLoop(object):
         elif choice.isdigit() and int(choice) in [m[0] for m in self.mapping]:
             # use the choice to save the synset before changing the mode
             self.synset = self.mapping_idx[int(choice)]
+            self.back_mode = UserLoop.WORD_MODE
+            self.mode = UserLoop.SYNSET_MODE
+        else:
+            print("Not a valid choice")
+
+    def _gloss_mode(self):
+        self._action_print_gloss_results()
+        self._action_print_choices(search(self.category), search_glosses(), home(), end())
+        choice = input(UserLoop.PROMPT)
+        if choice == 'q':
+            exit()
+        if choice == 'h':
+            self.mode = UserLoop.MAIN_MODE
+        elif choice.startswith('s '):
+            self._action_search(choice)
+        elif choice.startswith('g '):
+            self._action_gloss_search(choice)
+        elif choice.isdigit() and int(choice) in self.mapping_idx:
+            self.synset = self.mapping_idx[int(choice)]
+            self.back_mode = UserLoop.GLOSS_MODE
             self.mode = UserLoop.SYNSET_MODE
         else:
             print("Not a valid choice")
 
     def _synset_mode(self):
         self.synset.pp()
-        self._action_print_choices(back(), search(self.category), home(), end())
+        self._action_print_choices(back(), tree(), search(self.category), home(), end())
         choice = input(UserLoop.PROMPT)
         if choice == 'b':
-            self.mode = UserLoop.WORD_MODE
+            self.mode = self.back_mode
+        elif choice == 't':
+            print()
+            self.synset.pp_tree(4)
+            input("\nHit enter to continue ")
         elif choice.startswith('s '):
             self._action_search(choice)
         elif choice == 'h':
@@ -130,6 +161,35 @@ class UserLoop(object):
             self.mode = UserLoop.WORD_MODE
         else:
             print("Not in WordNet")
+            self._action_print_suggestions(search_term)
+
+    def _action_print_suggestions(self, search_term):
+        similar = self.wn.get_similar_lemmas(search_term, self.category, limit=10)
+        if similar:
+            print("\nDid you mean: %s" % ' '.join([lemma for lemma, dist in similar]))
+
+    def _action_gloss_search(self, choice):
+        """Search the glosses, a term like type:art restricts the search to synsets
+        with that basic type."""
+        words = choice[2:].split()
+        basic_types = [w[5:] for w in words if w.startswith('type:')]
+        query = ' '.join([w for w in words if not w.startswith('type:')])
+        basic_type = basic_types[0] if basic_types else None
+        results = self.wn.rank_glosses(query, self.category, basic_type=basic_type)
+        if results:
+            self.gloss_query = choice[2:].strip()
+            self.gloss_results = [synset for synset, score in results]
+            self.mode = UserLoop.GLOSS_MODE
+        else:
+            print("No glosses found")
+
+    def _action_print_gloss_results(self):
+        self.mapping = list(enumerate(self.gloss_results))
+        self.mapping_idx = dict(self.mapping)
+        print("%s\n" % bold(self.gloss_query))
+        for count, synset in self.mapping:
+            print("[%d]  %s" % (count, synset.as_formatted_string()))
+            print("      %s" % synset.gloss)
 
     def _action_print_synsets(self):
         word = self.lemma_idx[self.category].get(self.search_term)
@@ -171,9 +231,15 @@ def end():
 def back():
     return ('b', 'back to the word')
 
+def tree():
+    return ('t', 'show the hyponym tree (3 levels down)')
+
 def search(category):
     return ('s ' + category, 'search for the word')
 
+def search_glosses():
+    return ('g words', 'search glosses (add type:<basic_type> to restrict)')
+
 
 if __name__ == '__main__':
 
@@ -7,6 +7,7 @@ Contains a class to manage basic types. You can
 - replace a type and build a new one from all hypernyms of the synsets of the type
 - replace a type and build a new one from all hyponyms of the synsets of the type
 - save new types to a file
+- check the types against WordNet
 
 
 Load with the default WordNet version and print a list of basic types
@@ -31,6 +32,18 @@ And the replace that one with all daughters of that supertype
 
     >>> btm.replace_type_with_subtypes('spc.sup')
 
+Add a type using synset names instead of synset identifiers
+
+    >>> btm.add_type_by_names('dor', ['door.06.0', 'doorway.06.0'])
+
+Check whether all synset names in the types point to the right synsets, this
+returns a list of problems with for each problem the type, the synset
+identifier, the name and the synset identifier that the name resolves to (None
+if the name does not exist, which is the case for the misspelled names of the
+lme type in cltypes.BASIC_TYPES_3_1)
+
+    >>> btm.check_types()
+
 Write new basic types to disk
 
     >>> btm.write('new_basic_types.py')
@@ -72,6 +85,25 @@ class BasicTypeManager(object):
     def add_type(self, typename, synsets):
         self.types[typename] = synsets
 
+    def add_type_by_names(self, typename, names):
+        """Add a type from a list of synset names like door.06.0. Names that do not
+        resolve to a synset are reported and skipped."""
+        synsets = []
+        for name, synset_id in sorted(self.wn.resolve_names(names).items()):
+            if synset_id is None:
+                print("WARNING: no synset for %s" % name)
+                continue
+            synset = self.wn.get_synset('noun', synset_id)
+            entry = (synset.id, synset.words_as_string())
+            if entry not in synsets:
+                synsets.append(entry)
+        self.add_type(typename, synsets)
+
+    def check_types(self):
+        """Return a list of all synset names in the types that do not refer to the
+        synset they are listed with."""
+        return self.wn.check_basic_types(self.types)
+
     def replace_type_with_supertype(self, typename):
         new_typename = typename + '.sup'
         new_synsets = []
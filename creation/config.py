@@ -0,0 +1,12 @@
+
+# Directory template that encodes where the two Wordnet versions are
+# installed. See wordnet.py for some more details.
+import os
+WORDNET_DIR = os.environ.get('WNROOT', '/tmp/wn') + '/WordNet-%s/'
+
+# Directory with the Semcor corpus
+SEMCOR_DIR = '/DATA/resources/corpora/semcor/semcor3.0'
+
+# Directory where the semcor database will be created, this directory has to
+# exist
+CLDATA_DIR = 'data/semcor'
@@ -1,6 +1,8 @@
 
 # Directory template that encodes where the two Wordnet versions are
-# installed. See wordnet.py for some more details.
+# installed. This can also be the template of an archive, for example
+# '/DATA/resources/lexicons/wordnet/WordNet-%s.tar.gz'. See wordnet.py for some
+# more details.
 WORDNET_DIR = '/DATA/resources/lexicons/wordnet/WordNet-%s/'
 
 # Directory with the Semcor corpus
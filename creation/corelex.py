@@ -4,9 +4,12 @@ Script to create CoreLex from WordNet.
 
 Usage:
 
-   $ python3 corelex.py --create-cltype-files <version>
-   $ python3 corelex.py --btyperels <version>
-   $ python3 corelex.py --sql <version>
+   $ python3 corelex.py --create-cltype-files <version> [--counts-only] [--workers N] [--memory-budget MB] [--sample K] [--compress EXT]
+   $ python3 corelex.py --check-workers <version> N
+   $ python3 corelex.py --update-cltype-files <version> [<basic types file>]
+   $ python3 corelex.py --btyperels <version> [--no-text] [--exact-tests] [--workers N] [--compress EXT]
+   $ python3 corelex.py --sql <version> [--tsv] [--batch-size N]
+   $ python3 corelex.py --lookup <version> <lemma> ...
 
    where <version> is WordNet version 1.5 or 3.1
 
@@ -23,8 +26,62 @@ This loads WordNet 3.1 using the wordnet.py module and then creates six files:
    data/corelex-2.0-cltypes-nouns.txt
    data/corelex-2.0-cltypes-verbs.tab
    data/corelex-2.0-cltypes-verbs.txt
-   data/corelex-2.0-nouns.tab
-   data/corelex-2.0-verbs.tab
+   data/corelex-2.0-lemmas-nouns.tab
+   data/corelex-2.0-lemmas-verbs.tab
+
+With the --counts-only option the class_pair, lemma_pair and glosses files
+(see the CoreLexTypeGenerator class) are replaced by files with just the counts
+of the class pairs, which is much faster for lemmas with many senses.
+
+With the --workers option the lemmas are split into shards that are processed
+by N worker processes, the results of the shards are combined in order so the
+files are exactly the same as when using one process. To check this:
+
+   $ python3 corelex.py --check-workers 3.1 4
+
+This creates all files in two temporary directories, once with one process and
+once with four workers, and compares them byte for byte. The same check runs
+on a small synthetic WordNet, without the WordNet download, in test_workers.py.
+
+The sense pairs for the class_pair, lemma_pair and glosses files are normally
+kept in memory. With the --memory-budget option they are instead handed to an
+external merge sort (see extsort.py) that keeps at most the given number of
+megabytes in memory and writes sorted runs to temporary files. The files created
+are the same as without the budget:
+
+   $ python3 corelex.py --create-cltype-files 3.1 --memory-budget 16
+
+With the --sample option the glosses files, which have a line with two glosses
+for each sense pair, are replaced by files with at most K randomly selected
+sense pairs for each class pair, the first field on each line still has the
+number of all sense pairs of the class pair:
+
+   $ python3 corelex.py --create-cltype-files 3.1 --sample 10
+
+This creates data/corelex-2.0-class_pair_glosses-nouns-sample10.tab and the
+same file for verbs instead of the glosses files with all sense pairs.
+
+With the --compress option the class_pair, lemma_pair, glosses and class pair
+counts files are compressed with gzip, xz or zstd, depending on EXT, which is gz,
+xz or zst. The extension is added to the file names, for example
+data/corelex-2.0-class_pair-nouns.tab.gz. The compressing is done by pigz, xz or
+zstd with several threads when they are installed and otherwise by the Python
+modules. The lemmas files stay uncompressed since CoreLexLookup maps them into
+memory. Compressed files are read wherever the uncompressed files are read, and
+the updater writes them back with the same compression (see utils.open_file).
+
+The noun files also include data/corelex-2.0-basic_types-nouns.tab with the basic
+type inventory that was used. After changing the inventory the noun files can be
+updated instead of created again:
+
+   $ python3 corelex.py --update-cltype-files 3.1
+   $ python3 corelex.py --update-cltype-files 3.1 new_basic_types.py
+
+This compares the inventory in the basic_types file with the one in cltypes or
+with the one in a file written by BasicTypeManager.write() and then only looks
+again at the lemmas that have a synset in the hyponym trees of the basic types
+that changed. The files are updated in place and the lemmas that changed class
+are printed.
 
 Note that the WordNet version is not the same as the CoreLex version. In this
 case we used WordNet 3.1 and we created CoreLex 2.0, as specified by the
@@ -38,9 +95,17 @@ files contain the same data but are easier on the eye. Thelemma files have the
 reverse mappings, from lemmas to cltypes.
 
 
+==> Looking up lemmas
+
+   $ python3 corelex.py --lookup 3.1 door chicken
+
+This prints the polysemous type and the CoreLex type of the nouns, using the
+CoreLexLookup class, which searches the lemmas file without loading it.
+
+
 ==> Creating basic types relations from WordNet
 
-   $ python3 corelex.py --btyperels <version>
+   $ python3 corelex.py --btyperels <version> [--no-text] [--exact-tests] [--workers N] [--compress EXT]
 
 This reads the specified WordNet version and creates two files and a directory:
 
@@ -48,6 +113,11 @@ This reads the specified WordNet version and creates two files and a directory:
    data/corelex-<version>-nouns-relations.txt
    directory data/corelex-<version>-nouns-basic-type-relations/
 
+If NumPy is installed the relations and the counts between basic types are also
+saved in data/corelex-<version>-nouns-relations.npz, which can be loaded with
+signatures.load_relation_cube(), see signatures.py. When this file exists it is
+used instead of the two text files by BasicTypeRelations.
+
 The first file contains counts of the relations expressed between basic types
 and the second contains all relations with both the basic types and the
 identifiers for the source and target synsets. The index file in the directory
@@ -56,12 +126,28 @@ types, where significant is determined using some version of the chi-square
 test. The rest of the directory contains html pages with more comprehensive
 views of the relations.
 
+The html pages are created from the relations in memory, the two text files are
+written at the same time in a background thread. With --no-text they are not
+written at all. With --compress EXT the relations file is compressed, see the
+--create-cltype-files option above.
+
+Pairs of basic types with fewer than 20 relations are not tested since the
+chi-square test is not reliable for small counts. With --exact-tests they are
+tested with exact and permutation tests instead (see SparseSignificance in
+statistics.py), --workers N runs those tests in N processes. The p-values are
+corrected for the number of tests with the Benjamini-Hochberg procedure.
+
+The html pages are only written when they changed since the last run, the
+hashes of the pages are kept in hashes.tab in the directory. With --workers the
+pages for the pairs of basic types are rendered by N processes.
+
 This is experimental and it does not yet work for verbs.
 
 
 ==> Exporting CoreLex as SQL files
 
-This assumes that the corelex-<version>-nouns.tab file has been created.
+This assumes that the data/corelex-<corelex version>-cltypes-nouns.tab file has
+been created.
 
    $ python3 corelex.py --sql 1.5
 
@@ -70,10 +156,25 @@ This creates two files:
    sql/corelex-1.5-basic-types-nouns.sql
    sql/corelex-1.5-lemmas-nouns.sql
 
-These can be imported into the database of the online CoreLex browser. Note that
-we do not create a table for CoreLex types.
+These can be imported into the tables of browser/schema.sql for the online
+CoreLex browser. Each INSERT statement has at most 1000 rows so that it stays
+below the max_allowed_packet limit of MySQL, use --batch-size N to change this.
+Note that we do not create a table for CoreLex types.
+
+For large tables it is much faster to use LOAD DATA instead of INSERT:
+
+   $ python3 corelex.py --sql 3.1 --tsv
+
+This creates tab-separated files instead of SQL files and a load script:
+
+   sql/corelex-3.1-basic-types-nouns.tab
+   sql/corelex-3.1-lemmas-nouns.tab
+   sql/corelex-3.1-load-nouns.sql
+
+The script empties the tables, drops their secondary keys, loads the files and
+then adds the keys again. Run it from the sql directory:
 
-NOTE: this is broken at the moment
+   $ mysql --local-infile=1 -u <USER_NAME> -p -D <DATABASE_NAME> < corelex-3.1-load-nouns.sql
 
 """
 
@@ -82,12 +183,29 @@ import sys
 import textwrap
 import io
 import itertools
+import multiprocessing
+import tempfile
+import shutil
+import threading
+import filecmp
+import heapq
+import ast
+import random
+import glob
+import mmap
+import hashlib
+from array import array
 from operator import itemgetter
 
-from wordnet import WordNet, NOUN, VERB, POINTER_SYMBOLS, expand
+from wordnet import WordNet, NOUN, VERB, POINTER_SYMBOLS, expand, normalize_lemma
 import cltypes
-from utils import index_file, data_file, flatten, bold
-from statistics import Distribution, ChiSquaredCell
+from utils import data_file, reservoir_sample
+from utils import open_file, find_file, compression_extension
+import statistics
+from statistics import Distribution, ChiSquaredMatrix, SparseSignificance
+from extsort import ExternalSorter
+import signatures
+from signatures import create_relation_cube, load_relation_cube
 
 
 # The versioning is a bit tricky. The old legacy CoreLex has no number, so we
@@ -101,13 +219,59 @@ CORELEX_VERSION = open("../VERSION").read().strip()
 
 ### Top-level methods that are executed driven by user flags
 
-def create_lemma_to_cltype_files(wordnet):
-    """Create CoreLex files from the given WordNet version."""
-    CoreLexTypeGenerator(wordnet, category=NOUN)
-    CoreLexTypeGenerator(wordnet, category=VERB)
-
-
-def create_basic_type_relations(wn, version, category):
+def create_lemma_to_cltype_files(wordnet, counts_only=False, workers=1,
+                                 memory_budget=None, sample_size=None, compression=None):
+    """Create CoreLex files from the given WordNet version. With counts_only only
+    the counts of the class pairs are written, not the sense pairs themselves.
+    With more than one worker the lemmas are processed by a pool of worker
+    processes, this creates the same files as using just one process. With a
+    memory budget (in bytes) sense pairs are sorted on disk when they do not
+    fit in the budget. With a sample size the glosses files have at most that
+    many randomly selected sense pairs for each class pair. With compression
+    ('gz', 'xz' or 'zst') the pair files are compressed."""
+    for category in (NOUN, VERB):
+        CoreLexTypeGenerator(wordnet, category=category, counts_only=counts_only,
+                             workers=workers, memory_budget=memory_budget,
+                             sample_size=sample_size, compression=compression)
+
+
+def update_lemma_to_cltype_files(wordnet, btypes=None):
+    """Update the CoreLex noun files for a new basic type inventory, which has the
+    format of cltypes.BASIC_TYPES_3_1 and defaults to the one in cltypes.
+    Returns the list of (lemma, old class, new class) tuples for the lemmas
+    that changed class."""
+    return CoreLexTypeUpdater(wordnet, btypes).changes
+
+
+def check_workers(wordnet, workers):
+    """Create all CoreLex files, both with and without counts_only, once in one
+    process and once with the given number of workers and check that the files
+    are the same byte for byte. Files are written to temporary directories which
+    are removed afterwards. Prints the differences and returns True if there are
+    none."""
+    serial_dir = tempfile.mkdtemp()
+    parallel_dir = tempfile.mkdtemp()
+    try:
+        for category in (NOUN, VERB):
+            for counts_only in (False, True):
+                CoreLexTypeGenerator(wordnet, category, counts_only, 1, serial_dir)
+                CoreLexTypeGenerator(wordnet, category, counts_only, workers, parallel_dir)
+        names = sorted(set(os.listdir(serial_dir)) | set(os.listdir(parallel_dir)))
+        match, mismatch, errors = filecmp.cmpfiles(serial_dir, parallel_dir, names,
+                                                   shallow=False)
+        print("\nCompared %d files created with 1 and %d workers" % (len(names), workers))
+        for name in mismatch:
+            print("   different:", name)
+        for name in errors:
+            print("   missing:", name)
+        return not mismatch and not errors
+    finally:
+        shutil.rmtree(serial_dir)
+        shutil.rmtree(parallel_dir)
+
+
+def create_basic_type_relations(wn, version, category, write_text=True,
+                                exact_tests=False, workers=1, compression=None):
 
     """Collect all relations and then turn them into relations between basic
     types. Store the relations not as individual relations but as a relation
@@ -121,35 +285,72 @@ def create_basic_type_relations(wn, version, category):
     The first has all relations as 5-tuples with basic types, pointers and the
     identifiers of the source and target synsets. The second is a summary file
     that has the relation signatures between basic type pairs. The directory
-    contains an html export of relation types between basic types."""
+    contains an html export of relation types between basic types. If NumPy is
+    available the relations and signatures are also saved in
+
+       data/corelex-VERSION-CATEGORY-relations.npz
+
+    The relations are handed to BasicTypeRelations in memory, the two text files
+    are only a side output which is written in a background thread while the
+    html export is created. With write_text=False they are not written.
+
+    With exact_tests the pairs with too few relations for the chi-square test
+    are tested with BasicTypeRelations.collect_sparse_relations(), using the
+    given number of worker processes, which are also used for writing the html
+    pages."""
 
     # collecting relations and relation signatures
     bt_relations = wn.get_all_basic_type_relations(NOUN)
     bt_relation_index = _create_basic_type_relations_summary(bt_relations)
 
     # writing results
+    writer = None
+    if write_text:
+        writer = threading.Thread(target=write_basic_type_relations,
+                                  args=(bt_relations, bt_relation_index, version, category,
+                                        compression))
+        writer.start()
+
+    # collecting and writing relations between basic types
+    try:
+        btr = BasicTypeRelations(wn, category, bt_relations, bt_relation_index)
+        btr.calculate_distribution()
+        btr.collect_significant_relations()
+        if exact_tests:
+            btr.collect_sparse_relations(workers=workers)
+        RelationsWriter(btr, workers=workers).write()
+    finally:
+        if writer is not None:
+            writer.join()
+
+
+def write_basic_type_relations(bt_relations, bt_relation_index, version, category,
+                               compression=None):
+    """Write the relations and the relation signatures to the text files that
+    BasicTypeRelations reads when it is not given the relations. If NumPy is
+    available they are also saved as a RelationCube (see signatures.py). With
+    compression ('gz', 'xz' or 'zst') the relations file is compressed."""
     c = expand(category)
     relations = 'data/corelex-%s-%ss-relations.txt' % (version, c)
     basicrels = 'data/corelex-%s-%ss-basic-type-relations.txt' % (version, c)
-    with open(relations, 'w') as fh:
-        for bt_relation in bt_relations:
-            source = bt_relation[3]
-            target = bt_relation[4]
-            fh.write("%s\t%s\t%s\n"
-                     % ("\t".join(bt_relation[:3]), source.id, target.id))
-    with open(basicrels, 'w') as fh:
+    if compression is not None:
+        relations += '.' + compression
+    with open_file(relations, 'w') as fh:
+        fh.writelines(["%s\t%s\t%s\t%s\t%s\n" % (rel[0], rel[1], rel[2], rel[3].id, rel[4].id)
+                       for rel in bt_relations])
+    with open_file(basicrels, 'w') as fh:
         for pair in sorted(bt_relation_index.keys()):
             if pair[0] != pair[1]:
                 fh.write("%s-%s" % (pair[0], pair[1]))
                 for k, v in bt_relation_index[pair].items():
                     fh.write("\t%s %s" % (k, v))
                 fh.write("\n")
+    if signatures.numpy is not None:
+        create_relation_cube(bt_relations).save(relation_cube_file(version, category))
 
-    # collecting and writing relations between basic types
-    btr = BasicTypeRelations(wn, category)
-    btr.calculate_distribution()
-    btr.collect_significant_relations()
-    RelationsWriter(btr).write()
+
+def relation_cube_file(version, category):
+    return 'data/corelex-%s-%ss-relations.npz' % (version, expand(category))
 
 
 def scratch(version):
@@ -191,9 +392,12 @@ def filter_basic_types(set_of_basic_types, type_relations):
 
 def print_usage():
     print("\nUsage:\n",
-          "   $ python3 corelex.py --create-cltype-files <version>\n",
-          "   $ python3 corelex.py --btyperels1 <version>\n",
-          "   $ python3 corelex.py --sql <version> <category>\n")
+          "   $ python3 corelex.py --create-cltype-files <version> [--counts-only] [--workers N] [--memory-budget MB] [--sample K] [--compress EXT]\n",
+          "   $ python3 corelex.py --check-workers <version> N\n",
+          "   $ python3 corelex.py --update-cltype-files <version> [<basic types file>]\n",
+          "   $ python3 corelex.py --btyperels <version> [--no-text] [--exact-tests] [--workers N] [--compress EXT]\n",
+          "   $ python3 corelex.py --sql <version> [--tsv] [--batch-size N]\n",
+          "   $ python3 corelex.py --lookup <version> <lemma> ...\n")
 
 
 def test_paths_top_top(wn):
@@ -227,19 +431,14 @@ class CoreLexTypeGenerator(object):
        data/corelex-VERSION-cltypes-nouns.txt
        data/corelex-VERSION-cltypes-verbs.tab
        data/corelex-VERSION-cltypes-verbs.txt
-       data/corelex-VERSION-nouns.tab
-       data/corelex-VERSION-verbs.tab
+       data/corelex-VERSION-lemmas-nouns.tab
+       data/corelex-VERSION-lemmas-verbs.tab
 
     The tab files are read into CoreLex and the txt files contain the same data
     but more pleasant to the eye.
 
-    Several additional files for nouns and verbs (n, v) are generated by the
-    methods:
-
-       self._create_nv_clpairs(category)
-       self.write_nv_clpairs(category)
-
-    These are
+    Several additional files for nouns and verbs are generated by the
+    write_clpairs() method:
 
        data/corelex-2.0-class_pair-nouns-all.tab
        data/corelex-2.0-lemma_pair-nouns-all.tab
@@ -266,410 +465,980 @@ class CoreLexTypeGenerator(object):
     the next basic_type pair.  Using the sequence number, you can jump the to
     the first line for the nth pair.
 
+    When the generator is created with a sample_size the glosses files are
+    replaced by files with at most sample_size sense pairs per class pair:
+
+       data/corelex-2.0-class_pair_glosses-nouns-sampleN.tab
+       data/corelex-2.0-class_pair_glosses-verbs-sampleN.tab
+
+    The sense pairs are selected with reservoir sampling while the sense pairs
+    are streamed to the class_pair file, so glosses are only looked up for the
+    selected pairs. Each class pair has its own random numbers, seeded with
+    SAMPLE_SEED and the class pair, so the samples do not depend on the other
+    class pairs. The first field still has the number of all sense pairs of
+    the class pair.
+
+    When the generator is created with a compression ('gz', 'xz' or 'zst') the
+    class_pair, lemma_pair, glosses and class_pair_counts files are compressed
+    and the extension is added to their names, see pairs_extension().
+
     Each line of the lemma_pair files contains a lemma/sense pair and its
     associated pair of basic types.  This allows us to examine all compound
     basic classes for a given lemma.
 
+    When the generator is created with counts_only=True the three files above
+    are not written. Instead there is one file per category with the number of
+    sense pairs for each class pair:
+
+       data/corelex-2.0-class_pair_counts-nouns-all.tab
+       data/corelex-2.0-class_pair_counts-verbs-all.tab
+
+    The lines are the same as the first two columns of the class_pair files. In
+    this mode individual sense pairs are never created, for each lemma the
+    number of senses with each basic type is counted and the counts of the
+    class pairs are computed from those (in effect the product of the sparse
+    lemma by basic type matrix with itself). A lemma with two basic types that
+    each have ten senses then adds 100 to one class pair count instead of
+    creating 100 sense pairs.
+
+    All indexes are filled in by one pass over the lemmas of the category, after
+    which all files are written from those indexes. The files with the reverse
+    mappings (the lemmas and lemma_pair files) are created from the indexes
+    directly and not by reading back the files that were just written.
+
+    Instance variables:
+
+    lemma_index
+        { lemma ==> corelex class }, in alphabetical order of the lemmas
+
+    class_index
+        { corelex class ==> list of lemmas }
+
+    lemmas
+        List of all lemmas in alphabetical order, the position of a lemma in the
+        list is used as its identifier in the pair arrays.
+
+    basic_types
+        List of all basic type names, the position in the list is used as the
+        identifier of the basic type. The list is sorted on the name followed by
+        a vertical bar, which is the order of the old basic_type|synset strings.
+
+    class_pairs
+        List of (basic type identifier, basic type identifier) pairs, the
+        position in the list is the identifier of the class pair.
+
+    pair_lemmas, pair_classes, pair_synsets1, pair_synsets2
+        Parallel arrays with one element for each pair of senses of a lemma. They
+        have the lemma identifier, the class pair identifier and the offsets of
+        the two synsets as integers. Pairs for the same lemma are adjacent.
+
+    lemma_pair_index
+        Array with for each lemma identifier the position of its first sense
+        pair, the pairs of a lemma are at lemma_pair_index[i] up to
+        lemma_pair_index[i+1].
+
+    class_pair_index
+        { class pair identifier ==> array of sense pair positions }
+
+    class_pair_counts
+        Array with the number of sense pairs for each class pair identifier.
+        This is the only pair index that is filled in with counts_only=True.
+
+    When a memory budget is given the pair arrays and the lemma_pair_index and
+    class_pair_index stay empty. Instead each sense pair is added to two
+    ExternalSorters, one with the lines of the lemma_pair file and one with
+    (class pair, lemma, synset1, synset2) tuples for the class_pair and glosses
+    files. The lemmas are then processed in shards of SHARD_SIZE lemmas so that
+    the pairs of all lemmas are never in memory at the same time.
+
+    Strings for class pairs and lemma pairs are only created when the files are
+    written, see format_class_pair() and format_lemma_pair().
+
     """
 
-    def __init__(self, wordnet, category):
+    # number of lemmas in a shard when lemmas are processed in one process with
+    # a memory budget
+    SHARD_SIZE = 2000
+
+    # combined with the class pair to seed the random numbers for sampling
+    SAMPLE_SEED = 0
+
+    def __init__(self, wordnet, category, counts_only=False, workers=1,
+                 output_dir='data', memory_budget=None, sample_size=None,
+                 compression=None):
         self.wordnet = wordnet
-        self.category = expand(category)
+        self.category = category
+        self.counts_only = counts_only
+        self.workers = workers
+        self.output_dir = output_dir
+        self.memory_budget = memory_budget
+        self.sample_size = sample_size
+        self.compression = compression
         self.version = wordnet.version
         self.cl_version = get_corelex_version(wordnet.version)
         self.lemma_index = {}
         self.class_index = {}
-        self.lemma_pair_index = {}
+        self.lemmas = []
+        self.basic_types = self._get_basic_type_names()
+        self.class_pairs = []
+        self.pair_lemmas = array('i')
+        self.pair_classes = array('i')
+        self.pair_synsets1 = array('i')
+        self.pair_synsets2 = array('i')
+        self.lemma_pair_index = array('i')
         self.class_pair_index = {}
+        self.class_pair_counts = array('i')
+        self.lemma_pair_lines = None
+        self.class_pair_records = None
+        if memory_budget is not None and not counts_only:
+            self.lemma_pair_lines = ExternalSorter(memory_budget // 2)
+            self.class_pair_records = ExternalSorter(memory_budget // 2)
         self.wn_lemma_idx = self.wordnet.lemma_index()
         self.wn_synset_idx = self.wordnet.synset_index()
+        self._create_cltypes_and_clpairs()
+        self.pp_cltypes()
+        self.write_cltypes()
         if category == NOUN:
-            self._create_noun_cltypes()
-            self.pp_nouns()
-            self.write_nouns()
-        elif category == VERB:
-            self._create_verb_cltypes()
-            self.pp_verbs()
-            self.write_verbs()
-        self._create_nv_clpairs(category)
-        self.write_nv_clpairs(category)
+            self.write_basic_types()
+        if counts_only:
+            self.write_clpair_counts()
+        else:
+            self.write_clpairs()
+
+    def pairs_extension(self):
+        """Return the extension of the class_pair, lemma_pair, glosses and
+        class_pair_counts files, which may be compressed."""
+        return 'tab' if self.compression is None else 'tab.%s' % self.compression
 
     def corelex_cltype_file(self, category, extension='tab'):
-        return "data/corelex-%s-cltypes-%ss.%s" \
-            % (self.cl_version, category, extension)
+        return "%s/corelex-%s-cltypes-%ss.%s" \
+            % (self.output_dir, self.cl_version, category, extension)
 
     def corelex_lemma_file(self, category, extension='tab'):
-        return "data/corelex-%s-lemmas-%ss.%s" \
-            % (self.cl_version, category, extension)
+        return "%s/corelex-%s-lemmas-%ss.%s" \
+            % (self.output_dir, self.cl_version, category, extension)
 
     def corelex_class_pair_file(self, category, extension='tab'):
-        return "data/corelex-%s-class_pair-%ss-all.%s" \
-            % (self.cl_version, category, extension)
+        return "%s/corelex-%s-class_pair-%ss-all.%s" \
+            % (self.output_dir, self.cl_version, category, extension)
 
     def corelex_lemma_pair_file(self, category, extension='tab'):
-        return "data/corelex-%s-lemma_pair-%ss-all.%s" \
-            % (self.cl_version, category, extension)
-   
+        return "%s/corelex-%s-lemma_pair-%ss-all.%s" \
+            % (self.output_dir, self.cl_version, category, extension)
+
     def corelex_lemma_pair_glosses_file(self, category, extension='tab'):
-        return "data/corelex-%s-class_pair_glosses-%ss-all.%s" \
-            % (self.cl_version, category, extension)
-
-    def _create_noun_cltypes(self):
-        # type_relations = self._get_type_relations()
-        for lemma in sorted(self.wn_lemma_idx[NOUN].keys()):
-            word = self.wordnet.get_noun(lemma)
-            synsets = [self.wordnet.get_noun_synset(synset) for synset in word.synsets]
-            basic_types = get_basic_types(synsets)
-            corelex_class = ' '.join(sorted(basic_types))
-            self.lemma_index[word] = corelex_class
-            self.class_index.setdefault(corelex_class, []).append(word)
-
-    def _create_verb_cltypes(self):
-        for lemma in sorted(self.wn_lemma_idx[VERB].keys()):
-            word = self.wordnet.get_verb(lemma)
-            synsets = [self.wordnet.get_synset(VERB, synset) for synset in word.synsets]
-            basic_types = get_basic_types(synsets)
-            corelex_class = ' * '.join(sorted(basic_types))
+        return "%s/corelex-%s-class_pair_glosses-%ss-all.%s" \
+            % (self.output_dir, self.cl_version, category, extension)
+
+    def corelex_lemma_pair_glosses_sample_file(self, category, sample_size, extension='tab'):
+        return "%s/corelex-%s-class_pair_glosses-%ss-sample%d.%s" \
+            % (self.output_dir, self.cl_version, category, sample_size, extension)
+
+    def corelex_class_pair_counts_file(self, category, extension='tab'):
+        return "%s/corelex-%s-class_pair_counts-%ss-all.%s" \
+            % (self.output_dir, self.cl_version, category, extension)
+
+    def corelex_basic_types_file(self, category, extension='tab'):
+        return "%s/corelex-%s-basic_types-%ss.%s" \
+            % (self.output_dir, self.cl_version, category, extension)
+
+    def _get_basic_type_names(self):
+        names = set([synset.basic_type for synset in self.wordnet.basic_types(self.category)])
+        return sorted(names, key=lambda name: name + '|')
+
+    def _create_cltypes_and_clpairs(self):
+        """Fill in all indexes from one pass over the lemmas. The pass is done by
+        LemmaShards, either by one shard for all lemmas or by many shards in
+        worker processes. Shards are consecutive ranges of the sorted lemmas and
+        their results are added in the order of the shards, so the indexes (and
+        therefore the files) do not depend on the number of workers."""
+        lemmas = sorted(self.wn_lemma_idx[self.category].keys())
+        basic_type_ids = {name: i for i, name in enumerate(self.basic_types)}
+        if self.workers > 1 and 'fork' in multiprocessing.get_all_start_methods():
+            shards = self._generate_shards(lemmas, basic_type_ids)
+        else:
+            if self.workers > 1:
+                print("Warning: cannot fork worker processes, using one process")
+            size = len(lemmas) + 1 if self.memory_budget is None else self.SHARD_SIZE
+            shards = (LemmaShard(i, lemmas[i:i+size], self.counts_only)
+                      .generate(self.wordnet, self.category, basic_type_ids)
+                      for i in range(0, len(lemmas), size))
+        class_pair_ids = {}
+        for shard in shards:
+            self._add_shard(shard, class_pair_ids)
+        if self.lemma_pair_lines is not None:
+            return
+        self.lemma_pair_index.append(len(self.pair_lemmas))
+        # Group the sense pairs on their class pair, the sort is stable so the
+        # pairs of each class pair stay in the order of the lemmas.
+        positions = sorted(range(len(self.pair_classes)), key=self.pair_classes.__getitem__)
+        for class_pair_id, group in itertools.groupby(positions, key=self.pair_classes.__getitem__):
+            self.class_pair_index[class_pair_id] = array('i', group)
+
+    def _generate_shards(self, lemmas, basic_type_ids):
+        """Generate LemmaShards for the lemmas using a pool of worker processes,
+        in the order of the lemmas. The workers are forked after the WordNet and
+        the lemmas are put in a global variable, so they do not have to be sent
+        to the workers."""
+        global _shard_context
+        _shard_context = (self.wordnet, self.category, lemmas, basic_type_ids,
+                          self.counts_only)
+        # more shards than workers so that a slow shard does not hold up the rest
+        size = len(lemmas) // (self.workers * 4) + 1
+        ranges = [(i, min(i + size, len(lemmas))) for i in range(0, len(lemmas), size)]
+        print("Generating %d shards with %d workers" % (len(ranges), self.workers))
+        pool = multiprocessing.get_context('fork').Pool(self.workers)
+        try:
+            for shard in pool.imap(_generate_shard, ranges):
+                yield shard
+        finally:
+            pool.terminate()
+            _shard_context = None
+
+    def _add_shard(self, shard, class_pair_ids):
+        """Add the lemmas and pairs of the shard to the indexes. The class pair
+        identifiers of the shard are translated into the ones of the generator."""
+        offset = len(self.pair_lemmas)
+        for lemma, corelex_class, start in zip(shard.lemmas, shard.classes, shard.pair_starts):
+            self.lemmas.append(lemma)
             self.lemma_index[lemma] = corelex_class
             self.class_index.setdefault(corelex_class, []).append(lemma)
-
-    def _create_verb_clpairs(self):
-        """Create paired types for verbs (PGA)."""
-        for lemma in sorted(self.wn_lemma_idx[VERB].keys()):
-            
-            word = self.wordnet.get_verb(lemma)
-            # get all the synsets for the lemma
-            synsets = [self.wordnet.get_synset(VERB, synset) for synset in word.synsets]
-            # get the list of basic types for all synsets for this lemma
-            # Result is s a list of basic_type|synset_id strings.
-            l_basic_type = list(get_basic_types_ss(synsets))
-
-            # extract pairs of basic types for the lemma by taking all 
-            # combinations of two items in the l_basic_type list.
-            l_bt_pair = list(itertools.combinations(l_basic_type, 2))
-
-            # list of class pairs for a lemma
-            l_class_pair = []
-
-            # Create names for the class pairs using * between the class names.
-            for bt_pair in l_bt_pair:
-                # class_pair = ' * '.join(sorted(bt_pair))
-                class_sid_pair = sorted(bt_pair)
-                # at this point, a class_pair looks like:
-                # 'abandon.31.1 give_up.31.0|00614907 * abandon.40.1 give_up.40.0|02232523'
-                # It is time to separate the basic_types from the word sense ids,
-                # although we will keep this info together for printing out, 
-                # along with the lemma.
-                class_pair = []
-                sid_pair = []
-                for class_sid in class_sid_pair:
-                    (class_part, sid_part) = class_sid.split("|")
-                    class_pair.append(class_part)
-                    sid_pair.append(sid_part)
-                class_pair_str = " * ".join(class_pair)
-                sid_pair_str = "|".join(sid_pair)
-                combo_str = class_pair_str + "\t" + lemma + "|" + sid_pair_str
-                l_class_pair.append(combo_str)
-
-            # list of class pairs for the lemma
-            self.lemma_pair_index[lemma] = l_class_pair
-
-            # The value of the class_pair_index is a list of lemmas
-            for class_pair in l_class_pair:
-                (class_part, lemma_part) = class_pair.split("\t")
-                self.class_pair_index.setdefault(class_part, []).append(lemma_part)
-
-    def _create_nv_clpairs(self, category):
-        for lemma in sorted(self.wn_lemma_idx[category].keys()):
-            if category == VERB:
-                word = self.wordnet.get_verb(lemma)
-            elif category == NOUN:
-                word = self.wordnet.get_noun(lemma)
-            else:
-                print("[_create_nv_clpairs] failed due to unsupported category")
-                continue
-
-            # get all the synsets for the lemma
-            synsets = [self.wordnet.get_synset(category, synset) for synset in word.synsets]
-
-            # get the list of basic types for all synsets for this lemma
-            # Result is s a list of basic_type|synset_id strings.
-            l_basic_type = list(get_basic_types_ss(synsets))
-
-            # extract pairs of basic types for the lemma by taking all 
-            # combinations of two items in the l_basic_type list.
-            l_bt_pair = list(itertools.combinations(l_basic_type, 2))
-
-            # list of class pairs for a lemma
-            l_class_pair = []
-
-            # Create names for the class pairs using * between the class names.
-            for bt_pair in l_bt_pair:
-                class_sid_pair = sorted(bt_pair)
-   
-                # At this point, a class_pair looks like:
-                # 'abandon.31.1 give_up.31.0|00614907 * abandon.40.1 give_up.40.0|02232523'
-                # It is time to separate the basic_types 
-                # from the word sense ids,
-                # although we will keep this info together for printing out, 
-                # along with the lemma.
-                class_pair = []
-                sid_pair = []
-                for class_sid in class_sid_pair:
-                    (class_part, sid_part) = class_sid.split("|")
-                    class_pair.append(class_part)
-                    sid_pair.append(sid_part)
-                class_pair_str = " * ".join(class_pair)
-                sid_pair_str = "|".join(sid_pair)
-                combo_str = class_pair_str + "\t" + lemma + "|" + sid_pair_str
-
-                l_class_pair.append(combo_str)
-
-            # list of class pairs for the lemma
-            self.lemma_pair_index[lemma] = l_class_pair
-
-            # The value of the class_pair_index is a list of lemmas
-            for class_pair in l_class_pair:
-                (class_part, lemma_part) = class_pair.split("\t")
-                self.class_pair_index.setdefault(class_part, []).append(lemma_part)
-
+            self.lemma_pair_index.append(offset + start)
+        translation = []
+        for (bt1, bt2), count in zip(shard.class_pairs, shard.class_pair_counts):
+            class_pair_id = class_pair_ids.get((bt1, bt2))
+            if class_pair_id is None:
+                class_pair_id = len(self.class_pairs)
+                class_pair_ids[(bt1, bt2)] = class_pair_id
+                self.class_pairs.append((bt1, bt2))
+                self.class_pair_counts.append(0)
+            self.class_pair_counts[class_pair_id] += count
+            translation.append(class_pair_id)
+        if self.lemma_pair_lines is not None:
+            self._sort_shard(shard, translation)
+            return
+        self.pair_lemmas.extend(shard.pair_lemmas)
+        self.pair_classes.extend(array('i', map(translation.__getitem__, shard.pair_classes)))
+        self.pair_synsets1.extend(shard.pair_synsets1)
+        self.pair_synsets2.extend(shard.pair_synsets2)
+
+    def _sort_shard(self, shard, translation):
+        """Add the sense pairs of the shard to the external sorters."""
+        lemmas = self.lemmas
+        names = [self.format_class_pair(class_pair_id) for class_pair_id in translation]
+        add_line = self.lemma_pair_lines.add
+        add_record = self.class_pair_records.add
+        for lemma_id, class_pair_id, offset1, offset2 in zip(
+                shard.pair_lemmas, shard.pair_classes, shard.pair_synsets1, shard.pair_synsets2):
+            add_line("%s|%08d|%08d\t%s\n" % (lemmas[lemma_id], offset1, offset2, names[class_pair_id]))
+            add_record((translation[class_pair_id], lemma_id, offset1, offset2))
+
+    def format_class_pair(self, class_pair_id):
+        """Return the class pair as a string like 'abandon.31.1 give_up.31.0 *
+        leave.31.5', where the two basic types are separated by an asterisk."""
+        bt1, bt2 = self.class_pairs[class_pair_id]
+        return "%s * %s" % (self.basic_types[bt1], self.basic_types[bt2])
+
+    def format_lemma_pair(self, position):
+        """Return the sense pair at the position as a string like
+        abandon|00614907|00615748."""
+        return "%s|%08d|%08d" % (self.lemmas[self.pair_lemmas[position]],
+                                 self.pair_synsets1[position],
+                                 self.pair_synsets2[position])
 
     def _get_type_relations(self):
         if self.wordnet.version == '1.5':
             return cltypes.BASIC_TYPES_ISA_RELATIONS_1_5
         return cltypes.BASIC_TYPES_ISA_RELATIONS_3_1
 
-    def write_nouns(self):
-        filename1 = self.corelex_cltype_file(NOUN, 'tab')
-        filename2 = self.corelex_lemma_file(NOUN, 'tab')
+    def _selected_classes(self):
+        """Return the sorted list of classes that are written to the cltypes files.
+        For verbs this excludes classes with only one basic type and classes with
+        less than five lemmas."""
+        classes = sorted(self.class_index.keys())
+        if self.category == VERB:
+            classes = [cl_class for cl_class in classes
+                       if '*' in cl_class and len(self.class_index[cl_class]) > 4]
+        return classes
+
+    def write_cltypes(self):
+        filename1 = self.corelex_cltype_file(self.category, 'tab')
+        filename2 = self.corelex_lemma_file(self.category, 'tab')
+        classes = self._selected_classes()
         print("Writing", filename1)
-        with open(filename1, 'w') as fh:
-            for cl_class in sorted(self.class_index.keys()):
-                lemmas = [w.lemma for w in self.class_index[cl_class]]
-                fh.write("%s\t%s\n" % (cl_class, ' '.join(lemmas)))
+        with open_file(filename1, 'w') as fh:
+            for cl_class in classes:
+                fh.write("%s\t%s\n" % (cl_class, ' '.join(self.class_index[cl_class])))
         print("Writing", filename2)
-        with open(filename1) as fh1, open(filename2, 'w') as fh2:
-            lemma_list = []
-            for line in fh1:
-                cltype, lemmas = line.strip().split("\t")
-                for lemma in lemmas.split():
-                    lemma_list.append("%s\t%s\n" % (lemma, cltype))
-            for lemma in sorted(lemma_list):
-                fh2.write(lemma)
-
-    def pp_nouns(self):
-        filename = self.corelex_cltype_file(NOUN, 'txt')
+        # the lemma index is in alphabetical order already
+        selected = set(classes)
+        with open_file(filename2, 'w') as fh:
+            for lemma, cl_class in self.lemma_index.items():
+                if cl_class in selected:
+                    fh.write("%s\t%s\n" % (lemma, cl_class))
+
+    def pp_cltypes(self):
+        filename = self.corelex_cltype_file(self.category, 'txt')
         print("Writing", filename)
-        fh = open(filename, 'w')
         tw = textwrap.TextWrapper(width=80, initial_indent="  ", subsequent_indent="  ")
-        for cl_class in sorted(self.class_index.keys()):
-            fh.write("%s\n\n" % cl_class)
-            lemmas = [w.lemma for w in self.class_index[cl_class]]
-            for line in tw.wrap(' '.join(lemmas)):
-                fh.write(line + "\n")
-            fh.write("\n")
-
-    def write_verbs(self):
-        filename1 = self.corelex_cltype_file(VERB, 'tab')
-        filename2 = self.corelex_lemma_file(VERB, 'tab')
-        print("Writing", filename1)
-        with open(filename1, 'w') as fh:
-            for cl_class in sorted(self.class_index.keys()):
-                if '*' in cl_class and len(self.class_index[cl_class]) > 4:
-                    fh.write("%s\t%s\n" % (cl_class, ' '.join(self.class_index[cl_class])))
-        print("Writing", filename2)
-        with open(filename1) as fh1, open(filename2, 'w') as fh2:
-            lemma_list = []
-            for line in fh1:
-                cltype, lemmas = line.strip().split("\t")
-                for lemma in lemmas.split():
-                    lemma_list.append("%s\t%s\n" % (lemma, cltype))
-            for lemma in sorted(lemma_list):
-                fh2.write(lemma)
-
-    """
-    Create .tab files for lemmas and paired classes regardless of size of class.  We will
-    use this data to create paired_classes, lemmas along with any pairs of basic
-    classes they occur in.
-    c1_class is of the form "class3 * class2"
-    class_index[cl_class] is a list of lemmas which are members of the class.
-    We will compute each pair of classes in the c1_class and output a line
-    consisting of len(class_index[cl_class]), class_pair, space separated lemmas
-    
-    """
+        with open_file(filename, 'w') as fh:
+            for cl_class in self._selected_classes():
+                fh.write("%s\n\n" % cl_class)
+                for line in tw.wrap(' '.join(self.class_index[cl_class])):
+                    fh.write(line + "\n")
+                fh.write("\n")
 
-    """
-    def write_verb_pairs(self):
-        filename1 = self.corelex_class_pair_file(VERB, 'tab')
-        filename2 = self.corelex_lemma_pair_file(VERB, 'tab')
-        filename3 = self.corelex_lemma_pair_glosses_file(VERB, 'tab')
-        print("Writing", filename1)
-        # number of sense_pairs\tbasic_types_class_pair\tlemma|sense1|sense2 ...
-        # 2       abandon.31.1 give_up.31.0 * abandon.40.1 give_up.40.0   abandon|00614907|02232523 give_up|00614907|02232523
-        
-        # create a list sorted by the number of lemma/sense pairs in the class
-        l_class_pair = []
-        for class_pair in sorted(self.class_pair_index.keys()):
-            # Remove restrictions on the size of the class
-            ###if '*' in cl_class and len(self.class_index[cl_class]) > 4:
-            ###if '*' in class_pair:
-            ###fh.write("%s\t%s\n" % (cl_class, ' '.join(self.class_pair_index[cl_class])))
-            l_class_pair.append([len(self.class_pair_index[class_pair]), class_pair, self.class_pair_index[class_pair]])
-
-        # sort in place on the length (number of lemma sense pairs)
+    def _sorted_class_pairs(self, class_pair_names):
+        """Return a list of (count, class pair identifier) tuples sorted on the
+        number of lemma/sense pairs, with the names of the class pairs breaking
+        ties. Note that there are no restrictions on the size of the class."""
+        class_pair_ids = sorted(range(len(class_pair_names)), key=class_pair_names.__getitem__)
+        l_class_pair = [(self.class_pair_counts[i], i) for i in class_pair_ids]
         l_class_pair.sort(key=itemgetter(0), reverse=True)
+        return l_class_pair
+
+    def write_basic_types(self):
+        """Write the basic type inventory that was used for the synsets, one line
+        per synset with the basic type, the synset identifier and the synset
+        description. CoreLexTypeUpdater compares this to a new inventory."""
+        inventory = self.wordnet.basic_type_inventory()
+        if inventory is None:
+            return
+        filename = self.corelex_basic_types_file(self.category, 'tab')
+        print("Writing", filename)
+        with open_file(filename, 'w') as fh:
+            for btype in inventory:
+                for synset_id, members in inventory[btype]:
+                    fh.write("%s\t%s\t%s\n" % (btype, synset_id, members))
 
-        with open(filename1, 'w') as fh:
-            ###for cl_class in sorted(self.class_index.keys()):
-            #for class_pair in sorted(self.class_pair_index.keys()):
-            for class_pair in l_class_pair:
-                # Remove restrictions on the size of the class
-                ###if '*' in cl_class and len(self.class_index[cl_class]) > 4:
-                ###if '*' in class_pair:
-                    ###fh.write("%s\t%s\n" % (cl_class, ' '.join(self.class_pair_index[cl_class])))
-                #fh.write("%i\t%s\t%s\n" % (len(self.class_pair_index[class_pair]), class_pair, ' '.join(self.class_pair_index[class_pair])))
-                fh.write("%i\t%s\t%s\n" % (class_pair[0], class_pair[1], ' '.join(class_pair[2])))
+    def write_clpair_counts(self):
+        filename = self.corelex_class_pair_counts_file(self.category, self.pairs_extension())
+        print("Writing", filename)
+        class_pair_names = [self.format_class_pair(i) for i in range(len(self.class_pairs))]
+        with open_file(filename, 'w') as fh:
+            for count, class_pair_id in self._sorted_class_pairs(class_pair_names):
+                fh.write("%i\t%s\n" % (count, class_pair_names[class_pair_id]))
+
+    def write_clpairs(self):
+        filename2 = self.corelex_lemma_pair_file(self.category, self.pairs_extension())
+
+        class_pair_names = [self.format_class_pair(i) for i in range(len(self.class_pairs))]
+        l_class_pair = self._sorted_class_pairs(class_pair_names)
+        if self.lemma_pair_lines is None:
+            self._write_class_pairs(l_class_pair, class_pair_names, self._get_senses)
+        else:
+            with tempfile.TemporaryFile('w+') as fh:
+                self._write_class_pairs(l_class_pair, class_pair_names,
+                                        self._get_sorted_senses(fh))
 
-        print("Writing", filename2)
         # lemma|sense1-id|sense2-id\tbasic_types_class_pair
         # The basic types correspond to the senses in the order given.  e.g.,
         # abandon|00614907|00615748       abandon.31.1 give_up.31.0 * leave.31.5
-        with open(filename1) as fh1, open(filename2, 'w') as fh2:
-            lemma_list = []
-            for line in fh1:
-                lemma_len, cltype, lemmas = line.strip().split("\t")
-                for lemma in lemmas.split():
-                    lemma_list.append("%s\t%s\n" % (lemma, cltype))
-            for lemma in sorted(lemma_list):
-                fh2.write(lemma)
-
+        print("Writing", filename2)
+        with open_file(filename2, 'w') as fh:
+            if self.lemma_pair_lines is not None:
+                fh.writelines(self.lemma_pair_lines)
+            else:
+                self._write_lemma_pairs(fh, class_pair_names)
+
+    def _write_class_pairs(self, l_class_pair, class_pair_names, get_senses):
+        """Write the class_pair and glosses files for the (count, class pair
+        identifier) tuples in l_class_pair, get_senses generates the (lemma,
+        offset1, offset2) tuples of a class pair."""
+        filename1 = self.corelex_class_pair_file(self.category, self.pairs_extension())
+        filename3 = self.corelex_lemma_pair_glosses_file(self.category, self.pairs_extension())
+        if self.sample_size is not None:
+            filename3 = self.corelex_lemma_pair_glosses_sample_file(
+                self.category, self.sample_size, self.pairs_extension())
+
+        # The class_pair and glosses files are written side by side, the first
+        # has one line per class pair and the second one line per lemma pair:
+        #
+        # number of sense_pairs\tbasic_types_class_pair\tlemma|sense1|sense2 ...
+        # 2    abandon.31.1 give_up.31.0 * abandon.40.1 give_up.40.0    abandon|00614907|02232523 give_up|00614907|02232523
+        #
+        # length\tbasic_class_pair\t|lemma|\tsense_offsets\tgloss1 | gloss2
+        # 1503    change.30.0 * change.30.1 alter.30.1 modify.30.a    |abate|
+        # 00245945|00246175    become less in amount or intensity; "The storm abated";
+        # "The rain let up after a few hours" | make less active or intense
+        #
+        # On the first line for a class pair in the glosses file a field /n[n]/
+        # is added where [n] is an ascending count. The idea is to make it easy
+        # to search for the next class pair if the file is opened in an editor.
+        # We can search either for /n to get to the next class pair or for /n35/
+        # to get to the start of the 35th class pair.
+        print("Writing", filename1)
         print("Writing", filename3)
-       
-        Output: length\basic_class_pair\lemma\sense_offsets\gloss1\gloss2
-        e.g., 1503    change.30.0 * change.30.1 alter.30.1 modify.30.a        abate   00245945
-|00246175       become less in amount or intensity; "The storm abated"; "The rai
-n let up after a few hours"     make less active or intense
-       
-        with open(filename3, 'w') as fh3:
-            # track the last basic_class pair seen.  We will add a field
-            # of /n[n]/ at the end if the basic_class changes. [n] is an ascending
-            # count.  The idea is to make it easy to search for the next class pair
-            # if the file is opened in an editor.  We can search either for /n to get
-            # to the next class pair or for /n35/ to get to the start of the 35th class pair.
-            last_pair = ""
-            count = 1
-            for class_pair in l_class_pair:
-                length = class_pair[0]
-                pair = class_pair[1]
-                for lemma_sense_pair in class_pair[2]:
-                    lemma, sense1, sense2 = lemma_sense_pair.split("|")
-                    senses = "|".join([sense1, sense2])
-                    # use the word sense offsets to fetch the gloss for each sense
-                    s1_gloss = self.wordnet.get_verb_synset(sense1).gloss
-                    s2_gloss = self.wordnet.get_verb_synset(sense2).gloss
-                    fh3.write("%i\t%s\t%s\t%s\t%s | %s" % (length, pair, lemma, senses, s1_gloss, s2_gloss))
-                    if class_pair != last_pair:
-                        # add a marker to the file
-                        fh3.write("\t/n%i/\n" % (count))
-                        count += 1
-                        last_pair = class_pair
-                    else:
-                        # just terminate the line
-                        fh3.write("\n")
+        glosses = {int(offset): synset.gloss
+                   for offset, synset in self.wn_synset_idx[self.category].items()}
+        with open_file(filename1, 'w') as fh1, open_file(filename3, 'w') as fh3:
+            for count, (length, class_pair_id) in enumerate(l_class_pair, 1):
+                pair = class_pair_names[class_pair_id]
+                fh1.write("%i\t%s\t" % (length, pair))
+                senses = _write_sense_pairs(fh1, get_senses(class_pair_id))
+                if self.sample_size is not None:
+                    senses = self._sample_senses(pair, senses, self.sample_size)
+                self._write_glosses(fh3, count, length, pair, senses, glosses)
+                fh1.write("\n")
+
+    def _write_glosses(self, fh, count, length, pair, senses, glosses):
+        """Write the glosses lines for the senses of a class pair, count is the
+        number of the class pair and length the number of its sense pairs."""
+        marker = "\t/n%i/\n" % count
+        for lemma, offset1, offset2 in senses:
+            fh.write("%i\t%s\t|%s|\t%08d|%08d\t%s | %s%s"
+                     % (length, pair, lemma, offset1, offset2,
+                        glosses[offset1], glosses[offset2], marker))
+            marker = "\n"
+
+    def _sample_senses(self, class_pair, senses, sample_size):
+        """Return a list with a uniform sample of sample_size of the senses of the
+        class pair, in the order in which they were generated."""
+        rng = random.Random("%s|%s" % (self.SAMPLE_SEED, class_pair))
+        return [sense for position, sense in reservoir_sample(senses, sample_size, rng)]
+
+    def _get_senses(self, class_pair_id):
+        """Generate (lemma, offset1, offset2) tuples for the sense pairs of the
+        class pair, in the order of the lemmas."""
+        lemmas = self.lemmas
+        pair_lemmas = self.pair_lemmas
+        pair_synsets1 = self.pair_synsets1
+        pair_synsets2 = self.pair_synsets2
+        for p in self.class_pair_index[class_pair_id]:
+            yield lemmas[pair_lemmas[p]], pair_synsets1[p], pair_synsets2[p]
+
+    def _get_sorted_senses(self, fh):
+        """Return a function that does what _get_senses() does, but for sense pairs
+        that were given to the external sorter. The sorted pairs are copied to the
+        temporary file fh, with the position of each class pair in that file, so
+        the class pairs can be read in any order. The caller closes the file
+        when the function is not needed anymore."""
+        positions = {}
+        for class_pair_id, records in itertools.groupby(self.class_pair_records, key=itemgetter(0)):
+            positions[class_pair_id] = fh.tell()
+            for record in records:
+                fh.write("%d %d %d\n" % record[1:])
+        print("Sorted sense pairs using %d runs on disk" % self.class_pair_records.runs)
+        lemmas = self.lemmas
+
+        def get_senses(class_pair_id):
+            fh.seek(positions[class_pair_id])
+            for i in range(self.class_pair_counts[class_pair_id]):
+                lemma_id, offset1, offset2 = fh.readline().split()
+                yield lemmas[int(lemma_id)], int(offset1), int(offset2)
+
+        return get_senses
+
+    def _write_lemma_pairs(self, fh, class_pair_names):
+        """Write the lemma_pair lines in sorted order. Since all lines for a lemma
+        start with lemma| it is enough to sort the lemmas with the bar added and
+        then the sense pairs of each lemma separately, synset offsets all have
+        the same width so they sort the same as numbers and as strings."""
+        lemmas = self.lemmas
+        pair_synsets1 = self.pair_synsets1
+        pair_synsets2 = self.pair_synsets2
+        pair_classes = self.pair_classes
+        for lemma_id in sorted(range(len(lemmas)), key=lambda i: lemmas[i] + '|'):
+            lemma = lemmas[lemma_id]
+            lines = sorted([(pair_synsets1[p], pair_synsets2[p], class_pair_names[pair_classes[p]])
+                            for p in range(self.lemma_pair_index[lemma_id],
+                                           self.lemma_pair_index[lemma_id + 1])])
+            fh.writelines(["%s|%08d|%08d\t%s\n" % (lemma, offset1, offset2, pair)
+                           for offset1, offset2, pair in lines])
+
+
+def _write_sense_pairs(fh, senses):
+    """Write the (lemma, offset1, offset2) senses as sense pairs separated by
+    spaces and generate the senses while doing that."""
+    separator = ""
+    for sense in senses:
+        fh.write("%s%s|%08d|%08d" % ((separator,) + sense))
+        separator = " "
+        yield sense
+
+
+class LemmaShard(object):
+
+    """The CoreLex classes and sense pairs for a consecutive range of the sorted
+    lemmas of a category. Shards are created either in the main process or in
+    worker processes, in the latter case they are pickled to send them back,
+    which is why they only contain strings and arrays.
+
+    Instance variables:
+
+    first_lemma_id
+        The position of the first lemma of the shard in the sorted lemmas.
+
+    lemmas, classes
+        The lemmas of the shard and their CoreLex classes.
+
+    class_pairs, class_pair_counts
+        List of (basic type identifier, basic type identifier) pairs and the
+        number of sense pairs for each of them. The position in the list is the
+        class pair identifier used in pair_classes, these identifiers are local
+        to the shard.
+
+    pair_starts
+        For each lemma the position of its first sense pair in the pair arrays.
+
+    pair_lemmas, pair_classes, pair_synsets1, pair_synsets2
+        Parallel arrays with one element for each sense pair, as in
+        CoreLexTypeGenerator, but with local class pair identifiers. The lemma
+        identifiers are the positions in all sorted lemmas, not just those of
+        the shard. These are empty if counts_only is True.
 
     """
 
-    def write_nv_clpairs(self, category):
-        filename1 = self.corelex_class_pair_file(category, 'tab')
-        filename2 = self.corelex_lemma_pair_file(category, 'tab')
-        filename3 = self.corelex_lemma_pair_glosses_file(category, 'tab')
-        print("Writing", filename1)
-        # number of sense_pairs\tbasic_types_class_pair\tlemma|sense1|sense2 ...
-        # 2       abandon.31.1 give_up.31.0 * abandon.40.1 give_up.40.0   abandon|00614907|02232523 give_up|00614907|02232523
-        
-        # create a list sorted by the number of lemma/sense pairs in the class
-        l_class_pair = []
-        for class_pair in sorted(self.class_pair_index.keys()):
-            # Note no restrictions on the size of the class
-            l_class_pair.append([len(self.class_pair_index[class_pair]), class_pair, self.class_pair_index[class_pair]])
-
-        # sort in place on the length (number of lemma sense pairs)
-        l_class_pair.sort(key=itemgetter(0), reverse=True)
+    def __init__(self, first_lemma_id, lemmas, counts_only=False):
+        self.first_lemma_id = first_lemma_id
+        self.lemmas = lemmas
+        self.counts_only = counts_only
+        self.classes = []
+        self.class_pairs = []
+        self.class_pair_counts = array('i')
+        self.pair_starts = array('i')
+        self.pair_lemmas = array('i')
+        self.pair_classes = array('i')
+        self.pair_synsets1 = array('i')
+        self.pair_synsets2 = array('i')
+
+    def __str__(self):
+        return "<LemmaShard %d-%d pairs=%d>" \
+            % (self.first_lemma_id, self.first_lemma_id + len(self.lemmas),
+               len(self.pair_lemmas))
+
+    def generate(self, wordnet, category, basic_type_ids):
+        """Collect the synsets and basic types of each lemma and use them both for
+        the corelex class of the lemma and for the pairs of basic types of its
+        senses."""
+        # noun classes are lists of basic types, verb classes are lists of basic
+        # type names which themselves contain spaces
+        separator = ' * ' if category == VERB else ' '
+        synset_idx = wordnet.synset_index()[category]
+        lemma_idx = wordnet.lemma_index()[category]
+        class_pair_ids = {}
+        # the inner loop runs once for every sense pair, so look up the methods
+        # it uses only once
+        add_lemma = self.pair_lemmas.append
+        add_class = self.pair_classes.append
+        add_synset1 = self.pair_synsets1.append
+        add_synset2 = self.pair_synsets2.append
+        counts = self.class_pair_counts
+        combinations = itertools.combinations
+        for lemma_id, lemma in enumerate(self.lemmas, self.first_lemma_id):
+            self.pair_starts.append(len(self.pair_lemmas))
+            synsets = [synset_idx.get(synset) for synset in lemma_idx[lemma].synsets]
+            self.classes.append(separator.join(sorted(get_basic_types(synsets))))
+            # Pairs of basic type identifier and synset offset. Sorting these puts
+            # them in the same order as sorting basic_type|synset_id strings, and
+            # combinations() keeps that order within a pair.
+            senses = sorted(set([(basic_type_ids[bt], int(synset.id))
+                                 for synset in synsets for bt in synset.basic_types]))
+            if self.counts_only:
+                self._count_clpairs(senses, class_pair_ids)
+                continue
+            for (bt1, offset1), (bt2, offset2) in combinations(senses, 2):
+                class_pair_id = class_pair_ids.get((bt1, bt2))
+                if class_pair_id is None:
+                    class_pair_id = self._add_class_pair(bt1, bt2, class_pair_ids)
+                counts[class_pair_id] += 1
+                add_lemma(lemma_id)
+                add_class(class_pair_id)
+                add_synset1(offset1)
+                add_synset2(offset2)
+        return self
+
+    def _add_class_pair(self, bt1, bt2, class_pair_ids):
+        class_pair_id = len(self.class_pairs)
+        class_pair_ids[(bt1, bt2)] = class_pair_id
+        self.class_pairs.append((bt1, bt2))
+        self.class_pair_counts.append(0)
+        return class_pair_id
+
+    def _count_clpairs(self, senses, class_pair_ids):
+        """Add the sense pairs of a lemma to the class pair counts without creating
+        them. The senses are sorted pairs of basic type identifier and synset
+        offset. All senses of the first basic type of a class pair precede all
+        senses of the second type, so two different basic types with n1 and n2
+        senses give n1 * n2 sense pairs and a basic type with n senses gives n *
+        (n - 1) / 2 pairs with itself."""
+        counts = {}
+        for bt, offset in senses:
+            counts[bt] = counts.get(bt, 0) + 1
+        basic_types = sorted(counts)
+        for i, bt1 in enumerate(basic_types):
+            n1 = counts[bt1]
+            for bt2 in basic_types[i:]:
+                n = n1 * (n1 - 1) // 2 if bt1 == bt2 else n1 * counts[bt2]
+                if n == 0:
+                    continue
+                class_pair_id = class_pair_ids.get((bt1, bt2))
+                if class_pair_id is None:
+                    class_pair_id = self._add_class_pair(bt1, bt2, class_pair_ids)
+                self.class_pair_counts[class_pair_id] += n
+
+
+# Set by CoreLexTypeGenerator just before worker processes are forked, contains
+# the wordnet, the category, the sorted lemmas, the basic type identifiers and
+# the counts_only flag.
+_shard_context = None
+
+
+def _generate_shard(lemma_range):
+    """Create a LemmaShard for a range of lemmas, this runs in a worker."""
+    wordnet, category, lemmas, basic_type_ids, counts_only = _shard_context
+    start, end = lemma_range
+    shard = LemmaShard(start, lemmas[start:end], counts_only)
+    return shard.generate(wordnet, category, basic_type_ids)
+
+
+class CoreLexTypeUpdater(CoreLexTypeGenerator):
+
+    """Updates the noun files created by CoreLexTypeGenerator after the basic type
+    inventory changed, without creating them all over again. The inventory that
+    was used for the existing files is read from the basic_types file and
+    compared to the new inventory. Only synsets in the hyponym trees of the
+    basic types that changed can get other basic types (see
+    WordNet.basic_type_subtrees()), so only the lemmas with a synset in those
+    trees are processed again, for all other lemmas the classes and sense pairs
+    are taken from the existing files. Updated are the files
 
-        with open(filename1, 'w') as fh:
-            #for class_pair in sorted(self.class_pair_index.keys()):
-            for class_pair in l_class_pair:
-                # Note no restrictions on the size of the class
-                fh.write("%i\t%s\t%s\n" % (class_pair[0], class_pair[1], ' '.join(class_pair[2])))
+       data/corelex-VERSION-cltypes-nouns.tab
+       data/corelex-VERSION-cltypes-nouns.txt
+       data/corelex-VERSION-lemmas-nouns.tab
+       data/corelex-VERSION-basic_types-nouns.tab
 
-        print("Writing", filename2)
-        # lemma|sense1-id|sense2-id\tbasic_types_class_pair
-        # The basic types correspond to the senses in the order given.  e.g.,
-        # abandon|00614907|00615748       abandon.31.1 give_up.31.0 * leave.31.5
-        with open(filename1) as fh1, open(filename2, 'w') as fh2:
-            lemma_list = []
-            for line in fh1:
-                lemma_len, cltype, lemmas = line.strip().split("\t")
-                for lemma in lemmas.split():
-                    lemma_list.append("%s\t%s\n" % (lemma, cltype))
-            for lemma in sorted(lemma_list):
-                fh2.write(lemma)
+    and those of the following files that exist:
+
+       data/corelex-VERSION-class_pair-nouns-all.tab
+       data/corelex-VERSION-lemma_pair-nouns-all.tab
+       data/corelex-VERSION-class_pair_glosses-nouns-all.tab
+       data/corelex-VERSION-class_pair_glosses-nouns-sampleN.tab
+       data/corelex-VERSION-class_pair_counts-nouns-all.tab
+
+    The result is the same as creating the files from scratch with the new
+    inventory. Verb files are left alone since the basic types of verbs do not
+    depend on the inventory.
+
+    The WordNet instance does not need to have basic types. The old inventory
+    is added without propagating it down the hyponym trees, instead the basic
+    types of the synsets of the lemmas that are processed are taken from their
+    ancestors. Afterwards the WordNet instance has the new inventory, but only
+    synsets of processed lemmas have all their basic types.
+
+    Instance variables, besides those of CoreLexTypeGenerator that are needed
+    for writing the files:
+
+    old_btypes, new_btypes
+        The old and the new basic type inventory.
+
+    updated_lemmas
+        Sorted list of the lemmas that were processed again.
+
+    changes
+        List of (lemma, old class, new class) tuples for the updated lemmas
+        that changed class.
+
+    """
+
+    def __init__(self, wordnet, btypes=None, output_dir='data'):
+        self.wordnet = wordnet
+        self.category = NOUN
+        self.output_dir = output_dir
+        self.version = wordnet.version
+        self.cl_version = get_corelex_version(wordnet.version)
+        self.wn_lemma_idx = wordnet.lemma_index()
+        self.wn_synset_idx = wordnet.synset_index()
+        self.compression = self._find_compression()
+        self.old_btypes = self.read_basic_types()
+        self.new_btypes = cltypes.get_basic_types(self.version) if btypes is None else btypes
+        self.lemma_index = self._read_lemmas()
+        self.class_index = {}
+        self.basic_types = []
+        self.updated_lemmas = []
+        self.changes = []
+        self._reset_class_pairs()
+        old_shard, new_shard = self._update_lemmas()
+        self._update_cltypes(old_shard, new_shard)
+        self.pp_cltypes()
+        self.write_cltypes()
+        self.write_basic_types()
+        if os.path.exists(find_file(self.corelex_lemma_pair_file(NOUN))):
+            self._update_lemma_pairs(new_shard)
+        if os.path.exists(find_file(self.corelex_class_pair_file(NOUN))):
+            self._update_class_pairs(old_shard, new_shard)
+        if os.path.exists(find_file(self.corelex_class_pair_counts_file(NOUN))):
+            self._update_clpair_counts(old_shard, new_shard)
+        self.pp_changes()
+
+    def _find_compression(self):
+        """Return the compression of the existing pair files, so they are written
+        back the same way."""
+        for filename in (self.corelex_class_pair_file(NOUN), self.corelex_lemma_pair_file(NOUN),
+                         self.corelex_class_pair_counts_file(NOUN)):
+            extension = compression_extension(find_file(filename))
+            if extension:
+                return extension[1:]
+        return None
+
+    def read_basic_types(self):
+        """Read the inventory written by write_basic_types()."""
+        inventory = {}
+        with open_file(self.corelex_basic_types_file(NOUN)) as fh:
+            for line in fh:
+                btype, synset_id, members = line.rstrip('\n').split('\t')
+                inventory.setdefault(btype, []).append((synset_id, members))
+        return inventory
+
+    def _read_lemmas(self):
+        """Read the lemmas file, which for nouns has all lemmas in alphabetical
+        order."""
+        lemma_index = {}
+        with open_file(self.corelex_lemma_file(NOUN)) as fh:
+            for line in fh:
+                lemma, cl_class = line.rstrip('\n').split('\t')
+                lemma_index[lemma] = cl_class
+        return lemma_index
+
+    def _reset_class_pairs(self):
+        self.class_pairs = []
+        self.class_pair_counts = array('i')
+        self._class_pair_ids = {}
+
+    def _class_pair_id(self, name):
+        """Return the identifier for a class pair name like 'art * phm', adding the
+        class pair if needed."""
+        class_pair_id = self._class_pair_ids.get(name)
+        if class_pair_id is None:
+            bt1, bt2 = name.split(' * ')
+            class_pair_id = len(self.class_pairs)
+            self._class_pair_ids[name] = class_pair_id
+            self.class_pairs.append((self._basic_type_ids[bt1], self._basic_type_ids[bt2]))
+            self.class_pair_counts.append(0)
+        return class_pair_id
+
+    def _shard_class_pair_names(self, shard):
+        return ["%s * %s" % (self.basic_types[bt1], self.basic_types[bt2])
+                for bt1, bt2 in shard.class_pairs]
+
+    def _update_lemmas(self):
+        """Find the lemmas with a synset in the changed hyponym trees and return two
+        LemmaShards for those lemmas, the first with their classes and sense
+        pairs for the old inventory and the second for the new one."""
+        wordnet = self.wordnet
+        wordnet.reset_nominal_basic_types()
+        wordnet.add_nominal_basic_types(self.old_btypes, propagate=False)
+        subtrees = set([synset.id for synset in wordnet.basic_type_subtrees(self.new_btypes)])
+        lemma_idx = self.wn_lemma_idx[NOUN]
+        synset_idx = self.wn_synset_idx[NOUN]
+        self.updated_lemmas = sorted([lemma for lemma, word in lemma_idx.items()
+                                      if not subtrees.isdisjoint(word.synsets)])
+        type_relations = cltypes.get_type_relations(self.version)
+        inherited = {}
+        for lemma in self.updated_lemmas:
+            for synset_id in lemma_idx[lemma].synsets:
+                synset_idx[synset_id].inherit_basic_types(type_relations, inherited)
+        names = set(self.old_btypes) | set(self.new_btypes)
+        self.basic_types = sorted(names, key=lambda name: name + '|')
+        self._basic_type_ids = {name: i for i, name in enumerate(self.basic_types)}
+        old_shard = LemmaShard(0, self.updated_lemmas)
+        old_shard.generate(wordnet, NOUN, self._basic_type_ids)
+        wordnet.update_nominal_basic_types(self.new_btypes)
+        new_shard = LemmaShard(0, self.updated_lemmas)
+        new_shard.generate(wordnet, NOUN, self._basic_type_ids)
+        print("Updating %d of %d lemmas with a synset in %d changed synsets"
+              % (len(self.updated_lemmas), len(lemma_idx), len(subtrees)))
+        return old_shard, new_shard
+
+    def _update_cltypes(self, old_shard, new_shard):
+        for lemma, old_class, new_class in zip(self.updated_lemmas, old_shard.classes,
+                                               new_shard.classes):
+            self.lemma_index[lemma] = new_class
+            if new_class != old_class:
+                self.changes.append((lemma, old_class, new_class))
+        for lemma, cl_class in self.lemma_index.items():
+            self.class_index.setdefault(cl_class, []).append(lemma)
+
+    def _update_lemma_pairs(self, shard):
+        """Replace the lines of the updated lemmas in the lemma_pair file. The lines
+        in the file are sorted, so the new lines can be merged in."""
+        filename = find_file(self.corelex_lemma_pair_file(NOUN))
+        print("Updating", filename)
+        updated = set(self.updated_lemmas)
+        names = self._shard_class_pair_names(shard)
+        new_lines = sorted(["%s|%08d|%08d\t%s\n" % (self.updated_lemmas[lemma_id], offset1,
+                                                    offset2, names[class_pair_id])
+                            for lemma_id, class_pair_id, offset1, offset2
+                            in zip(shard.pair_lemmas, shard.pair_classes,
+                                   shard.pair_synsets1, shard.pair_synsets2)])
+        # the new file gets the same name in a temporary directory, so it is
+        # compressed the same way and a gzip header has the right file name
+        with tempfile.TemporaryDirectory(dir=os.path.dirname(filename) or '.') as directory:
+            temporary = os.path.join(directory, os.path.basename(filename))
+            with open_file(filename) as fh, open_file(temporary, 'w') as out:
+                old_lines = (line for line in fh if line.split('|', 1)[0] not in updated)
+                out.writelines(heapq.merge(old_lines, new_lines))
+            os.replace(temporary, filename)
+
+    def _update_class_pairs(self, old_shard, new_shard):
+        """Update the class_pair and glosses files. Class pairs that do not occur
+        in the old or new sense pairs of the updated lemmas are copied from the
+        old files, for the others the sense pairs of the updated lemmas are
+        removed and their new sense pairs are merged in. The lines for each class
+        pair are first copied to a temporary file (as in _get_sorted_senses())
+        and then written in the order of the new counts. Sampled glosses files
+        are created again from the updated class pairs."""
+        filename1 = find_file(self.corelex_class_pair_file(NOUN))
+        filename3 = find_file(self.corelex_lemma_pair_glosses_file(NOUN))
+        all_glosses = os.path.exists(filename3)
+        print("Updating", filename1)
+        if all_glosses:
+            print("Updating", filename3)
+        updated = set(self.updated_lemmas)
+        changed = set(self._shard_class_pair_names(old_shard))
+        names = self._shard_class_pair_names(new_shard)
+        changed.update(names)
+        new_senses = {}
+        for lemma_id, class_pair_id, offset1, offset2 in zip(
+                new_shard.pair_lemmas, new_shard.pair_classes,
+                new_shard.pair_synsets1, new_shard.pair_synsets2):
+            new_senses.setdefault(names[class_pair_id], []).append(
+                (self.updated_lemmas[lemma_id], offset1, offset2))
+        synset_idx = self.wn_synset_idx[NOUN]
+        self._reset_class_pairs()
+        with tempfile.TemporaryFile('w+') as fh:
+            positions = {}
+
+            def add_class_pair(name, count, sense_pairs, gloss_lines):
+                # the glosses lines are stored without the count and the /n[n]/
+                # marker, there are none if there is no glosses file for all pairs
+                class_pair_id = self._class_pair_id(name)
+                self.class_pair_counts[class_pair_id] = count
+                positions[class_pair_id] = fh.tell()
+                fh.write(sense_pairs + "\n")
+                fh.writelines(gloss_lines)
+
+            def format_senses(name, senses):
+                # (sense, sense pair, glosses line) tuples for new sense pairs
+                return [((lemma, offset1, offset2),
+                         "%s|%08d|%08d" % (lemma, offset1, offset2),
+                         "\t%s\t|%s|\t%08d|%08d\t%s | %s\n"
+                         % (name, lemma, offset1, offset2,
+                            synset_idx['%08d' % offset1].gloss,
+                            synset_idx['%08d' % offset2].gloss) if all_glosses else None)
+                        for lemma, offset1, offset2 in senses]
+
+            def add_senses(name, senses):
+                if senses:
+                    add_class_pair(name, len(senses), ' '.join([sense[1] for sense in senses]),
+                                   [sense[2] for sense in senses] if all_glosses else [])
+
+            with open_file(filename1) as fh1, open_file(filename3 if all_glosses else os.devnull) as fh3:
+                for line in fh1:
+                    count, name, sense_pairs = line.rstrip('\n').split('\t')
+                    gloss_lines = []
+                    if all_glosses:
+                        gloss_lines = [fh3.readline()[len(count):] for i in range(int(count))]
+                        gloss_lines[0] = gloss_lines[0][:gloss_lines[0].rindex('\t')] + "\n"
+                    if name not in changed:
+                        add_class_pair(name, int(count), sense_pairs, gloss_lines)
+                        continue
+                    senses = []
+                    for sense_pair, gloss_line in itertools.zip_longest(sense_pairs.split(' '),
+                                                                        gloss_lines):
+                        lemma, offset1, offset2 = sense_pair.rsplit('|', 2)
+                        if lemma not in updated:
+                            senses.append(((lemma, int(offset1), int(offset2)), sense_pair, gloss_line))
+                    new = format_senses(name, new_senses.pop(name, []))
+                    add_senses(name, list(heapq.merge(senses, new, key=itemgetter(0))))
+            for name in sorted(new_senses):
+                add_senses(name, format_senses(name, new_senses[name]))
+
+            class_pair_names = [self.format_class_pair(i) for i in range(len(self.class_pairs))]
+            l_class_pair = self._sorted_class_pairs(class_pair_names)
+            with open_file(filename1, 'w') as fh1, \
+                    open_file(filename3 if all_glosses else os.devnull, 'w') as fh3:
+                for n, (count, class_pair_id) in enumerate(l_class_pair, 1):
+                    fh.seek(positions[class_pair_id])
+                    fh1.write("%i\t%s\t%s" % (count, class_pair_names[class_pair_id], fh.readline()))
+                    if all_glosses:
+                        gloss_line = fh.readline()
+                        fh3.write("%i%s\t/n%i/\n" % (count, gloss_line[:-1], n))
+                        for i in range(count - 1):
+                            fh3.write("%i%s" % (count, fh.readline()))
+
+            def get_senses(class_pair_id):
+                fh.seek(positions[class_pair_id])
+                for sense_pair in fh.readline().split():
+                    lemma, offset1, offset2 = sense_pair.rsplit('|', 2)
+                    yield lemma, int(offset1), int(offset2)
+
+            for sample_size in self._sample_sizes():
+                filename = find_file(self.corelex_lemma_pair_glosses_sample_file(NOUN, sample_size))
+                print("Writing", filename)
+                glosses = {int(offset): synset.gloss for offset, synset in synset_idx.items()}
+                with open_file(filename, 'w') as fh3:
+                    for n, (count, class_pair_id) in enumerate(l_class_pair, 1):
+                        pair = class_pair_names[class_pair_id]
+                        senses = self._sample_senses(pair, get_senses(class_pair_id), sample_size)
+                        self._write_glosses(fh3, n, count, pair, senses, glosses)
+
+    def _sample_sizes(self):
+        """Return the sample sizes of the sampled glosses files that exist."""
+        prefix = self.corelex_lemma_pair_glosses_sample_file(NOUN, 0)[:-len('0.tab')]
+        sizes = []
+        for filename in glob.glob(prefix + '*.tab') + glob.glob(prefix + '*.tab.*'):
+            size = filename[len(prefix):].split('.', 1)[0]
+            if size.isdigit():
+                sizes.append(int(size))
+        return sorted(set(sizes))
+
+    def _update_clpair_counts(self, old_shard, new_shard):
+        """Subtract the counts of the updated lemmas for the old inventory from the
+        counts in the class_pair_counts file and add those for the new one."""
+        counts = {}
+        with open_file(self.corelex_class_pair_counts_file(NOUN)) as fh:
+            for line in fh:
+                count, name = line.rstrip('\n').split('\t')
+                counts[name] = int(count)
+        for shard, sign in ((old_shard, -1), (new_shard, 1)):
+            for name, count in zip(self._shard_class_pair_names(shard), shard.class_pair_counts):
+                counts[name] = counts.get(name, 0) + sign * count
+        self._reset_class_pairs()
+        for name, count in counts.items():
+            if count > 0:
+                self.class_pair_counts[self._class_pair_id(name)] = count
+        self.write_clpair_counts()
+
+    def pp_changes(self):
+        print("\nUpdated %d lemmas, %d changed class" % (len(self.updated_lemmas), len(self.changes)))
+        for lemma, old_class, new_class in self.changes:
+            print("   %s\t%s ==> %s" % (lemma, old_class, new_class))
+
+
+# Secondary keys of the tables in browser/schema.sql, the load script drops them
+# before loading the data and adds them again afterwards, which is much faster
+# than updating the keys for each row.
+SECONDARY_KEYS = {
+    'basic_types': [('basic_type', 'basic_type')],
+    'nouns': [('corelex_type', 'corelex_type'), ('polysemous_type', 'polysemous_type')]}
 
-        print("Writing", filename3)
-        
-        # Output is of the form: length\basic_class_pair\lemma\sense_offsets\gloss1\gloss2
-        # e.g., 1503    change.30.0 * change.30.1 alter.30.1 modify.30.a        abate
-        # 00245945|00246175       become less in amount or intensity; "The storm abated";
-        # "The rain let up after a few hours"     make less active or intense
-        
-        with open(filename3, 'w') as fh3:
-            # track the last basic_class pair seen.  We will add a field
-            # of /n[n]/ at the end if the basic_class changes. [n] is an ascending
-            # count.  The idea is to make it easy to search for the next class pair
-            # if the file is opened in an editor.  We can search either for /n to get
-            # to the next class pair or for /n35/ to get to the start of the 35th class pair.
-            last_pair = ""
-            count = 1
-            for class_pair in l_class_pair:
-                length = class_pair[0]
-                pair = class_pair[1]
-                for lemma_sense_pair in class_pair[2]:
-                    lemma, sense1, sense2 = lemma_sense_pair.split("|")
-                    senses = "|".join([sense1, sense2])
-                    # use the word sense offsets to fetch the gloss for each sense
-                    if category == VERB:
-                        s1_gloss = self.wordnet.get_verb_synset(sense1).gloss
-                        s2_gloss = self.wordnet.get_verb_synset(sense2).gloss
-                    elif category == NOUN:
-                        s1_gloss = self.wordnet.get_noun_synset(sense1).gloss
-                        s2_gloss = self.wordnet.get_noun_synset(sense2).gloss
-
-                    fh3.write("%i\t%s\t|%s|\t%s\t%s | %s" % (length, pair, lemma, senses, s1_gloss, s2_gloss))
-                    if class_pair != last_pair:
-                        # add a marker to the file
-                        fh3.write("\t/n%i/\n" % count)
-                        count += 1
-                        last_pair = class_pair
-                    else:
-                        # just terminate the line
-                        fh3.write("\n")
-
-
-    def pp_verbs(self):
-        filename = self.corelex_cltype_file(VERB, 'txt')
-        print("Writing", filename)
-        fh = open(filename, 'w')
-        tw = textwrap.TextWrapper(width=80, initial_indent="  ", subsequent_indent="  ")
-        for cl_class in sorted(self.class_index.keys()):
-            if '*' in cl_class and len(self.class_index[cl_class]) > 4:
-                fh.write("%s\n\n" % cl_class)
-                for line in tw.wrap(' '.join(self.class_index[cl_class])):
-                    fh.write(line + "\n")
-                fh.write("\n")
 
-    
 class CoreLex(object):
 
+    """CoreLex loaded from the cltypes file created by CoreLexTypeGenerator, with
+    methods to export it to the tables of the CoreLex browser.
+
+    Instance variables:
+
+    lemma_index
+        { lemma ==> polysemous type }
+
+    class_index
+        { polysemous type ==> list of lemmas }
+
+    """
+
     def __init__(self, version='3.1', category=NOUN, wordnet=None):
         self.category = expand(category)
         self.version = version
@@ -688,8 +1457,9 @@ class CoreLex(object):
                 self.class_to_corelex_type[class_] = cltype
 
     def _load_corelex(self):
-        data_file = "data/corelex-%s-%ss.tab" % (self.version, self.category)
-        with open(data_file) as fh:
+        data_file = "data/corelex-%s-cltypes-%ss.tab" \
+                    % (get_corelex_version(self.version), self.category)
+        with open_file(data_file) as fh:
             for line in fh:
                 corelex_class, words = line.strip().split("\t")
                 for word in words.split():
@@ -698,37 +1468,76 @@ class CoreLex(object):
             print("Loaded %d words and %d CoreLex classes\n"
                   % (len(self.lemma_index), len(self.class_index)))
 
-    def write_tables(self):
-        basic_types_sql = "sql/corelex-%s-basic-types-%ss.sql" \
-                          % (self.version, self.category)
-        nouns_sql = "sql/corelex-%s-lemmas-%ss.sql" % (self.version, self.category)
-        if self.version == "1.5":
-            basic_types = cltypes.BASIC_TYPES_1_5
-        else:
-            basic_types = cltypes.BASIC_TYPES_3_1
-        bt_table = open(basic_types_sql, 'w')
-        string_buffer = io.StringIO()
-        bt_table.write("INSERT INTO basic_types " +
-                       "(basic_type, synset_number, synset_elements) VALUES\n")
+    def _basic_type_rows(self):
+        basic_types = cltypes.get_basic_types(self.version)
         for btype in sorted(basic_types):
             for synset_number, synset_elements in basic_types[btype]:
-                string_buffer.write("   ('%s', %d, '%s'),\n"
-                                    % (btype, int(synset_number), synset_elements))
-        bt_table.write(string_buffer.getvalue()[:-2] + ";\n")
-        bt_table.close()
-        string_buffer.close()
-        noun_table = open(nouns_sql, 'w')
-        string_buffer = io.StringIO()
-        noun_table.write("INSERT INTO nouns (noun, corelex_type, polysemous_type) VALUES\n")
-        for word in self.lemma_index:
+                yield btype, int(synset_number), synset_elements
+
+    def _lemma_rows(self):
+        # sorted on the primary key, which InnoDB loads fastest
+        for word in sorted(self.lemma_index):
             pclass = self.lemma_index[word]
-            cltype = self.class_to_corelex_type.get(pclass, '-')
-            string_buffer.write("   ('%s', '%s', '%s'),\n"
-                                % (word.replace("'", r"\'"), cltype, pclass))
-        noun_table.write(string_buffer.getvalue()[:-2] + ";\n")
-        noun_table.close()
-        print("Wrote %d types to file %s" % (len(basic_types), basic_types_sql))
-        print("Wrote %d words to file %s\n" % (len(self.lemma_index), nouns_sql))
+            yield word, self.class_to_corelex_type.get(pclass, '-'), pclass
+
+    def _tables(self):
+        """Return a list of (table name, columns, rows) triples."""
+        return [('basic_types', ('basic_type', 'synset_number', 'synset_elements'),
+                 self._basic_type_rows()),
+                ('%ss' % self.category, (self.category, 'corelex_type', 'polysemous_type'),
+                 self._lemma_rows())]
+
+    def _table_file(self, sql_dir, table, extension):
+        name = 'basic-types' if table == 'basic_types' else 'lemmas'
+        return "%s/corelex-%s-%s-%ss.%s" \
+               % (sql_dir, self.version, name, self.category, extension)
+
+    def write_tables(self, tsv=False, batch_size=1000, sql_dir='sql'):
+        """Write the basic types and lemmas tables of browser/schema.sql. By
+        default the tables are written as SQL files with INSERT statements of at
+        most batch_size rows each. With tsv the tables are written as tab-separated
+        files for LOAD DATA LOCAL INFILE, together with a script that loads them.
+        Rows are streamed to the files so they are never all in memory."""
+        os.makedirs(sql_dir, exist_ok=True)
+        for table, columns, rows in self._tables():
+            if tsv:
+                fname = self._table_file(sql_dir, table, 'tab')
+                count = write_tsv_table(fname, rows)
+            else:
+                fname = self._table_file(sql_dir, table, 'sql')
+                count = write_insert_table(fname, table, columns, rows, batch_size)
+            print("Wrote %d rows to file %s" % (count, fname))
+        if tsv:
+            self.write_load_script(sql_dir)
+        print()
+
+    def write_load_script(self, sql_dir='sql'):
+        """Write a script that loads the tab-separated files written by
+        write_tables() into empty tables. The secondary keys are dropped before
+        the load and added again afterwards. Run it from the directory with the
+        files using mysql --local-infile=1."""
+        fname = "%s/corelex-%s-load-%ss.sql" % (sql_dir, self.version, self.category)
+        with open(fname, 'w') as fh:
+            fh.write("SET unique_checks = 0;\nSET foreign_key_checks = 0;\n")
+            for table, columns, _ in self._tables():
+                keys = SECONDARY_KEYS.get(table, [])
+                fh.write("\nTRUNCATE TABLE `%s`;\n" % table)
+                if keys:
+                    fh.write("ALTER TABLE `%s`\n    %s;\n"
+                             % (table, ",\n    ".join(["DROP KEY `%s`" % key for key, _ in keys])))
+                fh.write("LOAD DATA LOCAL INFILE '%s'\n"
+                         "    INTO TABLE `%s`\n"
+                         "    CHARACTER SET utf8mb4\n"
+                         "    FIELDS TERMINATED BY '\\t' ESCAPED BY '\\\\'\n"
+                         "    LINES TERMINATED BY '\\n'\n"
+                         "    (%s);\n"
+                         % (os.path.basename(self._table_file(sql_dir, table, 'tab')),
+                            table, ', '.join(["`%s`" % c for c in columns])))
+                if keys:
+                    fh.write("ALTER TABLE `%s`\n    %s;\n"
+                             % (table, ",\n    ".join(["ADD KEY `%s` (`%s`)" % key for key in keys])))
+            fh.write("\nSET foreign_key_checks = 1;\nSET unique_checks = 1;\n")
+        print("Wrote load script %s" % fname)
 
     def pp_summary(self):
         total_count = 0
@@ -738,17 +1547,240 @@ class CoreLex(object):
         print("TOTAL\t%d" % total_count)
 
 
+# characters that MySQL needs escaped with a backslash, in string literals and
+# in files for LOAD DATA with the default FIELDS ESCAPED BY '\\'
+_SQL_ESCAPES = {'\\': '\\\\', "'": "\\'", '\0': '\\0', '\n': '\\n', '\r': '\\r', '\x1a': '\\Z'}
+_TSV_ESCAPES = {'\\': '\\\\', '\t': '\\t', '\0': '\\0', '\n': '\\n', '\r': '\\r'}
+
+
+def sql_value(value):
+    """Return the value as an SQL literal."""
+    if isinstance(value, int):
+        return str(value)
+    return "'%s'" % ''.join([_SQL_ESCAPES.get(c, c) for c in value])
+
+
+def tsv_field(value):
+    """Return the value as a field for LOAD DATA INFILE."""
+    return ''.join([_TSV_ESCAPES.get(c, c) for c in str(value)])
+
+
+def write_insert_table(fname, table, columns, rows, batch_size=1000):
+    """Write the rows as INSERT statements for the table with at most batch_size
+    rows each, which keeps each statement well below max_allowed_packet. Returns
+    the number of rows."""
+    header = "INSERT INTO `%s` (%s) VALUES\n" % (table, ', '.join(["`%s`" % c for c in columns]))
+    count = 0
+    with open(fname, 'w') as fh:
+        for batch in _batches(rows, batch_size):
+            fh.write(header)
+            fh.write(",\n".join(["   (%s)" % ', '.join([sql_value(v) for v in row])
+                                 for row in batch]))
+            fh.write(";\n")
+            count += len(batch)
+    return count
+
+
+def write_tsv_table(fname, rows):
+    """Write the rows to a tab-separated file for LOAD DATA INFILE. Returns the
+    number of rows."""
+    count = 0
+    with open(fname, 'w') as fh:
+        for row in rows:
+            fh.write('\t'.join([tsv_field(v) for v in row]) + '\n')
+            count += 1
+    return count
+
+
+def _batches(items, size):
+    items = iter(items)
+    while True:
+        batch = list(itertools.islice(items, size))
+        if not batch:
+            return
+        yield batch
+
+
+class CoreLexLookup(object):
+
+    """Looks up lemmas in a lemmas file created by CoreLexTypeGenerator without
+    reading the file. The file is memory-mapped and since it is sorted on the
+    lemmas a lemma is found with a binary search over the bytes of the file,
+    where each probe moves back to the start of its line. Opening a lookup takes
+    the same time for any size of the file and there are no Python objects for
+    the lemmas in the file, pages of the file are read by the operating system
+    when they are needed. CoreLex types come from cltypes.CORELEX_TYPES, which
+    only has types for nouns.
+
+       >>> cl = CoreLexLookup()
+       >>> cl.lookup('door')
+       >>> cl.lookup_batch(['door', 'chicken', 'xyzzy'])
+
+    The first returns a pair of polysemous type and CoreLex type, the second a
+    dictionary with such a pair for each lemma, or None for lemmas that are not
+    in the file.
+
+    Instance variables:
+
+    filename
+        The lemmas file, data/corelex-VERSION-lemmas-CATEGORYs.tab.
+
+    class_to_corelex_type
+        { polysemous type ==> CoreLex type }
+
+    """
+
+    def __init__(self, version=CORELEX_VERSION, category=NOUN, data_dir='data'):
+        self.version = version
+        self.category = category
+        self.filename = "%s/corelex-%s-lemmas-%ss.tab" % (data_dir, version, category)
+        self.class_to_corelex_type = {}
+        for cltype, classes in cltypes.CORELEX_TYPES.items():
+            for class_ in classes:
+                self.class_to_corelex_type[class_] = cltype
+        self._fh = open(self.filename, 'rb')
+        if os.path.getsize(self.filename) > 0:
+            self._data = mmap.mmap(self._fh.fileno(), 0, access=mmap.ACCESS_READ)
+        else:
+            # an empty file cannot be mapped but behaves the same as empty bytes
+            self._data = b''
+
+    def __str__(self):
+        return "<CoreLexLookup %s>" % self.filename
+
+    def close(self):
+        if isinstance(self._data, mmap.mmap):
+            self._data.close()
+        self._fh.close()
+
+    def _find(self, key, lo=0):
+        """Return the offset of the first line whose lemma is not smaller than the
+        key, which is an encoded lemma. The search starts at lo, which has to be
+        the start of a line."""
+        data = self._data
+        hi = len(data)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            start = data.rfind(b'\n', lo, mid) + 1 or lo
+            if data[start:data.find(b'\t', start)] < key:
+                end = data.find(b'\n', start)
+                lo = end + 1 if end >= 0 else hi
+            else:
+                hi = start
+        return lo
+
+    def _class_at(self, offset, key):
+        """Return the polysemous type on the line at the offset if the line is for
+        the key, return None otherwise."""
+        data = self._data
+        tab = data.find(b'\t', offset)
+        if tab < 0 or data[offset:tab] != key:
+            return None
+        end = data.find(b'\n', tab)
+        return data[tab+1:end if end >= 0 else len(data)].decode('utf-8')
+
+    def _result(self, polysemous_type):
+        if polysemous_type is None:
+            return None
+        return polysemous_type, self.class_to_corelex_type.get(polysemous_type)
+
+    def get_polysemous_type(self, lemma):
+        """Return the polysemous type of the lemma or None if the lemma is not in
+        the file."""
+        key = normalize_lemma(lemma).encode('utf-8')
+        return self._class_at(self._find(key), key)
+
+    def lookup(self, lemma):
+        """Return a pair of the polysemous type and the CoreLex type of the lemma,
+        or None if the lemma is not in the file. The CoreLex type is None if the
+        polysemous type is not part of a CoreLex type."""
+        return self._result(self.get_polysemous_type(lemma))
+
+    def lookup_batch(self, lemmas):
+        """Return a dictionary with the result of lookup() for each lemma. The
+        lemmas are looked up in sorted order, so each search can start where the
+        previous one ended."""
+        keys = {lemma: normalize_lemma(lemma).encode('utf-8') for lemma in lemmas}
+        results = {}
+        offset = 0
+        for key in sorted(set(keys.values())):
+            offset = self._find(key, offset)
+            results[key] = self._result(self._class_at(offset, key))
+        return {lemma: results[key] for lemma, key in keys.items()}
+
+
 class BasicTypeRelations(object):
 
-    def __init__(self, wordnet, category):
+    """Relations between basic types, either taken from the relations created by
+    WordNet.get_all_basic_type_relations() or from the files written by the
+    function write_basic_type_relations(). The RelationCube in the npz file is
+    used if it exists and NumPy is available, otherwise the text files are read.
+
+    Instance variables:
+
+    btrels1
+        { (basic type, basic type) ==> { pointer symbol ==> count } }, only for
+        pairs of different basic types.
+
+    btrels2
+        { (basic type, basic type) ==> list of ChiSquaredCell }, the significant
+        relations, filled in by collect_significant_relations().
+
+    allrels
+        { "bt1-bt2" ==> list of [bt1, pointer symbol, bt2, synset1, synset2] }
+
+    relation_index
+        { "bt1-bt2" ==> { pointer symbol ==> { synset1 id ==> [synset1, list of
+        synset2] } } }, the relations of allrels grouped on pointer symbol and
+        source synset, in the order of allrels.
+
+    """
+
+    def __init__(self, wordnet, category, bt_relations=None, bt_relation_index=None):
         self.wordnet = wordnet
         self.version = wordnet.version
         self.category = category
         self.btrels1 = {}                  # basic type relations
         self.btrels2 = {}                  # significant basic type relations
         self.allrels = {}                  # all relations
-        self._read_basic_type_relations()  # fill in self.btrels1
-        self._read_relations()             # fill in self.allrels
+        cube_file = relation_cube_file(self.version, category)
+        if bt_relations is None and signatures.numpy is not None and os.path.exists(cube_file):
+            self._add_cube(load_relation_cube(cube_file))
+        elif bt_relations is None:
+            self._read_basic_type_relations()  # fill in self.btrels1
+            self._read_relations()             # fill in self.allrels
+        else:
+            if bt_relation_index is None:
+                bt_relation_index = _create_basic_type_relations_summary(bt_relations)
+            self._add_basic_type_relations(bt_relation_index)
+            self._add_relations(bt_relations)
+        self.relation_index = {}
+        self._index_relations()
+
+    def _add_basic_type_relations(self, bt_relation_index):
+        """Fill in self.btrels1 from the index created by the function
+        _create_basic_type_relations_summary(), in the same order as when reading
+        the basic type relations file."""
+        for pair in sorted(bt_relation_index.keys()):
+            if pair[0] != pair[1]:
+                self.btrels1[pair] = dict(bt_relation_index[pair])
+
+    def _add_cube(self, cube):
+        """Fill in self.btrels1 and self.allrels from a RelationCube."""
+        for pair, pointers in cube.signatures().items():
+            if pair[0] != pair[1]:
+                self.btrels1[pair] = pointers
+        get_synset = self.wordnet.get_noun_synset
+        for bt1, pointer, bt2, ss1_id, ss2_id in cube.iter_relations():
+            self.allrels.setdefault("%s-%s" % (bt1, bt2), []).append(
+                [bt1, pointer, bt2, get_synset(ss1_id), get_synset(ss2_id)])
+
+    def _add_relations(self, bt_relations):
+        """Fill in self.allrels from the list of 5-tuples created by the method
+        WordNet.get_all_basic_type_relations()."""
+        for bt_relation in bt_relations:
+            basic_rel = "%s-%s" % (bt_relation[0], bt_relation[2])
+            self.allrels.setdefault(basic_rel, []).append(bt_relation)
 
     def _read_basic_type_relations(self):
         """Read the relations between basic types from file and return the relations as
@@ -756,7 +1788,7 @@ class BasicTypeRelations(object):
         pointer symbols and their counts."""
         fname = "data/corelex-%s-%ss-basic-type-relations.txt" \
                 % (self.version, expand(self.category))
-        for line in open(fname):
+        for line in open_file(fname):
             fields = line.strip().split("\t")
             types = fields.pop(0)
             rel = tuple(types.split('-'))
@@ -773,7 +1805,7 @@ class BasicTypeRelations(object):
         """Read all the relations from the data/corelex-VERSION-CATEGORY-relations.txt
         file and return them as a dictionary indexed on the basic type pair."""
         fname = "data/corelex-%s-%ss-relations.txt" % (self.version, expand(self.category))
-        with open(fname) as fh:
+        with open_file(fname) as fh:
             for line in fh:
                 fields = line.strip().split("\t")
                 bt1, pointer, bt2, ss1_id, ss2_id = fields
@@ -783,6 +1815,21 @@ class BasicTypeRelations(object):
                 # if pointer[0] in ('#', '%'):
                 self.allrels.setdefault(basic_rel, []).append([bt1, pointer, bt2, ss1, ss2])
 
+    def _index_relations(self):
+        """Fill in self.relation_index from self.allrels."""
+        for basic_rel, rels in self.allrels.items():
+            index = self.relation_index.setdefault(basic_rel, {})
+            for rel in rels:
+                source = rel[3]
+                grouped_rels = index.setdefault(rel[1], {})
+                grouped_rels.setdefault(source.id, [source, []])[1].append(rel[4])
+
+    def get_relations(self, bt1, bt2, pointer):
+        """Return a list of [source synset, list of target synsets] pairs for the
+        relations with the pointer symbol from synsets of basic type bt1 to synsets
+        of basic type bt2."""
+        return list(self.relation_index.get("%s-%s" % (bt1, bt2), {}).get(pointer, {}).values())
+
     def calculate_distribution(self):
         """Return a distribution of all relations in all basic type pairs. This will be
         used to compare the distributions of individual pairs to."""
@@ -792,9 +1839,19 @@ class BasicTypeRelations(object):
                 self.distribution.add(pointer, count)
         self.distribution.finish()
 
-    def collect_significant_relations(self):
+    def collect_significant_relations(self, vectorized=None):
         """Return a dictionary indexed on type pairs with for each pair the relations
-        that occur significantly more often than in WordNet overall."""
+        that occur significantly more often than in WordNet overall. If NumPy is
+        available all pairs are tested at once with a ChiSquaredMatrix, which
+        gives the same results as testing them one by one, use vectorized=False
+        to test them one by one anyway."""
+        if vectorized is None:
+            vectorized = statistics.numpy is not None
+        if vectorized:
+            matrix = ChiSquaredMatrix(self.btrels1, self.distribution)
+            self.btrels2.update(matrix.significant(min_observations=20, min_statistic=100,
+                                                   min_component=200))
+            return self.btrels2
         for pair, pointers in self.btrels1.items():
             di = Distribution('-'.join(pair))
             for pointer, count in pointers.items():
@@ -809,61 +1866,168 @@ class BasicTypeRelations(object):
                     cells.append(cell)
             if cells:
                 self.btrels2[pair] = cells
+        return self.btrels2
+
+    def collect_sparse_relations(self, alpha=0.05, permutations=10000, workers=1, seed=0):
+        """Test the pairs that collect_significant_relations() skips because they
+        have fewer than 20 relations with the exact and permutation tests of
+        SparseSignificance and add the pairs with significant relations to
+        self.btrels2. Returns a dictionary with just those pairs."""
+        sparse = {pair: pointers for pair, pointers in self.btrels1.items()
+                  if sum(pointers.values()) < 20}
+        tests = SparseSignificance(sparse, self.distribution, permutations=permutations,
+                                   seed=seed, workers=workers)
+        tests.run()
+        significant = tests.significant(alpha)
+        self.btrels2.update(significant)
+        print("Found %d significant pairs amongst %d pairs with few relations"
+              % (len(significant), len(sparse)))
+        return significant
 
 
 class RelationsWriter(object):
 
-    def __init__(self, basic_type_relations):
+    """Writes the html pages for the significant relations between basic types,
+    an index page and a page in the rels directory for each pair of basic types.
+    Pages are first rendered into a string and only written if their content
+    changed since the last run, the hashes of the pages are kept in a file in the
+    html directory. With more than one worker the pair pages are rendered in a
+    pool of worker processes.
+
+    Instance variables:
+
+    rendered, skipped
+        The number of pages written and the number of pages that were not
+        written because they did not change, set by write().
+
+    """
+
+    def __init__(self, basic_type_relations, workers=1):
         self.btr = basic_type_relations
+        self.workers = workers
         self.html_dir = "data/corelex-%s-%ss-basic-type-relations" \
                         % (self.btr.version, expand(self.btr.category))
         self.rels_dir = os.path.join(self.html_dir, 'rels')
         self.index_file = os.path.join(self.html_dir, "index.html")
+        self.hashes_file = os.path.join(self.html_dir, "hashes.tab")
         self.basic_types = cltypes.get_basic_types(self.btr.version)
+        self.rendered = 0
+        self.skipped = 0
 
     def write(self):
+        """Write the index page and the pair pages, returns the number of pages
+        written and the number of unchanged pages that were skipped."""
         self._ensure_directories()
-        with open(self.index_file, 'w') as fh:
-            categories = self.btr.distribution.get_categories()
-            fh.write("<html>\n")
-            self._write_head(fh)
-            fh.write("<body>\n")
-            self._write_symbol_table(fh, categories)
-            fh.write("<table cellpadding=5 cellspacing=0 border=1>\n")
-            fh.write("<tr align=center>\n")
-            fh.write("  <td>&nbsp;</td>\n")
-            fh.write("  <td>&nbsp;</td>\n")
+        old_hashes = self._read_hashes()
+        hashes = {}
+        self.rendered = self.skipped = 0
+        pages = itertools.chain([self._render_index(old_hashes)],
+                                self._render_relations(old_hashes))
+        for fname, digest, page in pages:
+            hashes[fname] = digest
+            if page is None:
+                self.skipped += 1
+            else:
+                with open(os.path.join(self.html_dir, fname), 'w') as fh:
+                    fh.write(page)
+                self.rendered += 1
+        # remove pages of pairs that are no longer significant
+        for fname in set(old_hashes) - set(hashes):
+            if os.path.exists(os.path.join(self.html_dir, fname)):
+                os.remove(os.path.join(self.html_dir, fname))
+        self._write_hashes(hashes)
+        print("Rendered %d pages and skipped %d unchanged pages in %s"
+              % (self.rendered, self.skipped, self.html_dir))
+        return self.rendered, self.skipped
+
+    def _read_hashes(self):
+        """Return { file name ==> hash } for the pages that were written by the
+        last run and still exist."""
+        hashes = {}
+        if os.path.exists(self.hashes_file):
+            with open(self.hashes_file) as fh:
+                for line in fh:
+                    fname, digest = line.rstrip('\n').split('\t')
+                    if os.path.exists(os.path.join(self.html_dir, fname)):
+                        hashes[fname] = digest
+        return hashes
+
+    def _write_hashes(self, hashes):
+        with open(self.hashes_file, 'w') as fh:
+            for fname in sorted(hashes):
+                fh.write("%s\t%s\n" % (fname, hashes[fname]))
+
+    def _render_relations(self, old_hashes):
+        """Generate a (file name, hash, page) triple for each pair page, where
+        the page is None if its hash is in old_hashes."""
+        pairs = sorted(self.btr.btrels2)
+        if self.workers > 1 and len(pairs) > 1:
+            global _render_context
+            _render_context = (self, old_hashes)
+            pool = multiprocessing.get_context('fork').Pool(self.workers)
+            try:
+                for result in pool.imap(_render_relation, pairs, chunksize=8):
+                    yield result
+            finally:
+                pool.terminate()
+                _render_context = None
+        else:
+            for pair in pairs:
+                yield self._render_relation(pair, old_hashes)
+
+    def _render_relation(self, pair, old_hashes):
+        bt1, bt2 = pair
+        name = "%s-%s" % (bt1, bt2)
+        fh = io.StringIO()
+        self._write_relation(fh, bt1, bt2, name, self.btr.btrels2[pair])
+        return _unless_unchanged(os.path.join('rels', name + '.html'), fh.getvalue(), old_hashes)
+
+    def _render_index(self, old_hashes):
+        fh = io.StringIO()
+        self._write_index(fh)
+        return _unless_unchanged("index.html", fh.getvalue(), old_hashes)
+
+    def _write_index(self, fh):
+        categories = self.btr.distribution.get_categories()
+        fh.write("<html>\n")
+        self._write_head(fh)
+        fh.write("<body>\n")
+        self._write_symbol_table(fh, categories)
+        fh.write("<table cellpadding=5 cellspacing=0 border=1>\n")
+        fh.write("<tr align=center>\n")
+        fh.write("  <td>&nbsp;</td>\n")
+        fh.write("  <td>&nbsp;</td>\n")
+        for cat in categories:
+            fh.write("  <td width=30>%s</td>\n" % cat)
+        fh.write("</tr>\n")
+        for pair in sorted(self.btr.btrels2):
+            cells = self.btr.btrels2[pair]
+            cell_categories = set([cell.category for cell in cells])
+            bt1, bt2 = pair
+            fh.write("<tr align=left>\n")
+            name = "%s-%s" % (bt1, bt2)
+            fh.write("  <td><a href=rels/%s.html><code>%s</code></a></td>\n"
+                     % (name, name))
+            fh.write("  <td>%s - %s</td>\n"
+                     % (_full_name(bt1), _full_name(bt2)))
             for cat in categories:
-                fh.write("  <td width=30>%s</td>\n" % cat)
+                val = "&check;" if cat in cell_categories else "&nbsp;"
+                fh.write("  <td align=center>%s</td>\n" % val)
             fh.write("</tr>\n")
-            for pair in sorted(self.btr.btrels2):
-                cells = self.btr.btrels2[pair]
-                cell_categories = set([cell.category for cell in cells])
-                bt1, bt2 = pair
-                fh.write("<tr align=left>\n")
-                name = "%s-%s" % (bt1, bt2)
-                fh.write("  <td><a href=rels/%s.html><code>%s</code></a></td>\n"
-                         % (name, name))
-                fh.write("  <td>%s - %s</td>\n"
-                         % (_full_name(bt1), _full_name(bt2)))
-                for cat in categories:
-                    val = "&check;" if cat in cell_categories else "&nbsp;"
-                    fh.write("  <td align=center>%s</td>\n" % val)
-                fh.write("</tr>\n")
-                self._write_relation(bt1, bt2, name, cells)
-            fh.write("</table>\n")
+        fh.write("</table>\n")
 
     def _write_symbol_table(self, fh, categories):
         fh.write("<table cellpadding=5 cellspacing=0 border=1>\n")
-        # there are 12 categoeirs and I want them in two columns
-        for i in range(6):
-            cat1 = categories[i]
-            cat2 = categories[i+6]
+        # there are usually 12 categories and I want them in two columns
+        rows = (len(categories) + 1) // 2
+        for i in range(rows):
             fh.write("<tr align=left>\n")
-            fh.write("  <td>%s</td>\n" % cat1)
-            fh.write("  <td>%s</td>\n" % POINTER_SYMBOLS.get(cat1))
-            fh.write("  <td>%s</td>\n" % cat2)
-            fh.write("  <td>%s</td>\n" % POINTER_SYMBOLS.get(cat2))
+            for cat in (categories[i], categories[i+rows] if i + rows < len(categories) else None):
+                if cat is None:
+                    fh.write("  <td>&nbsp;</td>\n  <td>&nbsp;</td>\n")
+                else:
+                    fh.write("  <td>%s</td>\n" % cat)
+                    fh.write("  <td>%s</td>\n" % POINTER_SYMBOLS.get(cat))
             fh.write("</tr>\n")
         fh.write("</table><p/>\n")
 
@@ -881,47 +2045,34 @@ class RelationsWriter(object):
         fh.write("</style>\n</head>\n")
 
     def _ensure_directories(self):
-        if not os.path.exists(self.html_dir):
-            os.makedirs(self.html_dir)
-            os.makedirs(self.rels_dir)
-
-    def _write_relation(self, bt1, bt2, name, cells):
-        fname = os.path.join(self.rels_dir, name + '.html')
-        with open(fname, 'w') as fh:
-            fh.write("<html>\n")
-            self._write_head(fh)
-            fh.write("<body>\n")
-            fh.write("<h2>%s-%s</h2>\n" % (bt1, bt2))
-            self._write_pair_description(fh, bt1, bt2)
-            fh.write('<p>Relations:')
-            for cell in cells:
-                fh.write(" [<a href=#%s>%s</a>]"
-                         % (cell.category, POINTER_SYMBOLS.get(cell.category)))
-            fh.write('</p>')
-            for cell in cells:
-                fh.write("<a name=%s></a>\n" % cell.category)
-                fh.write("<p>&bullet; %s  (%s)</p>\n"
-                         % (POINTER_SYMBOLS.get(cell.category), cell.category))
-                rels = self.btr.allrels[name]
-                grouped_rels = {}
-                for rel in rels:
-                    # If we skip this test we get a problem when, for example,
-                    # we have <ss1 #s ss2> and <ss2 %s ss1>. In that case the
-                    # results will also show <ss1 %s ss2> and <ss2 #s ss1>.
-                    if rel[1] == cell.category:
-                        source = rel[3]
-                        target = rel[4]
-                        grouped_rels.setdefault(source.id, [source, []])
-                        grouped_rels[source.id][1].append(target)
-                fh.write("<blockquote>\n<dl>\n")
-                for synset_id in grouped_rels:
-                    source, targets = grouped_rels[synset_id]
-                    fh.write("  <dt>%s</dt>\n" % source.as_html())
-                    fh.write("  <dd>\n")
-                    for target in targets:
-                        fh.write("%s<br/>" % target.as_html())
-                    fh.write("  </dd>\n")
-                fh.write("</dl>\n</blockquote>\n")
+        os.makedirs(self.rels_dir, exist_ok=True)
+
+    def _write_relation(self, fh, bt1, bt2, name, cells):
+        fh.write("<html>\n")
+        self._write_head(fh)
+        fh.write("<body>\n")
+        fh.write("<h2>%s-%s</h2>\n" % (bt1, bt2))
+        self._write_pair_description(fh, bt1, bt2)
+        fh.write('<p>Relations:')
+        for cell in cells:
+            fh.write(" [<a href=#%s>%s</a>]"
+                     % (cell.category, POINTER_SYMBOLS.get(cell.category)))
+        fh.write('</p>')
+        for cell in cells:
+            fh.write("<a name=%s></a>\n" % cell.category)
+            fh.write("<p>&bullet; %s  (%s)</p>\n"
+                     % (POINTER_SYMBOLS.get(cell.category), cell.category))
+            # Only relations with the pointer of the cell, otherwise, when we
+            # have for example <ss1 #s ss2> and <ss2 %s ss1>, the results would
+            # also show <ss1 %s ss2> and <ss2 #s ss1>.
+            fh.write("<blockquote>\n<dl>\n")
+            for source, targets in self.btr.get_relations(bt1, bt2, cell.category):
+                fh.write("  <dt>%s</dt>\n" % source.as_html())
+                fh.write("  <dd>\n")
+                for target in targets:
+                    fh.write("%s<br/>" % target.as_html())
+                fh.write("  </dd>\n")
+            fh.write("</dl>\n</blockquote>\n")
 
     def _write_pair_description(self, fh, bt1, bt2):
         fh.write('<p>{')
@@ -933,6 +2084,24 @@ class RelationsWriter(object):
         fh.write('}</p>\n')
 
 
+# Set by RelationsWriter just before worker processes are forked, contains the
+# writer and the hashes of the pages of the last run.
+_render_context = None
+
+
+def _render_relation(pair):
+    """Render the page for a pair of basic types, this runs in a worker."""
+    writer, old_hashes = _render_context
+    return writer._render_relation(pair, old_hashes)
+
+
+def _unless_unchanged(fname, page, old_hashes):
+    """Return a triple of the file name, the hash of the page and the page, or
+    None instead of the page if the hash is the same as in old_hashes."""
+    digest = hashlib.sha1(page.encode('utf-8')).hexdigest()
+    return fname, digest, None if old_hashes.get(fname) == digest else page
+
+
 def _full_name(basic_type):
     return cltypes.BASIC_TYPES.get(basic_type)
 
@@ -943,16 +2112,49 @@ if __name__ == '__main__':
     version = sys.argv[2]
 
     if flag == '--create-cltype-files':
-        wn = WordNet(wordnet_version, add_basic_types=True)
-        create_lemma_to_cltype_files(wn)
+        wn = WordNet(version, add_basic_types=True)
+        workers = int(sys.argv[sys.argv.index('--workers') + 1]) if '--workers' in sys.argv else 1
+        budget = None
+        if '--memory-budget' in sys.argv:
+            budget = int(sys.argv[sys.argv.index('--memory-budget') + 1]) * 2**20
+        sample_size = None
+        if '--sample' in sys.argv:
+            sample_size = int(sys.argv[sys.argv.index('--sample') + 1])
+        compression = sys.argv[sys.argv.index('--compress') + 1] if '--compress' in sys.argv else None
+        create_lemma_to_cltype_files(wn, counts_only='--counts-only' in sys.argv[3:],
+                                     workers=workers, memory_budget=budget,
+                                     sample_size=sample_size, compression=compression)
+
+    elif flag == '--update-cltype-files':
+        wn = WordNet(version)
+        btypes = None
+        if len(sys.argv) > 3:
+            with open(sys.argv[3]) as fh:
+                btypes = ast.literal_eval(fh.read())
+        update_lemma_to_cltype_files(wn, btypes)
+
+    elif flag == '--check-workers':
+        wn = WordNet(version, add_basic_types=True)
+        if not check_workers(wn, int(sys.argv[3])):
+            sys.exit(1)
+
+    elif flag == '--lookup':
+        cl = CoreLexLookup(get_corelex_version(version))
+        for lemma, result in cl.lookup_batch(sys.argv[3:]).items():
+            print(lemma, result)
 
     elif flag == '--sql':
         cl = CoreLex(version=version, category='n')
-        cl.write_tables()
+        batch_size = int(sys.argv[sys.argv.index('--batch-size') + 1]) if '--batch-size' in sys.argv else 1000
+        cl.write_tables(tsv='--tsv' in sys.argv[3:], batch_size=batch_size)
 
     elif flag == '--btyperels':
         wn = WordNet(version, add_basic_types=True)
-        create_basic_type_relations(wn, version, 'n')
+        workers = int(sys.argv[sys.argv.index('--workers') + 1]) if '--workers' in sys.argv else 1
+        compression = sys.argv[sys.argv.index('--compress') + 1] if '--compress' in sys.argv else None
+        create_basic_type_relations(wn, version, 'n', write_text='--no-text' not in sys.argv[3:],
+                                    exact_tests='--exact-tests' in sys.argv[3:], workers=workers,
+                                    compression=compression)
 
     elif flag == '-s':
         scratch(version)
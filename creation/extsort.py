@@ -0,0 +1,174 @@
+"""extsort.py
+
+External merge sort for sequences that may be too large to sort in memory. Items
+are collected in a buffer until the estimated size of the buffer exceeds the
+memory budget, then the buffer is sorted and written to a temporary file as a
+sorted run. When the items are requested all runs are merged. Runs are read in
+small batches, so merging only needs one batch per run in memory. If there are
+more runs than fit in the memory budget that way, the runs are first merged in
+groups into longer runs, in as many passes as needed. If all items fit in the budget nothing is written to
+disk and the buffer is just sorted.
+
+Usage:
+
+   >>> sorter = ExternalSorter(memory_budget=1000)
+   >>> sorter.extend(['pear', 'apple', 'fig'] * 20)
+   >>> sorter.add('banana')
+   >>> items = list(sorter)
+   >>> items[:4]
+   ['apple', 'apple', 'apple', 'apple']
+   >>> sorter.runs
+   4
+
+Items can be anything that can be pickled and compared. As with sorted() a key
+function can be given, the sort is stable, so items with the same key come out
+in the order they were added. The size of an item is estimated with
+sys.getsizeof(), for tuples the sizes of the elements are added.
+
+"""
+
+import sys
+import heapq
+import pickle
+import tempfile
+
+
+# approximate size in bytes of the batches of items that are pickled together
+# when writing a run, one batch per run is in memory when merging runs
+BATCH_BYTES = 2**16
+
+
+def approximate_size(item):
+    """Return an estimate of the memory used by the item in bytes."""
+    size = sys.getsizeof(item)
+    if isinstance(item, tuple):
+        for element in item:
+            size += sys.getsizeof(element)
+    return size
+
+
+class ExternalSorter(object):
+
+    """Collects items and returns them in sorted order, spilling sorted runs to
+    temporary files when the items take up more memory than allowed.
+
+    Instance variables:
+
+    memory_budget
+        Maximum estimated size in bytes of the items kept in memory.
+
+    key
+        Key function as used by sorted(), or None.
+
+    runs
+        The number of sorted runs written to disk, not counting the runs that
+        were created by merging other runs.
+
+    """
+
+    def __init__(self, memory_budget=64 * 2**20, key=None, directory=None):
+        self.memory_budget = memory_budget
+        self.key = key
+        self.directory = directory
+        self.runs = 0
+        self._buffer = []
+        self._buffer_size = 0
+        self._files = []
+        self._batch_size = 1
+
+    def __str__(self):
+        return "<ExternalSorter items=%d runs=%d>" % (len(self._buffer), self.runs)
+
+    def __iter__(self):
+        return self.sorted()
+
+    def add(self, item):
+        self._buffer.append(item)
+        self._buffer_size += approximate_size(item)
+        if self._buffer_size > self.memory_budget:
+            self._spill()
+
+    def extend(self, items):
+        for item in items:
+            self.add(item)
+
+    def _spill(self):
+        """Sort the buffer and write it to a temporary file as a run."""
+        self._buffer.sort(key=self.key)
+        self._batch_size = max(1, BATCH_BYTES * len(self._buffer) // self._buffer_size)
+        self._files.append(self._write_run(self._buffer))
+        self.runs += 1
+        self._buffer = []
+        self._buffer_size = 0
+
+    def _write_run(self, items):
+        fh = tempfile.TemporaryFile(dir=self.directory)
+        batch = []
+        for item in items:
+            batch.append(item)
+            if len(batch) >= self._batch_size:
+                pickle.dump(batch, fh, pickle.HIGHEST_PROTOCOL)
+                batch = []
+        if batch:
+            pickle.dump(batch, fh, pickle.HIGHEST_PROTOCOL)
+        fh.seek(0)
+        return fh
+
+    def _merge(self, files):
+        return heapq.merge(*[_read_run(fh) for fh in files], key=self.key)
+
+    def sorted(self):
+        """Generate all items in sorted order. This can only be done once, the
+        temporary files are removed when all items have been generated."""
+        if not self._files:
+            self._buffer.sort(key=self.key)
+            items = self._buffer
+            self._buffer = []
+            for item in items:
+                yield item
+            return
+        if self._buffer:
+            self._spill()
+        try:
+            # Merge the runs in passes until all runs can be merged in one go,
+            # each pass merges groups of fan_in consecutive runs, so every item
+            # is copied once per pass. The merged runs stay in the order of the
+            # groups, which keeps the sort stable since merge() is stable for
+            # its arguments. The list of files is kept up to date during a pass
+            # so close() removes all of them if merging fails.
+            fan_in = max(2, self.memory_budget // BATCH_BYTES)
+            while len(self._files) > fan_in:
+                merged, remaining = [], self._files
+                while remaining:
+                    group = remaining[:fan_in]
+                    if len(group) > 1:
+                        run = self._write_run(self._merge(group))
+                        for fh in group:
+                            fh.close()
+                        group = [run]
+                    merged.extend(group)
+                    remaining = remaining[fan_in:]
+                    self._files = merged + remaining
+            for item in self._merge(self._files):
+                yield item
+        finally:
+            self.close()
+
+    def close(self):
+        """Remove the temporary files and empty the buffer."""
+        for fh in self._files:
+            fh.close()
+        self._files = []
+        self._buffer = []
+        self._buffer_size = 0
+
+
+def _read_run(fh):
+    """Generate the items of a run written by ExternalSorter._write_run()."""
+    while True:
+        try:
+            batch = pickle.load(fh)
+        except EOFError:
+            return
+        for item in batch:
+            yield item
@@ -0,0 +1,212 @@
+"""fuzzy.py
+
+Approximate lemma lookup using a symmetric-delete index (the technique used by
+SymSpell). For each lemma all strings that can be created by deleting up to
+max_distance characters from the first and from the last prefix_length
+characters of the lemma are stored in a dictionary. At query time the same
+deletes are generated for the search term, looked up in the dictionary, and the
+resulting candidates are checked with the real edit distance. This means that a
+query only looks at a few hundred dictionary keys and a small number of
+candidates, no matter how many lemmas there are. With the noun lemmas of
+WordNet 3.1 a lookup takes about 0.2ms for edit distance 1 and under 1ms for
+edit distance 2, building the index takes several seconds.
+
+The edit distance used is the optimal string alignment distance, which is the
+Levenshtein distance with transpositions of adjacent characters added.
+
+Usage:
+
+   >>> idx = FuzzyLemmaIndex(['door', 'doorway', 'floor', 'window'])
+   >>> idx.lookup('dor')
+   [('door', 1)]
+   >>> idx.lookup('flor', max_distance=2)
+   [('floor', 1), ('door', 2)]
+   >>> idx.lookup('odor')
+   [('door', 1)]
+   >>> idx.lookup_batch(['door', 'widnow', 'xyzzy'])
+   {'door': [('door', 0), ('floor', 2)], 'widnow': [('window', 1)], 'xyzzy': []}
+
+Normally you would not create the index yourself but get it from a WordNet
+instance, which builds an index for a category the first time it is needed:
+
+   >>> wn.get_similar_lemmas('dorr', max_distance=1)
+   [('doer', 1), ('door', 1), ('dork', 1), ('dorm', 1), ('dory', 1), ('orr', 1), ('torr', 1)]
+   >>> wn.clean_lemmas(['door', 'Abraham Lincon', 'xyzzy'])
+   [('door', 'door', 0), ('Abraham Lincon', 'abraham_lincoln', 1), ('xyzzy', None, None)]
+
+"""
+
+
+class FuzzyLemmaIndex(object):
+
+    """Symmetric-delete index over a list of lemmas.
+
+    Deletes are indexed for both the start and the end of each lemma. If the
+    edit distance between two strings is at most k then so is the distance
+    between their prefixes (when prefixes of the search term up to k characters
+    longer or shorter are taken into account) and the same holds for their
+    suffixes. A lemma is therefore only checked if it is found through both
+    indexes, which typically leaves about a dozen candidates to be verified.
+
+    Instance variables:
+
+    max_distance
+        The largest edit distance that can be used in a query.
+
+    prefix_length
+        Only deletes from this many characters at the start and the end of the
+        lemma are indexed, this keeps the size of the index in check for long
+        compounds.
+
+    lemmas
+        List of all lemmas, the position in the list is the lemma identifier.
+
+    _prefixes, _suffixes
+        Pairs of a delete dictionary and a list of lemma groups. The dictionary
+        maps delete strings to the positions of the groups of lemmas that share
+        the prefix (or the reversed suffix) that the delete was created from.
+        { delete_string ==> list of group identifiers }
+
+    _suffix_group
+        For each lemma identifier the suffix group it belongs to.
+
+    """
+
+    def __init__(self, lemmas, max_distance=2, prefix_length=7):
+        self.max_distance = max_distance
+        self.prefix_length = prefix_length
+        self.lemmas = sorted(set(lemmas))
+        self._prefixes = self._build([l[:prefix_length] for l in self.lemmas])
+        self._suffixes = self._build([l[::-1][:prefix_length] for l in self.lemmas])
+        self._suffix_group = [None] * len(self.lemmas)
+        for group_id, lemma_ids in enumerate(self._suffixes[1]):
+            for lemma_id in lemma_ids:
+                self._suffix_group[lemma_id] = group_id
+
+    def __str__(self):
+        return "<FuzzyLemmaIndex lemmas=%d deletes=%d max_distance=%d>" \
+            % (len(self.lemmas), len(self._prefixes[0]) + len(self._suffixes[0]),
+               self.max_distance)
+
+    def _build(self, affixes):
+        deletes = {}
+        groups = []
+        group_ids = {}
+        for lemma_id, affix in enumerate(affixes):
+            group_id = group_ids.get(affix)
+            if group_id is None:
+                group_id = len(groups)
+                group_ids[affix] = group_id
+                groups.append([])
+                for deleted in _deletes(affix, self.max_distance):
+                    deletes.setdefault(deleted, []).append(group_id)
+            groups[group_id].append(lemma_id)
+        return deletes, groups
+
+    def _groups(self, index, term, k):
+        """Return the identifiers of all groups in the index that can be reached from
+        the term with at most k deletes on both sides."""
+        deletes, groups = index
+        # An edit in the prefix can pull characters in from beyond the prefix or
+        # push them out, so term prefixes up to k characters shorter or longer
+        # than the prefix length need to be considered.
+        keys = set()
+        for length in range(max(0, self.prefix_length - k), self.prefix_length + k + 1):
+            keys.update(_deletes(term[:length], k))
+            if length >= len(term):
+                break
+        group_ids = set()
+        for key in keys:
+            group_ids.update(deletes.get(key, ()))
+        return group_ids
+
+    def lookup(self, term, max_distance=None, limit=None):
+        """Return a list of (lemma, distance) pairs for all lemmas within the given
+        edit distance of the term, sorted on distance and then on lemma. The
+        distance cannot be larger than the distance the index was built with."""
+        k = self.max_distance if max_distance is None else max_distance
+        if k > self.max_distance:
+            raise ValueError("index was built for a maximum distance of %d"
+                             % self.max_distance)
+        prefix_groups = self._prefixes[1]
+        suffix_group_ids = None
+        if len(term) > self.prefix_length - k:
+            suffix_group_ids = self._groups(self._suffixes, term[::-1], k)
+        results = []
+        for group_id in self._groups(self._prefixes, term, k):
+            for lemma_id in prefix_groups[group_id]:
+                if (suffix_group_ids is not None
+                        and self._suffix_group[lemma_id] not in suffix_group_ids):
+                    continue
+                lemma = self.lemmas[lemma_id]
+                distance = edit_distance(term, lemma, k)
+                if distance <= k:
+                    results.append((lemma, distance))
+        results.sort(key=lambda r: (r[1], r[0]))
+        return results if limit is None else results[:limit]
+
+    def lookup_batch(self, terms, max_distance=None, limit=None):
+        """Return a dictionary with the results of lookup() for each term."""
+        return {term: self.lookup(term, max_distance, limit) for term in terms}
+
+    def best_match(self, term, max_distance=None):
+        """Return a (lemma, distance) pair for the closest lemma or None if there is
+        no lemma within the edit distance. Exact matches are always preferred,
+        ties at higher distances are broken alphabetically."""
+        results = self.lookup(term, max_distance, limit=1)
+        return results[0] if results else None
+
+
+def _deletes(string, distance):
+    """Return the set of all strings that can be created from the string by
+    deleting up to distance characters, this includes the string itself."""
+    result = {string}
+    frontier = [string]
+    for i in range(distance):
+        next_frontier = []
+        for s in frontier:
+            for j in range(len(s)):
+                deleted = s[:j] + s[j+1:]
+                if deleted not in result:
+                    result.add(deleted)
+                    next_frontier.append(deleted)
+        frontier = next_frontier
+    return result
+
+
+def edit_distance(s1, s2, max_distance=None):
+    """Return the optimal string alignment distance between two strings. If a
+    maximum distance is given the computation stops as soon as the distance is
+    known to be larger, in which case max_distance + 1 is returned."""
+    if s1 == s2:
+        return 0
+    if max_distance is not None and abs(len(s1) - len(s2)) > max_distance:
+        return max_distance + 1
+    previous2 = None
+    previous = list(range(len(s2) + 1))
+    for i in range(1, len(s1) + 1):
+        c1 = s1[i-1]
+        current = [i]
+        row_min = i
+        for j in range(1, len(s2) + 1):
+            c2 = s2[j-1]
+            if c1 == c2:
+                value = previous[j-1]
+            else:
+                # substitution, deletion or insertion
+                value = previous[j-1]
+                if previous[j] < value:
+                    value = previous[j]
+                if current[j-1] < value:
+                    value = current[j-1]
+                value += 1
+                if (i > 1 and j > 1 and c1 == s2[j-2] and s1[i-2] == c2
+                        and previous2[j-2] + 1 < value):
+                    value = previous2[j-2] + 1  # transposition
+            current.append(value)
+            if value < row_min:
+                row_min = value
+        if max_distance is not None and row_min > max_distance:
+            return max_distance + 1
+        previous2, previous = previous, current
+    return previous[-1]
@@ -0,0 +1,167 @@
+"""glosses.py
+
+Full-text search over synset glosses using an inverted index. Every synset of a
+category gets an integer identifier and for each token that occurs in a gloss
+the index stores a posting list, which is an array of the identifiers of the
+synsets whose gloss contains the token plus a parallel array with the frequency
+of the token in each of those glosses.
+
+Two kinds of queries are supported. Boolean queries return all synsets whose
+gloss contains all of the query terms (or any of them when using OR), terms
+preceded by a minus sign must not occur in the gloss:
+
+   >>> idx = GlossIndex(wn, NOUN)
+   >>> idx.boolean_search('hinged barrier')
+   >>> idx.boolean_search('hinged barrier -door')
+   >>> idx.boolean_search('hinged swinging', operator='OR')
+
+Ranked queries score synsets with BM25 and return (synset, score) pairs:
+
+   >>> idx.ranked_search('movable barrier entrance', limit=3)
+
+Both kinds of searches can be restricted to synsets of a basic type:
+
+   >>> idx.ranked_search('hard substance', basic_type='sub')
+
+Usually the index is accessed through the WordNet instance, which builds it the
+first time it is used:
+
+   >>> wn.search_glosses('hinged barrier -door')
+   >>> wn.rank_glosses('hinged barrier', basic_type='art')
+
+"""
+
+import re
+import math
+from array import array
+
+
+TOKEN_EXPRESSION = re.compile(r"[a-z0-9]+(?:['-][a-z0-9]+)*")
+
+
+def tokenize(text):
+    """Return the list of lower-cased tokens in the text."""
+    return TOKEN_EXPRESSION.findall(text.lower()) if text else []
+
+
+class GlossIndex(object):
+
+    """Inverted index over the glosses of all synsets of one category.
+
+    Instance variables:
+
+    synsets
+        List of all synsets, the position in the list is the synset identifier
+        that is used in the posting lists.
+
+    postings
+        { token ==> (array of synset identifiers, array of token frequencies) }
+
+    lengths
+        Array with the number of tokens in each gloss.
+
+    """
+
+    # BM25 parameters
+    K1 = 1.2
+    B = 0.75
+
+    def __init__(self, wordnet, category):
+        self.wordnet = wordnet
+        self.category = category
+        self.synsets = list(wordnet.get_all_synsets(category))
+        self.postings = {}
+        self.lengths = array('i')
+        self._build()
+        self.average_length = sum(self.lengths) / max(1, len(self.lengths))
+
+    def __str__(self):
+        return "<GlossIndex %s synsets=%d tokens=%d>" \
+            % (self.category, len(self.synsets), len(self.postings))
+
+    def _build(self):
+        for synset_id, synset in enumerate(self.synsets):
+            tokens = tokenize(synset.gloss)
+            self.lengths.append(len(tokens))
+            counts = {}
+            for token in tokens:
+                counts[token] = counts.get(token, 0) + 1
+            for token, count in counts.items():
+                if token not in self.postings:
+                    self.postings[token] = (array('i'), array('i'))
+                ids, frequencies = self.postings[token]
+                ids.append(synset_id)
+                frequencies.append(count)
+
+    def _ids(self, token):
+        return self.postings.get(token, (array('i'), array('i')))[0]
+
+    def _filter(self, synset_ids, basic_type):
+        if basic_type is None:
+            return synset_ids
+        return set([i for i in synset_ids
+                    if basic_type in self.synsets[i].basic_types])
+
+    def boolean_search(self, query, operator='AND', basic_type=None):
+        """Return the synsets whose glosses match the query, in the order of the
+        index. With the AND operator all query terms have to occur, with OR
+        just one of them. Terms starting with a minus sign must not occur."""
+        terms, excluded = _parse_query(query)
+        if not terms:
+            return []
+        if operator == 'AND':
+            # start with the shortest posting list to keep the sets small
+            ids_list = sorted([self._ids(t) for t in terms], key=len)
+            result = set(ids_list[0])
+            for ids in ids_list[1:]:
+                result.intersection_update(ids)
+        elif operator == 'OR':
+            result = set()
+            for term in terms:
+                result.update(self._ids(term))
+        else:
+            raise ValueError("unknown operator: %s" % operator)
+        for term in excluded:
+            result.difference_update(self._ids(term))
+        result = self._filter(result, basic_type)
+        return [self.synsets[i] for i in sorted(result)]
+
+    def ranked_search(self, query, basic_type=None, limit=20):
+        """Return a list of (synset, score) pairs for the synsets whose glosses
+        contain at least one of the query terms, ordered on their BM25 score.
+        Terms starting with a minus sign must not occur in the gloss."""
+        terms, excluded = _parse_query(query)
+        scores = {}
+        total = len(self.synsets)
+        for term in set(terms):
+            ids, frequencies = self.postings.get(term, (array('i'), array('i')))
+            if not ids:
+                continue
+            idf = math.log(1 + (total - len(ids) + 0.5) / (len(ids) + 0.5))
+            for synset_id, tf in zip(ids, frequencies):
+                norm = 1 - self.B + self.B * self.lengths[synset_id] / self.average_length
+                score = idf * tf * (self.K1 + 1) / (tf + self.K1 * norm)
+                scores[synset_id] = scores.get(synset_id, 0) + score
+        for term in excluded:
+            for synset_id in self._ids(term):
+                scores.pop(synset_id, None)
+        if basic_type is not None:
+            scores = {i: score for i, score in scores.items()
+                      if basic_type in self.synsets[i].basic_types}
+        ranked = sorted(scores.items(), key=lambda x: (-x[1], self.synsets[x[0]].id))
+        if limit is not None:
+            ranked = ranked[:limit]
+        return [(self.synsets[i], score) for i, score in ranked]
+
+
+def _parse_query(query):
+    """Return a pair of the list of query terms and the list of excluded terms
+    (the ones preceded by a minus sign)."""
+    terms = []
+    excluded = []
+    for word in query.split():
+        if word.startswith('-') and len(word) > 1:
+            excluded.extend(tokenize(word[1:]))
+        else:
+            terms.extend(tokenize(word))
+    return terms, excluded
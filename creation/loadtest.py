@@ -0,0 +1,148 @@
+"""loadtest.py
+
+Load test for the CoreLex service in service.py.
+
+Usage:
+
+   $ python3 loadtest.py [--url URL] [--connections C] [--requests N]
+                         [--batch B] [--lemmas FILE]
+
+   URL          where the service runs (default http://127.0.0.1:8080)
+   C            number of connections that send requests at the same time
+                (default 8)
+   N            total number of requests (default 10000)
+   B            with a batch size, POST /lemmas requests with B lemmas are sent
+                instead of GET /lemma requests (default 0)
+   FILE         lemmas file to take lemmas from, in random order (default
+                data/corelex-2.0-lemmas-nouns.tab)
+
+Each connection is kept open and sends its next request as soon as the response
+to the previous one has arrived. Afterwards the number of requests per second
+and the latency percentiles are printed, for example:
+
+   $ python3 service.py 3.1 &
+   $ python3 loadtest.py --connections 16 --requests 50000
+   $ python3 loadtest.py --batch 1000 --requests 200
+
+"""
+
+import sys
+import json
+import math
+import time
+import random
+import asyncio
+from urllib.parse import urlsplit, quote
+
+
+def read_lemmas(fname):
+    with open(fname) as fh:
+        return [line.split('\t', 1)[0] for line in fh]
+
+
+async def _read_response(reader):
+    """Read one response and return the status."""
+    status_line = await reader.readline()
+    if not status_line:
+        raise ConnectionError("connection closed by the server")
+    length = 0
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b'\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        if name.strip().lower() == 'content-length':
+            length = int(value)
+    await reader.readexactly(length)
+    return int(status_line.split()[1])
+
+
+async def _connection(host, port, requests, latencies, statuses):
+    """Send the requests over one connection and add the latency in seconds of
+    each request to latencies."""
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        for request in requests:
+            start = time.perf_counter()
+            writer.write(request)
+            status = await _read_response(reader)
+            latencies.append(time.perf_counter() - start)
+            statuses[status] = statuses.get(status, 0) + 1
+    finally:
+        writer.close()
+
+
+def make_requests(host, lemmas, n, batch, rng):
+    """Return a list of n encoded requests."""
+    requests = []
+    for i in range(n):
+        if batch:
+            body = json.dumps(rng.sample(lemmas, batch)).encode('utf-8')
+            requests.append(("POST /lemmas HTTP/1.1\r\nHost: %s\r\n"
+                             "Content-Type: application/json\r\n"
+                             "Content-Length: %d\r\n\r\n" % (host, len(body))).encode('latin-1')
+                            + body)
+        else:
+            requests.append(("GET /lemma/%s HTTP/1.1\r\nHost: %s\r\n\r\n"
+                             % (quote(rng.choice(lemmas)), host)).encode('latin-1'))
+    return requests
+
+
+def percentile(sorted_values, p):
+    """Return the p-th percentile of a sorted list, using the nearest rank."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, int(math.ceil(p / 100.0 * len(sorted_values))))
+    return sorted_values[rank - 1]
+
+
+async def run(url, connections, n, batch, lemmas, seed=0):
+    """Run the load test and return a dictionary with the results."""
+    parts = urlsplit(url)
+    host, port = parts.hostname, parts.port or 80
+    requests = make_requests(host, lemmas, n, batch, random.Random(seed))
+    latencies = []
+    statuses = {}
+    start = time.perf_counter()
+    await asyncio.gather(*[_connection(host, port, requests[i::connections], latencies, statuses)
+                           for i in range(connections)])
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    return {'requests': len(latencies),
+            'lemmas': len(latencies) * (batch or 1),
+            'seconds': elapsed,
+            'rps': len(latencies) / elapsed,
+            'mean_ms': 1000 * sum(latencies) / max(1, len(latencies)),
+            'p50_ms': 1000 * percentile(latencies, 50),
+            'p99_ms': 1000 * percentile(latencies, 99),
+            'max_ms': 1000 * percentile(latencies, 100),
+            'statuses': statuses}
+
+
+def print_results(results):
+    print("requests     %d" % results['requests'])
+    print("lemmas       %d" % results['lemmas'])
+    print("seconds      %.2f" % results['seconds'])
+    print("requests/s   %.1f" % results['rps'])
+    print("lemmas/s     %.1f" % (results['lemmas'] / results['seconds']))
+    print("mean         %.2f ms" % results['mean_ms'])
+    print("p50          %.2f ms" % results['p50_ms'])
+    print("p99          %.2f ms" % results['p99_ms'])
+    print("max          %.2f ms" % results['max_ms'])
+    print("statuses     %s" % ' '.join(["%d:%d" % (status, count)
+                                        for status, count in sorted(results['statuses'].items())]))
+
+
+def _option(name, default):
+    return sys.argv[sys.argv.index(name) + 1] if name in sys.argv else default
+
+
+if __name__ == '__main__':
+
+    lemmas = read_lemmas(_option('--lemmas', 'data/corelex-2.0-lemmas-nouns.tab'))
+    results = asyncio.run(run(_option('--url', 'http://127.0.0.1:8080'),
+                              int(_option('--connections', 8)),
+                              int(_option('--requests', 10000)),
+                              int(_option('--batch', 0)),
+                              lemmas))
+    print_results(results)
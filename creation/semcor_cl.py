@@ -70,6 +70,7 @@ sc = semcor_cl.create_SemCorF(False)
 from collections import defaultdict
 from config import SEMCOR_DIR
 from wordnet import WordNet
+from utils import open_file
 from nltk.corpus import semcor
 import itertools
 import pdb
@@ -175,7 +176,7 @@ class SemCorF():
             filename = self.corelex_semcor_missing_sids_file('noun')
 
             print("WARNING: %i sense keys had no mapping in wordnet.  See %s" % (number_missing_keys, filename))
-            with open(filename, 'w') as fh:
+            with open_file(filename, 'w') as fh:
                 for key in self.missing_keys:
                     fh.write("%s\n" % key)
 
@@ -221,7 +222,7 @@ class SemCorF():
         semcor_doc_pairs_file = self.corelex_semcor_doc_pairs_file('noun')
 
         if self.write_output_p:
-            semcor_doc_pairs_stream = open(semcor_doc_pairs_file, "w")
+            semcor_doc_pairs_stream = open_file(semcor_doc_pairs_file, "w")
 
         # We are interested in semcor lines containing nouns. e.g.
         # <wf cmd=done pos=NN lemma=jury wnsn=1 lexsn=1:14:00::>jury</wf>
@@ -344,7 +345,7 @@ class SemCorF():
             semcor_doc_pairs_stream.close()
 
             filename = self.corelex_semcor_sentno2file('noun') 
-            with open(filename, 'w') as fh:
+            with open_file(filename, 'w') as fh:
                 for (sent_no, doc) in self.sent_no2doc.items():
                     fh.write("%i\t%s\n" % (sent_no, doc))
 
@@ -355,7 +356,7 @@ class SemCorF():
     # different lemma, it will be output once per lemma.
     def _output_dn_semcor(self, category):
         filename = self.corelex_semcor_pairs_file(category)
-        with open(filename, 'w') as fh:
+        with open_file(filename, 'w') as fh:
             for pair, df in self.dn_spair2df.items():
                 lemma = pair[0]
                 s1 = pair[1]
@@ -398,8 +399,10 @@ class Parallel():
     def __init__(self, wn):
         self.wordnet = wn
         # This file needs to be created from corelex-3.1-semcor_pairs-nouns.tab:
+        # $ python3 association.py --semcor-pairs
+        # which also writes association measures for the basic type pairs, or:
         # cat corelex-3.1-semcor_pairs-nouns.tab | cut -f2 | sunr > corelex-3.1-semcor_pairs-nouns.f2.sunr
-        # alias sunr='sort | uniq -c | sort -nr | sed -e '\''s/^ *\([0-9]*\) /\1  /'\'''
+        # alias sunr='sort | uniq -c | sort -nr | sed -e '\''s/^ *\([0-9]*\) /\1\t/'\'''
         self.sorted_pairs_file = "data/corelex-3.1-semcor_pairs-nouns.f2.sunr"
         # We'll use a threshold of frequency of pair type >= 10 for generating
         # the parallels data in top_pair_parallels()
@@ -489,7 +492,7 @@ class Parallel():
         """
         # any pair of unequal basic types with semcor frequency >= min_count
         d_top_pairs = {}
-        for line in open(self.sorted_pairs_file):
+        for line in open_file(self.sorted_pairs_file):
             (count, pair) = line.split("\t")
             bt1, bt2 = pair.split(" ")
             count = int(count)
@@ -501,12 +504,12 @@ class Parallel():
         """
 
         # open our output file for parallels
-        with open(self.para_file, 'w') as parallels_str:
+        with open_file(self.para_file, 'w') as parallels_str:
             # iterate through the sorted file of pairs found in semcor
             # watch for limit (to process a subset of the file)
             line_number = 0
             #for line in open(self.semcor_pairs_nouns_file):
-            for line in open(self.filtered_pair_file):
+            for line in open_file(self.filtered_pair_file):
                 # conditions: 
                 # 1. Pair must be high frequency (ie. in the d_top_pairs dict
                 # 2. Pair must be composed of two different basic types
@@ -547,15 +550,15 @@ class Parallel():
     def filter_pair_file(self, min_count = 10):
         d_pairs = {}
         # create dict with counts for each pair of basic types
-        for line in open(self.sorted_pairs_file):
+        for line in open_file(self.sorted_pairs_file):
             line = line.strip()
             (count, pair) = line.split("\t")
             count = int(count)
             d_pairs[pair] = count
 
         #pdb.set_trace()
-        with open(self.filtered_pair_file, 'w') as filtered_str:
-            for line in open(self.semcor_pairs_nouns_file):
+        with open_file(self.filtered_pair_file, 'w') as filtered_str:
+            for line in open_file(self.semcor_pairs_nouns_file):
                 # conditions: 
 
                 # 2. Pair must be composed of two different basic types
@@ -639,7 +642,7 @@ class SemcorWordnetMappings(object):
     def print_mappings(self):
         """Save the mappings to data/corelex-3.1-semcor_lemma2synset.txt."""
         fname = self.corelex_semcor_lemma2synset_file()
-        with open(fname, 'w') as fh:
+        with open_file(fname, 'w') as fh:
             for lemma in sorted(self.mappings):
                 fh.write(lemma + "\n")
                 for sense, ssid, ss in self.mappings[lemma]:
@@ -58,6 +58,7 @@ from bs4 import BeautifulSoup
 from config import CLDATA_DIR
 from config import SEMCOR_DIR
 from wordnet import WordNet
+from utils import open_file
 import semcor_cl
 
 # to reload: >>> from importlib import reload
@@ -79,8 +80,8 @@ def semcor_sent2str(semcor_sent):
 # the default as 0.  Then the output file will have a constinuous
 # list of sentence numbers starting at 1.
 def secmcor_files2tagged_chunks(file_list, tagged_file, lexsn_file, global_sent_no=0):
-    with open(lexsn_file, 'w') as lexsn_str:
-        with open(tagged_file, 'w') as tagged_str:
+    with open_file(lexsn_file, 'w') as lexsn_str:
+        with open_file(tagged_file, 'w') as tagged_str:
             for semcor_file in file_list:
                 last_sent_no = semcor_str2tagged_chunks(semcor_file, tagged_str, lexsn_str, global_sent_no)
                 # To maintain the sentence number sequence across files,
@@ -317,7 +318,7 @@ def create_sent_token_files(parse_file, lexsn_file, sent_file, token_file):
     print("paths: %s\t%s\n%s\t%s\n" % (lexsn_path, parse_path, sent_path, token_path))
 
     # Put the lexsn data into two dictionaries, capturing sentence and token info
-    for line in open(lexsn_path): 
+    for line in open_file(lexsn_path): 
         line = line.strip('\n')
         # line can be blank, start with #sent or be token info
         if line == "":
@@ -345,9 +346,9 @@ def create_sent_token_files(parse_file, lexsn_file, sent_file, token_file):
     # track the global token_id of the first token in the current sentence
     current_first_token_id = 0
 
-    with open(sent_path, 'w') as sent_str:
-        with open(token_path, 'w') as token_str:
-            for line in open(parse_path):
+    with open_file(sent_path, 'w') as sent_str:
+        with open_file(token_path, 'w') as token_str:
+            for line in open_file(parse_path):
                 line = line.strip('\n')
                 if line == "":
                     # blank line
@@ -0,0 +1,317 @@
+"""service.py
+
+HTTP service that answers CoreLex and WordNet lookups with JSON.
+
+Usage:
+
+   $ python3 service.py <version> [--host HOST] [--port PORT] [--cache N]
+
+   where <version> is WordNet version 1.5 or 3.1, the default host and port are
+   127.0.0.1 and 8080 and N is the number of responses kept in the cache (the
+   default is 10000, use 0 to switch off caching)
+
+This loads WordNet with basic types and opens the CoreLex lemmas files with
+CoreLexLookup, so the files need to have been created (see corelex.py). The
+following requests are supported:
+
+   GET  /lemma/<lemma>          polysemous type, CoreLex type and synsets
+   POST /lemmas                 the same for a JSON list of lemmas
+   GET  /synset/<synset_id>     synset with gloss, basic types and relations
+   GET  /basic_types            all basic types
+   GET  /basic_type/<name>      synsets and description of a basic type
+
+All requests are for nouns unless ?category=verb is added. For example:
+
+   $ curl http://127.0.0.1:8080/lemma/door
+   $ curl -d '["door", "chicken"]' http://127.0.0.1:8080/lemmas
+   $ curl http://127.0.0.1:8080/synset/03226423
+   $ curl http://127.0.0.1:8080/basic_type/art
+
+The POST body can also be an object with the list in a "lemmas" field. Unknown
+lemmas and synsets give a 404 for single lookups and null for batch lookups.
+
+The server only uses asyncio from the standard library and implements the part
+of HTTP/1.1 that is needed for this. Connections are kept open for the next
+request (keep-alive) unless the client asks to close them or uses HTTP/1.0
+without keep-alive. All lookups are in memory and take microseconds, so they are
+done in the event loop. Responses to GET requests are kept in an LRU cache, so
+popular requests do not need to be encoded again. See loadtest.py for a script
+that measures throughput and latency.
+
+"""
+
+import sys
+import json
+import asyncio
+from collections import OrderedDict
+from urllib.parse import urlsplit, parse_qs, unquote
+
+from wordnet import WordNet, NOUN, VERB, normalize_lemma
+from corelex import CoreLexLookup, get_corelex_version
+import cltypes
+
+
+# largest request body that is accepted
+MAX_BODY_SIZE = 16 * 2**20
+
+STATUS_MESSAGES = {
+    200: 'OK',
+    400: 'Bad Request',
+    404: 'Not Found',
+    405: 'Method Not Allowed',
+    413: 'Payload Too Large'}
+
+
+class RequestError(Exception):
+
+    def __init__(self, status, message):
+        Exception.__init__(self, message)
+        self.status = status
+
+
+class CoreLexService(object):
+
+    """Answers requests with JSON. The methods that do the lookups do not know
+    about HTTP, they return a JSON-compatible value or raise a RequestError.
+
+    Instance variables:
+
+    wordnet
+        WordNet instance with basic types.
+
+    lookups
+        { NOUN|VERB ==> CoreLexLookup }, only for the categories for which
+        there is a lemmas file.
+
+    cache
+        OrderedDict that maps GET request targets to encoded responses, in
+        order of use, the least recently used response is at the front.
+
+    cache_size
+        Maximum number of responses in the cache.
+
+    """
+
+    def __init__(self, wordnet, data_dir='data', cache_size=10000):
+        self.wordnet = wordnet
+        self.cache_size = cache_size
+        self.cache = OrderedDict()
+        self.cache_hits = 0
+        self.requests = 0
+        self.lookups = {}
+        version = get_corelex_version(wordnet.version)
+        for category in (NOUN, VERB):
+            try:
+                self.lookups[category] = CoreLexLookup(version, category, data_dir)
+            except FileNotFoundError:
+                print("Warning: no CoreLex lemmas file for %ss" % category)
+        self.basic_type_synsets = {}
+        for synset in wordnet.basic_types(NOUN):
+            self.basic_type_synsets.setdefault(synset.basic_type, []).append(synset)
+
+    def __str__(self):
+        return "<CoreLexService requests=%d cache=%d hits=%d>" \
+            % (self.requests, len(self.cache), self.cache_hits)
+
+    def respond(self, method, target, body):
+        """Return a pair of the status and the encoded JSON response."""
+        self.requests += 1
+        if method == 'GET' and target in self.cache:
+            self.cache_hits += 1
+            self.cache.move_to_end(target)
+            return 200, self.cache[target]
+        try:
+            result = self.dispatch(method, target, body)
+        except RequestError as e:
+            return e.status, _encode({'error': str(e)})
+        response = _encode(result)
+        if method == 'GET' and self.cache_size > 0:
+            self.cache[target] = response
+            if len(self.cache) > self.cache_size:
+                self.cache.popitem(last=False)
+        return 200, response
+
+    def dispatch(self, method, target, body):
+        url = urlsplit(target)
+        query = parse_qs(url.query)
+        category = query.get('category', [NOUN])[0]
+        if category not in (NOUN, VERB):
+            raise RequestError(400, "unknown category: %s" % category)
+        parts = [unquote(part) for part in url.path.strip('/').split('/')]
+        if method == 'POST':
+            if parts == ['lemmas']:
+                return self.lookup_lemmas(_decode_lemmas(body), category)
+            raise RequestError(405, "POST is only allowed for /lemmas")
+        if method != 'GET':
+            raise RequestError(405, "method not allowed: %s" % method)
+        if len(parts) == 2 and parts[0] == 'lemma':
+            return self.lookup_lemma(parts[1], category)
+        if len(parts) == 2 and parts[0] == 'synset':
+            return self.lookup_synset(parts[1], category)
+        if parts == ['basic_types']:
+            return self.get_basic_types()
+        if len(parts) == 2 and parts[0] == 'basic_type':
+            return self.get_basic_type(parts[1])
+        raise RequestError(404, "unknown request: %s" % url.path)
+
+    def _lemma_result(self, lemma, types, category):
+        word = self.wordnet.lemma_index()[category].get(normalize_lemma(lemma))
+        if types is None and word is None:
+            return None
+        polysemous_type, corelex_type = (None, None) if types is None else types
+        return {'lemma': lemma,
+                'category': category,
+                'polysemous_type': polysemous_type,
+                'corelex_type': corelex_type,
+                'synsets': [] if word is None else word.synsets}
+
+    def _lookup(self, category):
+        lookup = self.lookups.get(category)
+        if lookup is None:
+            raise RequestError(404, "no CoreLex data for %ss" % category)
+        return lookup
+
+    def lookup_lemma(self, lemma, category=NOUN):
+        result = self._lemma_result(lemma, self._lookup(category).lookup(lemma), category)
+        if result is None:
+            raise RequestError(404, "unknown lemma: %s" % lemma)
+        return result
+
+    def lookup_lemmas(self, lemmas, category=NOUN):
+        results = self._lookup(category).lookup_batch(lemmas)
+        return {'results': {lemma: self._lemma_result(lemma, types, category)
+                            for lemma, types in results.items()}}
+
+    def lookup_synset(self, synset_id, category=NOUN):
+        synset = self.wordnet.get_synset(category, synset_id)
+        if synset is None:
+            raise RequestError(404, "unknown synset: %s" % synset_id)
+        return {'id': synset.id,
+                'category': category,
+                'words': synset.names(),
+                'gloss': synset.gloss,
+                'basic_type': synset.basic_type,
+                'basic_types': sorted(synset.basic_types),
+                'hypernyms': [ss.id for ss in synset.hypernyms()],
+                'hyponyms': [ss.id for ss in synset.hyponyms()]}
+
+    def get_basic_types(self):
+        return {'basic_types': [{'name': name, 'description': cltypes.BASIC_TYPES.get(name)}
+                                for name in sorted(self.basic_type_synsets)]}
+
+    def get_basic_type(self, name):
+        synsets = self.basic_type_synsets.get(name)
+        if synsets is None:
+            raise RequestError(404, "unknown basic type: %s" % name)
+        return {'name': name,
+                'description': cltypes.BASIC_TYPES.get(name),
+                'synsets': [{'id': ss.id, 'words': ss.names()} for ss in synsets]}
+
+
+def _encode(result):
+    return json.dumps(result, separators=(',', ':')).encode('utf-8')
+
+
+def _decode_lemmas(body):
+    try:
+        lemmas = json.loads(body.decode('utf-8'))
+    except ValueError:
+        raise RequestError(400, "the body is not JSON")
+    if isinstance(lemmas, dict):
+        lemmas = lemmas.get('lemmas')
+    if not isinstance(lemmas, list) or not all([isinstance(l, str) for l in lemmas]):
+        raise RequestError(400, "expected a list of lemmas")
+    return lemmas
+
+
+async def _read_request(reader):
+    """Return the method, target, HTTP version, headers and body of the next
+    request on the connection, or None if the client closed the connection."""
+    request_line = await reader.readline()
+    if not request_line:
+        return None
+    try:
+        method, target, version = request_line.decode('latin-1').split()
+    except ValueError:
+        raise RequestError(400, "bad request line")
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b'\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        headers[name.strip().lower()] = value.strip()
+    try:
+        length = int(headers.get('content-length', 0))
+    except ValueError:
+        raise RequestError(400, "bad content length")
+    if length > MAX_BODY_SIZE:
+        raise RequestError(413, "request body is too large")
+    body = await reader.readexactly(length) if length else b''
+    return method, target, version, headers, body
+
+
+def _response(status, body, keep_alive):
+    head = ("HTTP/1.1 %d %s\r\n"
+            "Content-Type: application/json\r\n"
+            "Content-Length: %d\r\n"
+            "Connection: %s\r\n\r\n"
+            % (status, STATUS_MESSAGES[status], len(body),
+               'keep-alive' if keep_alive else 'close'))
+    return head.encode('latin-1') + body
+
+
+def connection_handler(service):
+    """Return the coroutine function that asyncio.start_server() calls for each
+    connection, it answers requests until the connection is closed."""
+
+    async def handle_connection(reader, writer):
+        try:
+            while True:
+                try:
+                    request = await _read_request(reader)
+                except RequestError as e:
+                    writer.write(_response(e.status, _encode({'error': str(e)}), False))
+                    break
+                if request is None:
+                    break
+                method, target, version, headers, body = request
+                connection = headers.get('connection', '').lower()
+                if version == 'HTTP/1.0':
+                    keep_alive = connection == 'keep-alive'
+                else:
+                    keep_alive = connection != 'close'
+                status, response = service.respond(method, target, body)
+                writer.write(_response(status, response, keep_alive))
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    return handle_connection
+
+
+async def serve(service, host='127.0.0.1', port=8080):
+    server = await asyncio.start_server(connection_handler(service), host, port)
+    print("Serving on http://%s:%d" % (host, port))
+    async with server:
+        await server.serve_forever()
+
+
+def _option(name, default):
+    return sys.argv[sys.argv.index(name) + 1] if name in sys.argv else default
+
+
+if __name__ == '__main__':
+
+    if len(sys.argv) < 2:
+        exit(__doc__)
+    wn = WordNet(sys.argv[1], add_basic_types=True)
+    service = CoreLexService(wn, cache_size=int(_option('--cache', 10000)))
+    try:
+        asyncio.run(serve(service, _option('--host', '127.0.0.1'), int(_option('--port', 8080))))
+    except KeyboardInterrupt:
+        print(service)
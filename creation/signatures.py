@@ -0,0 +1,145 @@
+"""signatures.py
+
+Relation signatures between basic types stored as NumPy arrays.
+
+A relation signature of a pair of basic types has the number of relations with
+each pointer symbol from synsets of the first basic type to synsets of the second
+basic type. The signatures of all pairs make up a cube with the source basic
+type, the target basic type and the pointer symbol as the three axes. The cube
+is saved in one compressed .npz file together with the labels of the axes and
+with a table of all relations between synsets, so it can be loaded and sliced
+without parsing text files:
+
+   >>> cube = load_relation_cube('data/corelex-3.1-nouns-relations.npz')
+   >>> cube.signature('art', 'act')
+   >>> cube.pointer_matrix('%p')
+   >>> cube.relations('art', 'act', '%p')
+
+The first returns a dictionary from pointer symbols to counts, the second a
+basic types by basic types matrix with the counts for one pointer symbol and
+the third a list of the relations between synsets, with synset identifiers.
+
+The cube is created by create_relation_cube() from the relations that
+WordNet.get_all_basic_type_relations() returns. This module needs NumPy.
+
+"""
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+class RelationCube(object):
+
+    """Counts and relations between basic types.
+
+    Instance variables:
+
+    basic_types
+        Sorted list of basic types, the labels of the first two axes.
+
+    pointers
+        Sorted list of pointer symbols, the labels of the third axis.
+
+    counts
+        Array of shape (basic types, basic types, pointers) with counts.
+
+    table
+        Array with a row of five integers for each relation between synsets:
+        the index of the source basic type, the index of the pointer symbol, the
+        index of the target basic type and the offsets of the source and target
+        synsets. Rows are in the order of the relations the cube was created from.
+
+    """
+
+    def __init__(self, basic_types, pointers, counts, table):
+        if numpy is None:
+            raise ImportError("RelationCube needs NumPy")
+        self.basic_types = list(basic_types)
+        self.pointers = list(pointers)
+        self.counts = counts
+        self.table = table
+        self._basic_type_index = {bt: i for i, bt in enumerate(self.basic_types)}
+        self._pointer_index = {p: i for i, p in enumerate(self.pointers)}
+
+    def __str__(self):
+        return "<RelationCube basic_types=%d pointers=%d relations=%d>" \
+            % (len(self.basic_types), len(self.pointers), len(self.table))
+
+    def save(self, fname):
+        numpy.savez_compressed(fname,
+                               basic_types=numpy.array(self.basic_types),
+                               pointers=numpy.array(self.pointers),
+                               counts=self.counts,
+                               table=self.table)
+
+    def signature(self, bt1, bt2):
+        """Return { pointer symbol ==> count } for the relations from bt1 to bt2,
+        without the pointer symbols that do not occur."""
+        row = self.counts[self._basic_type_index[bt1], self._basic_type_index[bt2]]
+        return {self.pointers[i]: int(row[i]) for i in numpy.flatnonzero(row)}
+
+    def signatures(self):
+        """Return { (bt1, bt2) ==> { pointer symbol ==> count } } for all pairs
+        of basic types with relations, sorted on the pairs."""
+        signatures = {}
+        totals = self.counts.sum(axis=2)
+        for i, j in zip(*numpy.nonzero(totals)):
+            pair = (self.basic_types[i], self.basic_types[j])
+            signatures[pair] = self.signature(*pair)
+        return signatures
+
+    def pointer_matrix(self, pointer):
+        """Return the basic types by basic types matrix of counts for the pointer
+        symbol."""
+        return self.counts[:, :, self._pointer_index[pointer]]
+
+    def relations_between(self, bt1, bt2, pointer=None):
+        """Return the rows of self.table from bt1 to bt2, optionally only those
+        with the pointer symbol."""
+        rows = (self.table[:, 0] == self._basic_type_index[bt1]) \
+            & (self.table[:, 2] == self._basic_type_index[bt2])
+        if pointer is not None:
+            rows &= self.table[:, 1] == self._pointer_index[pointer]
+        return self.table[rows]
+
+    def relations(self, bt1, bt2, pointer=None):
+        """Return a list of (bt1, pointer symbol, bt2, source synset identifier,
+        target synset identifier) tuples for the relations from bt1 to bt2,
+        optionally only those with the pointer symbol."""
+        return list(self.iter_relations(self.relations_between(bt1, bt2, pointer)))
+
+    def iter_relations(self, rows=None):
+        """Generate the relations in rows, or all relations, as tuples of basic
+        types, pointer symbol and synset identifiers."""
+        rows = self.table if rows is None else rows
+        for bt1, pointer, bt2, source, target in rows.tolist():
+            yield (self.basic_types[bt1], self.pointers[pointer], self.basic_types[bt2],
+                   "%08d" % source, "%08d" % target)
+
+
+def create_relation_cube(bt_relations):
+    """Create a RelationCube from the list of [basic type, pointer symbol, basic
+    type, source synset, target synset] lists that is returned by the method
+    WordNet.get_all_basic_type_relations()."""
+    basic_types = sorted(set([rel[0] for rel in bt_relations] + [rel[2] for rel in bt_relations]))
+    pointers = sorted(set([rel[1] for rel in bt_relations]))
+    basic_type_index = {bt: i for i, bt in enumerate(basic_types)}
+    pointer_index = {p: i for i, p in enumerate(pointers)}
+    table = numpy.array(
+        [(basic_type_index[rel[0]], pointer_index[rel[1]], basic_type_index[rel[2]],
+          int(rel[3].id), int(rel[4].id)) for rel in bt_relations],
+        dtype=numpy.int32).reshape(-1, 5)
+    counts = numpy.zeros((len(basic_types), len(basic_types), len(pointers)), dtype=numpy.int32)
+    numpy.add.at(counts, (table[:, 0], table[:, 2], table[:, 1]), 1)
+    return RelationCube(basic_types, pointers, counts, table)
+
+
+def load_relation_cube(fname):
+    """Load a RelationCube saved with RelationCube.save()."""
+    if numpy is None:
+        raise ImportError("loading a RelationCube needs NumPy")
+    with numpy.load(fname) as data:
+        return RelationCube(data['basic_types'].tolist(), data['pointers'].tolist(),
+                            data['counts'], data['table'])
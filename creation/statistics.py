@@ -1,3 +1,32 @@
+"""statistics.py
+
+Distributions and chi-square tests for the relations between basic types.
+
+Distribution and ChiSquaredCell test one distribution against another. For many
+distributions at once, for example one for each pair of basic types, use the
+ChiSquaredMatrix class, which does the same calculations with NumPy for all
+distributions in one go and gives the same results. NumPy is only needed for
+ChiSquaredMatrix.
+
+The chi-square test is not reliable when expected counts are small, which is the
+case for many pairs of basic types. For those the SparseSignificance class has
+tests that do not depend on large counts: an exact multinomial test or, when
+there are too many possible outcomes for that, a Monte-Carlo permutation test
+for each distribution, and a one-sided Fisher exact test for each cell. The
+p-values are corrected for multiple comparisons with the Benjamini-Hochberg
+procedure.
+
+"""
+
+import math
+import random
+import multiprocessing
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
 
 class Distribution(object):
 
@@ -46,6 +75,11 @@ class Distribution(object):
         self.X2_statistic = sum([c.component() for c in self.X2_table.values()])
         return self.X2_statistic
 
+    def p_value(self):
+        """The probability of a chi-square statistic at least as large as the one
+        calculated by chi_squared(), using self.df degrees of freedom."""
+        return chi_squared_p_value(self.X2_statistic, self.df)
+
     def pp(self):
         print(self)
         count = 0
@@ -72,6 +106,16 @@ class ChiSquaredCell(object):
         self.observed = distribution.get_count(cat)
         self.expected = null_hypothesis.get_probability(cat) * distribution.observations
 
+    @classmethod
+    def from_counts(cls, cat, observed, expected):
+        """Create a cell from an observed and expected count instead of from two
+        distributions."""
+        cell = cls.__new__(cls)
+        cell.category = cat
+        cell.observed = observed
+        cell.expected = expected
+        return cell
+
     def component(self):
         """The chi-square component of the cell."""
         return ((self.observed - self.expected) ** 2) / self.expected
@@ -80,3 +124,414 @@ class ChiSquaredCell(object):
         return "[%3s   %6d   %7s   %8s   %8s ]" \
             % (self.category, self.observed, "%4.2f" % self.expected,
                "%5.2f" % (self.observed - self.expected), "%5.2f" % self.component())
+
+
+class ChiSquaredMatrix(object):
+
+    """Chi-square tests of many distributions against the same null hypothesis,
+    calculated with NumPy on a matrix with a row for each distribution and a
+    column for each category of the null hypothesis. This gives the same numbers
+    as creating a Distribution for each row and calling chi_squared(), the
+    statistics are summed over the columns in the same order as Python's sum()
+    so even the rounding is the same.
+
+       >>> counts = {'a-b': {'%p': 10, '#p': 2}, 'a-c': {'#p': 30}}
+       >>> null = Distribution('ALL')
+       >>> for pointers in counts.values():
+       ...     for pointer, count in pointers.items():
+       ...         null.add(pointer, count)
+       >>> null.finish()
+       >>> matrix = ChiSquaredMatrix(counts, null)
+       >>> [round(x2, 2) for x2 in matrix.statistics.tolist()]
+       [23.44, 9.38]
+
+    Instance variables:
+
+    names
+        List of names of the distributions, one for each row.
+
+    categories
+        Sorted list of the categories of the null hypothesis, one for each column.
+
+    observed, expected, components
+        Matrices with observed counts, expected counts and the chi-square
+        component of each cell.
+
+    observations
+        Array with the number of observations of each row.
+
+    statistics
+        Array with the chi-square statistic of each row.
+
+    df
+        Array with degrees of freedom, like Distribution.df this is the number
+        of categories with observations in the row minus one.
+
+    """
+
+    def __init__(self, counts, null_hypothesis):
+        """Takes a dictionary { name ==> { category ==> count } } and a finished
+        Distribution that is the null hypothesis."""
+        if numpy is None:
+            raise ImportError("ChiSquaredMatrix needs NumPy")
+        self.null_hypothesis = null_hypothesis
+        self.names = list(counts.keys())
+        self.categories = null_hypothesis.get_categories()
+        column = {cat: i for i, cat in enumerate(self.categories)}
+        self.observed = numpy.zeros((len(self.names), len(self.categories)))
+        for row, name in enumerate(self.names):
+            for cat, count in counts[name].items():
+                self.observed[row, column[cat]] += count
+        self.df = numpy.array([len(counts[name]) - 1 for name in self.names])
+        self.observations = self.observed.sum(axis=1)
+        probabilities = numpy.array([null_hypothesis.get_probability(cat)
+                                     for cat in self.categories])
+        self.expected = probabilities[numpy.newaxis, :] * self.observations[:, numpy.newaxis]
+        self.components = (self.observed - self.expected) ** 2 / self.expected
+        self.statistics = numpy.zeros(len(self.names))
+        for i in range(len(self.categories)):
+            self.statistics += self.components[:, i]
+        self._p_values = None
+
+    def __str__(self):
+        return "<ChiSquaredMatrix distributions=%d categories=%d>" \
+            % (len(self.names), len(self.categories))
+
+    def p_values(self):
+        """Return an array with the p-value of each row. NumPy has no incomplete
+        gamma function so these are calculated one row at a time."""
+        if self._p_values is None:
+            self._p_values = numpy.array(
+                [chi_squared_p_value(x2, df) for x2, df in zip(self.statistics, self.df)])
+        return self._p_values
+
+    def cells(self, row):
+        """Return the ChiSquaredCells of a row, in the same order as the values
+        of Distribution.X2_table."""
+        return [ChiSquaredCell.from_counts(cat, int(self.observed[row, i]),
+                                           float(self.expected[row, i]))
+                for i, cat in enumerate(self.categories)]
+
+    def significant(self, min_observations=20, min_statistic=100, min_component=200):
+        """Return a dictionary { name ==> list of ChiSquaredCell } with the cells
+        where the observed count is larger than expected and the component is
+        larger than min_component, for the rows with at least min_observations
+        observations and a statistic of at least min_statistic. Rows without
+        such cells are not included."""
+        rows = (self.observations >= min_observations) & (self.statistics >= min_statistic)
+        cells = (self.observed > self.expected) & (self.components > min_component)
+        cells &= rows[:, numpy.newaxis]
+        result = {}
+        for row in numpy.flatnonzero(cells.any(axis=1)):
+            result[self.names[row]] = [cell for i, cell in enumerate(self.cells(row))
+                                       if cells[row, i]]
+        return result
+
+
+def chi_squared_p_value(x2, df):
+    """Return the probability that a chi-square distributed variable with df
+    degrees of freedom is at least x2, which is the regularized upper incomplete
+    gamma function Q(df/2, x2/2). Calculated with a series for small values and
+    with a continued fraction for large values, as in Numerical Recipes.
+
+       >>> round(chi_squared_p_value(3.841, 1), 3)
+       0.05
+       >>> round(chi_squared_p_value(18.307, 10), 3)
+       0.05
+
+    """
+    if df <= 0:
+        return 0.0 if x2 > 0 else 1.0
+    a = df / 2.0
+    x = x2 / 2.0
+    if x <= 0:
+        return 1.0
+    log_prefix = a * math.log(x) - x - math.lgamma(a)
+    if x < a + 1:
+        # series for the lower incomplete gamma function
+        term = total = 1.0 / a
+        n = a
+        for _ in range(1000):
+            n += 1
+            term *= x / n
+            total += term
+            if abs(term) < abs(total) * 1e-15:
+                break
+        return max(0.0, 1.0 - total * math.exp(log_prefix))
+    # continued fraction for the upper incomplete gamma function (Lentz)
+    tiny = 1e-300
+    b = x + 1.0 - a
+    c = 1.0 / tiny
+    d = 1.0 / b
+    h = d
+    for i in range(1, 1000):
+        an = -i * (i - a)
+        b += 2.0
+        d = an * d + b
+        d = tiny if abs(d) < tiny else d
+        c = b + an / c
+        c = tiny if abs(c) < tiny else c
+        d = 1.0 / d
+        delta = d * c
+        h *= delta
+        if abs(delta - 1.0) < 1e-15:
+            break
+    return math.exp(log_prefix) * h
+
+
+class SparseSignificance(object):
+
+    """Tests distributions with few observations against a null hypothesis that
+    is a Distribution with the counts of a population of observations, for
+    example all relations in WordNet. The null hypothesis of each test is that
+    the observations of a distribution are a random sample from that population.
+
+    For each distribution there is an exact multinomial test if the number of
+    possible outcomes is at most max_outcomes, otherwise a permutation test with
+    the given number of random samples from the population. For each cell there
+    is a one-sided Fisher exact test for the observed count being larger than
+    expected. Each distribution gets its own random number generator, seeded
+    with the seed and the name of the distribution, so results do not depend on
+    the order of the tests or on the number of worker processes.
+
+       tests = SparseSignificance(counts, null, permutations=10000, workers=4)
+       tests.run()
+       significant = tests.significant(alpha=0.05)
+
+    Instance variables:
+
+    results
+        { name ==> SparseTestResult }, filled in by run().
+
+    """
+
+    def __init__(self, counts, null_hypothesis, permutations=10000, max_outcomes=100000,
+                 seed=0, workers=1):
+        """Takes a dictionary { name ==> { category ==> count } } and a finished
+        Distribution that is the null hypothesis."""
+        self.counts = counts
+        self.null_hypothesis = null_hypothesis
+        self.categories = null_hypothesis.get_categories()
+        self.permutations = permutations
+        self.max_outcomes = max_outcomes
+        self.seed = seed
+        self.workers = workers
+        self.results = {}
+
+    def __str__(self):
+        return "<SparseSignificance distributions=%d tested=%d>" \
+            % (len(self.counts), len(self.results))
+
+    def run(self, names=None):
+        """Test the distributions with the given names, or all of them, and then
+        apply the Benjamini-Hochberg correction over all results."""
+        names = list(self.counts) if names is None else list(names)
+        population = [self.null_hypothesis.get_count(cat) for cat in self.categories]
+        tasks = [(name, [self.counts[name].get(cat, 0) for cat in self.categories],
+                  population, self.permutations, self.max_outcomes, self.seed)
+                 for name in names]
+        if self.workers > 1:
+            pool = multiprocessing.get_context('fork').Pool(self.workers)
+            try:
+                results = pool.map(_run_sparse_tests, tasks, chunksize=16)
+            finally:
+                pool.terminate()
+        else:
+            results = [_run_sparse_tests(task) for task in tasks]
+        for name, (p_value, method, cell_p_values) in zip(names, results):
+            self.results[name] = SparseTestResult(name, p_value, method, cell_p_values)
+        self._adjust()
+        return self.results
+
+    def _adjust(self):
+        results = list(self.results.values())
+        for result, q in zip(results, benjamini_hochberg([r.p_value for r in results])):
+            result.q_value = q
+        cells = [(result, i) for result in results for i in range(len(self.categories))]
+        q_values = benjamini_hochberg([result.cell_p_values[i] for result, i in cells])
+        for (result, i), q in zip(cells, q_values):
+            result.cell_q_values[i] = q
+
+    def significant(self, alpha=0.05):
+        """Return a dictionary { name ==> list of ChiSquaredCell } with the cells
+        of the distributions that differ significantly from the null hypothesis
+        where the observed count is significantly larger than expected. Both
+        use the p-values after the Benjamini-Hochberg correction."""
+        significant = {}
+        for name, result in self.results.items():
+            if result.q_value >= alpha:
+                continue
+            observations = sum(self.counts[name].values())
+            cells = []
+            for i, cat in enumerate(self.categories):
+                expected = self.null_hypothesis.get_probability(cat) * observations
+                observed = self.counts[name].get(cat, 0)
+                if observed > expected and result.cell_q_values[i] < alpha:
+                    cells.append(ChiSquaredCell.from_counts(cat, observed, expected))
+            if cells:
+                significant[name] = cells
+        return significant
+
+
+class SparseTestResult(object):
+
+    """Result of the tests of one distribution by SparseSignificance.
+
+    Instance variables:
+
+    p_value, q_value
+        P-value of the test of the distribution, before and after correction.
+
+    method
+        'exact' or 'permutation'.
+
+    cell_p_values, cell_q_values
+        Lists with the p-values of the Fisher tests of the cells, before and
+        after correction, in the order of the categories of the null hypothesis.
+
+    """
+
+    def __init__(self, name, p_value, method, cell_p_values):
+        self.name = name
+        self.p_value = p_value
+        self.q_value = None
+        self.method = method
+        self.cell_p_values = cell_p_values
+        self.cell_q_values = [None] * len(cell_p_values)
+
+    def __str__(self):
+        return "<SparseTestResult %s %s p=%.4g>" % (self.name, self.method, self.p_value)
+
+
+def _run_sparse_tests(task):
+    """Run the tests for one distribution, this runs in the worker processes."""
+    name, observed, population, permutations, max_outcomes, seed = task
+    total = sum(population)
+    probabilities = [count / total for count in population]
+    p_value = multinomial_exact_test(observed, probabilities, max_outcomes)
+    method = 'exact'
+    if p_value is None:
+        rng = random.Random("%s|%s" % (seed, name))
+        p_value = permutation_test(observed, population, permutations, rng)
+        method = 'permutation'
+    n = sum(observed)
+    cell_p_values = [fisher_exact_test(o, n, k, total) for o, k in zip(observed, population)]
+    return p_value, method, cell_p_values
+
+
+def multinomial_exact_test(observed, probabilities, max_outcomes=100000):
+    """Return the probability of all outcomes of a multinomial distribution that
+    are at most as probable as the observed counts, or None if there are more
+    than max_outcomes possible outcomes.
+
+       >>> round(multinomial_exact_test([3, 0], [0.5, 0.5]), 3)
+       0.25
+
+    """
+    n = sum(observed)
+    k = len(observed)
+    if math.comb(n + k - 1, k - 1) > max_outcomes:
+        return None
+    log_factorials = [math.lgamma(i + 1) for i in range(n + 1)]
+    log_probabilities = [math.log(p) if p > 0 else None for p in probabilities]
+
+    def log_probability(counts):
+        result = log_factorials[n]
+        for count, log_p in zip(counts, log_probabilities):
+            if count:
+                if log_p is None:
+                    return None
+                result += count * log_p - log_factorials[count]
+        return result
+
+    threshold = log_probability(observed)
+    if threshold is None:
+        return 0.0
+    # outcomes within a tiny tolerance count as equally probable
+    threshold += 1e-7
+    p_value = 0.0
+    for counts in _compositions(n, k):
+        log_p = log_probability(counts)
+        if log_p is not None and log_p <= threshold:
+            p_value += math.exp(log_p)
+    return min(1.0, p_value)
+
+
+def _compositions(n, k):
+    """Generate all lists of k non-negative integers that add up to n."""
+    if k == 1:
+        yield [n]
+        return
+    for first in range(n, -1, -1):
+        for rest in _compositions(n - first, k - 1):
+            yield [first] + rest
+
+
+def permutation_test(observed, population, permutations, rng=random):
+    """Return the Monte-Carlo p-value of the chi-square statistic of the observed
+    counts, where the population has the counts of all observations and each
+    permutation takes a random sample of as many observations as observed from
+    the population, without replacement."""
+    n = sum(observed)
+    total = sum(population)
+    expected = [n * count / total for count in population]
+    statistic = _chi_squared(observed, expected)
+    categories = list(range(len(population)))
+    at_least = 0
+    for _ in range(permutations):
+        sample = [0] * len(population)
+        for cat in rng.sample(categories, n, counts=population):
+            sample[cat] += 1
+        if _chi_squared(sample, expected) >= statistic - 1e-9:
+            at_least += 1
+    return (at_least + 1) / (permutations + 1)
+
+
+def _chi_squared(observed, expected):
+    return sum([(o - e) ** 2 / e for o, e in zip(observed, expected) if e > 0])
+
+
+def fisher_exact_test(a, n, k, total):
+    """Return the one-sided p-value of Fisher's exact test for a sample of n out
+    of total observations having at least a observations of a category that has
+    k observations in total, that is, the upper tail of the hypergeometric
+    distribution.
+
+       >>> round(fisher_exact_test(3, 3, 5, 10), 4)
+       0.0833
+
+    """
+    if a <= 0:
+        return 1.0
+    if a > min(n, k):
+        return 0.0
+    log_denominator = _log_comb(total, n)
+    p_value = 0.0
+    for x in range(a, min(n, k) + 1):
+        p_value += math.exp(_log_comb(k, x) + _log_comb(total - k, n - x) - log_denominator)
+    return min(1.0, p_value)
+
+
+def _log_comb(n, k):
+    if k < 0 or k > n:
+        return -math.inf
+    return math.lgamma(n + 1) - math.lgamma(k + 1) - math.lgamma(n - k + 1)
+
+
+def benjamini_hochberg(p_values):
+    """Return the p-values adjusted with the Benjamini-Hochberg procedure, in the
+    same order. A hypothesis is rejected at false discovery rate alpha if its
+    adjusted p-value is less than alpha.
+
+       >>> [round(q, 3) for q in benjamini_hochberg([0.01, 0.04, 0.03, 0.5])]
+       [0.04, 0.053, 0.053, 0.5]
+
+    """
+    m = len(p_values)
+    order = sorted(range(m), key=lambda i: p_values[i], reverse=True)
+    adjusted = [0.0] * m
+    smallest = 1.0
+    for rank, i in zip(range(m, 0, -1), order):
+        smallest = min(smallest, p_values[i] * m / rank)
+        adjusted[i] = smallest
+    return adjusted
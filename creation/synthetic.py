@@ -0,0 +1,560 @@
+"""synthetic.py
+
+Create a synthetic WordNet in the WNDB format, for testing and benchmarking
+without the WordNet download.
+
+Usage:
+
+   $ python3 synthetic.py <directory> [--scale S] [--depth D] [--fanout F]
+                          [--multiple P] [--relations R] [--gloss-words G]
+                          [--seed N]
+
+   S    size relative to WordNet 3.1, which has about 82,000 noun and 14,000
+        verb synsets (default 1.0)
+   D    maximum depth of the noun hierarchy (default 18)
+   F    average number of hyponyms of a noun synset (default 5.0)
+   P    fraction of noun synsets with a second hypernym (default 0.02)
+   R    number of part, member, substance and antonym relations for each noun
+        synset (default 0.3)
+   G    average number of words in a gloss (default 10)
+   N    seed of the random numbers, the same seed gives the same files
+
+This writes the files that wordnet.py reads:
+
+   <directory>/WordNet-3.1/DICT/data.noun
+   <directory>/WordNet-3.1/DICT/data.verb
+   <directory>/WordNet-3.1/DICT/index.noun
+   <directory>/WordNet-3.1/DICT/index.verb
+   <directory>/WordNet-3.1/DICT/index.sense
+
+The files have the same syntax as the WordNet files, synset identifiers are the
+byte offsets of the lines in the data files and index.sense has sense keys for
+all words. WordNet can then be loaded with WORDNET_DIR set to the directory:
+
+   >>> import wordnet
+   >>> wordnet.WORDNET_DIR = '<directory>/WordNet-%s/'
+   >>> wn = wordnet.WordNet('3.1')
+
+The noun hierarchy has a synset for each synset of the basic types in
+cltypes.BASIC_TYPES_3_1, with the same words. The hypernyms of these synsets are
+the synsets of the basic types they are a subtype of according to
+cltypes.BASIC_TYPES_ISA_RELATIONS_3_1. So act.03.0 has the hypernyms abs, evt
+and psy, and the basic types nest like they do in WordNet. The rest of the
+hierarchy is grown below these synsets, each synset gets a random number of
+hyponyms with the given average, until there are enough synsets. Since the
+synset identifiers are different from those in WordNet, the basic type
+inventory is also written in the format of cltypes.BASIC_TYPES_3_1:
+
+   <directory>/WordNet-3.1/basic_types.py
+
+It can be used for WordNet.add_nominal_basic_types() and with the
+--update-cltype-files option of corelex.py.
+
+Words are new lemmas or lemmas of other synsets, so there is polysemy, general
+lemmas from high in the hierarchy are more likely to be used again. The number
+of words per synset and the number of lemmas per sense are about those of
+WordNet 3.1. Verbs form a forest of shallow trees.
+
+Synset identifiers have 8 digits, so a data file can have at most 10**8 bytes.
+At the default gloss length this allows a scale of about 7 and with one word
+per gloss a scale of about 11, max_gloss_words() gives the longest glosses that
+fit for a scale.
+
+"""
+
+import os
+import sys
+import math
+import random
+import pprint
+from collections import deque
+
+import cltypes
+
+
+# sizes of WordNet 3.0, WordNet 3.1 is almost the same
+NOUN_SYNSETS = 82115
+VERB_SYNSETS = 13767
+
+# average number of words in a synset and the probability that a word is a new
+# lemma and not a lemma that is already used in another synset, these give the
+# number of lemmas and senses of WordNet
+NOUN_WORDS = 1.78
+VERB_WORDS = 1.82
+NOUN_NEW_LEMMAS = 0.80
+VERB_NEW_LEMMAS = 0.46
+
+# fraction of verbs without a hypernym
+VERB_ROOTS = 0.04
+
+# how often the newest synset gets hyponyms instead of the oldest synset that did
+# not have its turn yet, this spreads the depths of the synsets like in WordNet
+DEPTH_FIRST = 0.35
+
+# no lemma has more senses than this in a category
+MAX_SENSES = 60
+
+# the largest byte offset that fits in a synset identifier
+MAX_OFFSET = 10**8 - 1
+
+# bytes in data.noun for a scale of 1 without glosses and for each word in the
+# glosses, measured with the default parameters, data.noun grows linearly with
+# the scale
+NOUN_BYTES = 8.06e6
+NOUN_GLOSS_WORD_BYTES = 0.5e6
+
+# relations other than hypernyms and hyponyms, with the inverse relation and the
+# relative frequency, antonyms are between words and not between synsets
+NOUN_RELATIONS = [('%p', '#p', '0000', 0.35), ('%m', '#m', '0000', 0.45),
+                  ('%s', '#s', '0000', 0.05), ('!', '!', '0101', 0.15)]
+VERB_RELATIONS = [('*', None, '0000', 0.4), ('>', None, '0000', 0.2), ('$', '$', '0000', 0.4)]
+
+# license lines at the start of the WordNet files are replaced by these
+HEADER = ("  1 This is a synthetic WordNet created by synthetic.py, it is not\n"
+          "  2 WordNet and does not contain any WordNet data.\n")
+
+SYLLABLES = [c + v for c in 'bdfgklmnprstvz' for v in 'aeiou']
+
+GLOSS_WORDS = ['a', 'an', 'the', 'of', 'or', 'and', 'in', 'on', 'for', 'with', 'by',
+               'that', 'which', 'is', 'used', 'made', 'having', 'something', 'someone',
+               'part', 'kind', 'form', 'act', 'state', 'place', 'person', 'thing',
+               'small', 'large', 'especially', 'usually', 'often', 'any', 'one',
+               'body', 'water', 'time', 'work', 'quality', 'process', 'group']
+
+
+class SyntheticWordNet(object):
+
+    """A randomly created WordNet with nouns and verbs.
+
+    Instance variables:
+
+    nouns, verbs
+        The Hierarchy of each category.
+
+    """
+
+    def __init__(self, scale=1.0, depth=18, fanout=5.0, multiple=0.02, relations=0.3,
+                 gloss_words=10, seed=0, btypes=None, type_relations=None,
+                 verb_depth=12, verb_fanout=2.5):
+        """Create the synsets. The btypes and type_relations default to the basic
+        types and the relations between them for WordNet 3.1 in cltypes."""
+        rng = random.Random(seed)
+        btypes = cltypes.BASIC_TYPES_3_1 if btypes is None else btypes
+        type_relations = cltypes.BASIC_TYPES_ISA_RELATIONS_3_1 \
+            if type_relations is None else type_relations
+        self.nouns = Hierarchy('noun', rng, NOUN_WORDS, NOUN_NEW_LEMMAS, gloss_words)
+        self.nouns.add_basic_types(btypes, type_relations)
+        self.nouns.grow(max(int(round(NOUN_SYNSETS * scale)), len(self.nouns.words)),
+                        depth, fanout, multiple)
+        self.nouns.add_relations(NOUN_RELATIONS, relations)
+        self.nouns.layout()
+        self.verbs = Hierarchy('verb', rng, VERB_WORDS, VERB_NEW_LEMMAS, gloss_words)
+        n = max(int(round(VERB_SYNSETS * scale)), 1)
+        self.verbs.add_roots(max(int(round(n * VERB_ROOTS)), 1))
+        self.verbs.grow(n, verb_depth, verb_fanout, 0.0)
+        self.verbs.add_relations(VERB_RELATIONS, 0.1)
+        self.verbs.layout()
+
+    def __str__(self):
+        return "<SyntheticWordNet nouns=%d verbs=%d>" % (len(self.nouns.words), len(self.verbs.words))
+
+    def size(self):
+        """Return the sizes in bytes of the noun and verb data files."""
+        return self.nouns.size, self.verbs.size
+
+    def basic_types(self):
+        """Return the basic type inventory, in the format of cltypes.BASIC_TYPES_3_1,
+        with the identifiers of the synsets of the basic types."""
+        return self.nouns.basic_types()
+
+    def write(self, directory):
+        """Write the DICT files and the basic types file to the WordNet-3.1
+        directory in the directory and return the path of that directory."""
+        wn_dir = os.path.join(directory, 'WordNet-3.1')
+        dict_dir = os.path.join(wn_dir, 'DICT')
+        os.makedirs(dict_dir, exist_ok=True)
+        for hierarchy in (self.nouns, self.verbs):
+            hierarchy.write_data(os.path.join(dict_dir, 'data.%s' % hierarchy.category))
+            hierarchy.write_index(os.path.join(dict_dir, 'index.%s' % hierarchy.category))
+        fname = os.path.join(dict_dir, 'index.sense')
+        print("Writing", fname)
+        with open(fname, 'w') as fh:
+            fh.writelines(sorted(self.nouns.sense_lines() + self.verbs.sense_lines()))
+        fname = os.path.join(wn_dir, 'basic_types.py')
+        print("Writing", fname)
+        with open(fname, 'w') as fh:
+            pprint.PrettyPrinter(stream=fh, indent=4).pprint(self.basic_types())
+        return wn_dir
+
+
+class Hierarchy(object):
+
+    """The synsets of one category. Synsets are identified by their position in
+    the lists, which is also the order of the lines in the data file.
+
+    Instance variables:
+
+    category, pos, ss_type
+        The category ('noun' or 'verb'), its part of speech letter and the
+        number used for it in sense keys.
+
+    hypernyms, hyponyms
+        Lists with a list of synset positions for each synset.
+
+    depth
+        List with the length of the longest path to a top synset.
+
+    lex_filenums
+        List with the number of the lexicographer file of each synset.
+
+    words
+        List with a list of [lemma, lex_id] pairs for each synset.
+
+    pointers
+        List with a list of (pointer symbol, synset position, source_target)
+        triples for each synset, for the relations other than hypernyms and
+        hyponyms.
+
+    glosses
+        List with the gloss of each synset.
+
+    frames
+        List with the verb frames of each synset, None for nouns.
+
+    btypes
+        List of (basic type, synset position) pairs.
+
+    offsets, size
+        The synset identifiers, which are the byte offsets of the synsets in
+        the data file, and the size of the data file. Set by layout().
+
+    """
+
+    def __init__(self, category, rng, words, new_lemmas, gloss_words):
+        self.category = category
+        self.pos = category[0]
+        self.ss_type = 1 if category == 'noun' else 2
+        self.rng = rng
+        self.mean_words = words
+        self.new_lemmas = new_lemmas
+        self.gloss_words = gloss_words
+        self.hypernyms = []
+        self.hyponyms = []
+        self.depth = []
+        self.lex_filenums = []
+        self.words = []
+        self.pointers = []
+        self.glosses = []
+        self.frames = None if category == 'noun' else []
+        self.btypes = []
+        self.offsets = None
+        self.size = None
+        # lemmas in the order they were first used, the number of senses of each
+        # lemma and the number of senses of a lemma in each lexicographer file
+        self._lemmas = []
+        self._senses = {}
+        self._lex_ids = {}
+        self._new_lemma_count = 0
+
+    def add_synset(self, hypernyms, lex_filenum, words=None):
+        position = len(self.words)
+        self.hypernyms.append(hypernyms)
+        self.hyponyms.append([])
+        for hypernym in hypernyms:
+            self.hyponyms[hypernym].append(position)
+        self.depth.append(max([self.depth[h] + 1 for h in hypernyms]) if hypernyms else 0)
+        self.lex_filenums.append(lex_filenum)
+        if words is None:
+            words = self._new_words(lex_filenum)
+        for lemma, lex_id in words:
+            self._add_sense(lemma, lex_filenum, lex_id)
+        self.words.append(words)
+        self.pointers.append([])
+        self.glosses.append(self._new_gloss())
+        if self.frames is not None:
+            self.frames.append(self._new_frames())
+        return position
+
+    def add_basic_types(self, btypes, type_relations):
+        """Add a synset for each synset of the basic types, with the synsets of
+        the closest more general basic types as hypernyms."""
+        supertypes = {btype: set() for btype in btypes}
+        for subtype, supertype in type_relations:
+            if subtype in supertypes and supertype in supertypes:
+                supertypes[subtype].add(supertype)
+        # leave out the supertypes of supertypes and add the most general
+        # basic types first
+        positions = {}
+        for btype in sorted(btypes, key=lambda bt: (len(supertypes[bt]), bt)):
+            parents = [bt for bt in supertypes[btype]
+                       if not any([bt in supertypes[other] for other in supertypes[btype]])]
+            hypernyms = sorted([positions[parent] for parent in parents])
+            for synset_id, members in btypes[btype]:
+                # names are lemma.lex_filenum.lex_id, others are skipped
+                names = [name.rsplit('.', 2) for name in members.split()]
+                names = [name for name in names if len(name) == 3 and name[1].isdigit()]
+                words = [[lemma, int(lex_id, 16)] for lemma, lex_filenum, lex_id in names]
+                lex_filenum = int(names[0][1]) if names else 3
+                position = self.add_synset(hypernyms, lex_filenum, words or None)
+                positions.setdefault(btype, position)
+                self.btypes.append((btype, position))
+
+    def add_roots(self, n):
+        """Add n synsets without hypernyms, in the verb lexicographer files."""
+        for i in range(n):
+            self.add_synset([], 29 + i % 15)
+
+    def grow(self, n, max_depth, fanout, multiple):
+        """Add hyponyms to the synsets until there are n synsets, mostly breadth
+        first and sometimes depth first (see DEPTH_FIRST). Each synset gets a
+        random number of hyponyms, fanout on average, unless it is at
+        max_depth. A fraction of multiple of the new synsets gets a second
+        hypernym higher up in the hierarchy. Children of the basic type
+        synsets start a new lexicographer file, other synsets are in the file
+        of their first hypernym. When all synsets had their turn and there are
+        not yet n synsets, the synsets that are not too deep get another
+        turn."""
+        queue = deque(range(len(self.words)))
+        while len(self.words) < n:
+            if not queue:
+                queue.extend([i for i in range(len(self.words)) if self.depth[i] < max_depth])
+                if not queue:
+                    raise ValueError("no synsets above depth %d" % max_depth)
+            parent = queue.pop() if self.rng.random() < DEPTH_FIRST else queue.popleft()
+            if self.depth[parent] >= max_depth or len(self.hyponyms[parent]) > 500:
+                continue
+            for i in range(_geometric(self.rng, fanout)):
+                if len(self.words) >= n:
+                    break
+                hypernyms = [parent]
+                if multiple and self.rng.random() < multiple:
+                    hypernyms.extend(self._other_hypernym(parent))
+                lex_filenum = self.lex_filenums[parent]
+                if parent < len(self.btypes):
+                    # the basic type synsets come first
+                    lex_filenum = 4 + self.rng.randrange(25)
+                queue.append(self.add_synset(hypernyms, lex_filenum))
+
+    def _other_hypernym(self, parent):
+        """Return a list with a random synset that is not deeper than the parent,
+        or an empty list if none was found. Synsets can only have hypernyms that
+        were added before them, so there are no cycles."""
+        for i in range(10):
+            other = self.rng.randrange(len(self.words))
+            if other != parent and self.depth[other] <= self.depth[parent]:
+                return [other]
+        return []
+
+    def add_relations(self, relations, rate):
+        """Add rate relations for each synset, with symbols from the relations,
+        which is a list of (symbol, inverse symbol, source_target, frequency)
+        tuples. As in WordNet, where for example parts of body parts are body
+        parts too, half of the targets come from a lexicographer file that
+        depends on the symbol and the lexicographer file of the source."""
+        n = len(self.words)
+        weights = [relation[3] for relation in relations]
+        by_lex_filenum = {}
+        for i, lex_filenum in enumerate(self.lex_filenums):
+            by_lex_filenum.setdefault(lex_filenum, []).append(i)
+        lex_filenums = sorted(by_lex_filenum)
+        preferred = {}
+        for i in range(int(rate * n)):
+            symbol, inverse, source_target, weight = self.rng.choices(relations, weights)[0]
+            source = self.rng.randrange(n)
+            if self.rng.random() < 0.5:
+                key = (symbol, self.lex_filenums[source])
+                if key not in preferred:
+                    preferred[key] = by_lex_filenum[self.rng.choice(lex_filenums)]
+                target = self.rng.choice(preferred[key])
+            else:
+                target = self.rng.randrange(n)
+            if source == target:
+                continue
+            self.pointers[source].append((symbol, target, source_target))
+            if inverse is not None:
+                self.pointers[target].append((inverse, source, source_target[2:] + source_target[:2]))
+
+    def _new_words(self, lex_filenum):
+        words = []
+        for i in range(1 + _geometric(self.rng, self.mean_words - 1)):
+            lemma = None
+            if self._lemmas and self.rng.random() > self.new_lemmas:
+                # earlier lemmas are more likely to be used again
+                lemma = self._lemmas[int(len(self._lemmas) * self.rng.random() ** 1.5)]
+                if self._senses[lemma] >= MAX_SENSES \
+                        or self._lex_ids.get((lemma, lex_filenum), 0) > 15 \
+                        or lemma in [word[0] for word in words]:
+                    lemma = None
+            if lemma is None:
+                lemma = self._new_lemma()
+            words.append([lemma, self._lex_ids.get((lemma, lex_filenum), 0)])
+        return words
+
+    def _new_lemma(self):
+        number = self._new_lemma_count
+        self._new_lemma_count += 1
+        lemma = _syllables(number + len(SYLLABLES) ** 2)
+        if self.rng.random() < 0.15:
+            lemma += '_' + _syllables(self.rng.randrange(number + len(SYLLABLES)))
+        return lemma
+
+    def _add_sense(self, lemma, lex_filenum, lex_id):
+        if lemma not in self._senses:
+            self._lemmas.append(lemma)
+            self._senses[lemma] = 0
+        self._senses[lemma] += 1
+        key = (lemma, lex_filenum)
+        self._lex_ids[key] = max(self._lex_ids.get(key, 0), lex_id + 1)
+
+    def _new_gloss(self):
+        tokens = []
+        for i in range(1 + _geometric(self.rng, self.gloss_words - 1)):
+            if self._lemmas and self.rng.random() < 0.3:
+                tokens.append(self.rng.choice(self._lemmas).replace('_', ' '))
+            else:
+                tokens.append(self.rng.choice(GLOSS_WORDS))
+        gloss = ' '.join(tokens)
+        if self.rng.random() < 0.3:
+            gloss += '; "%s"' % ' '.join(self.rng.sample(GLOSS_WORDS, 4))
+        return gloss
+
+    def _new_frames(self):
+        frames = sorted(self.rng.sample(range(1, 36), self.rng.randint(1, 2)))
+        return '%02d %s' % (len(frames), ' '.join(['+ %02d 00' % f for f in frames]))
+
+    def all_pointers(self, i):
+        """Return the (symbol, position, source_target) triples of all pointers of
+        the synset, hypernyms first."""
+        return [('@', h, '0000') for h in self.hypernyms[i]] \
+            + [('~', h, '0000') for h in self.hyponyms[i]] + self.pointers[i]
+
+    def data_line(self, i, ids):
+        """Return the line of the data file for the synset, using the list of
+        synset identifiers."""
+        fields = [ids[i], '%02d' % self.lex_filenums[i], self.pos, '%02x' % len(self.words[i])]
+        for lemma, lex_id in self.words[i]:
+            fields.append(lemma)
+            fields.append('%x' % lex_id)
+        pointers = self.all_pointers(i)
+        fields.append('%03d' % len(pointers))
+        for symbol, target, source_target in pointers:
+            fields.extend((symbol, ids[target], self.pos, source_target))
+        if self.frames is not None:
+            fields.append(self.frames[i])
+        return "%s | %s  \n" % (' '.join(fields), self.glosses[i])
+
+    def layout(self):
+        """Set the synset identifiers to the byte offsets of the lines in the data
+        file. The lines have the same length with any identifiers since they all
+        have eight digits. Raises ValueError if the data file is too large for
+        eight digit identifiers."""
+        placeholders = ['00000000'] * len(self.words)
+        offsets = []
+        offset = len(HEADER)
+        for i in range(len(self.words)):
+            offsets.append(offset)
+            offset += len(self.data_line(i, placeholders))
+        if offset - 1 > MAX_OFFSET:
+            raise ValueError("data.%s would have %d bytes, more than eight digit offsets allow"
+                             % (self.category, offset))
+        self.offsets = ['%08d' % offset for offset in offsets]
+        self.size = offset
+
+    def basic_types(self):
+        btypes = {}
+        for btype, i in self.btypes:
+            names = ' '.join(['%s.%02d.%x' % (lemma, self.lex_filenums[i], lex_id)
+                              for lemma, lex_id in self.words[i]])
+            btypes.setdefault(btype, []).append((self.offsets[i], names))
+        return btypes
+
+    def senses(self):
+        """Return { lemma ==> list of (tag count, position, lex_id) } with the
+        senses of each lemma in the order of the index file, most frequent sense
+        first. The tag counts are random, most are zero."""
+        senses = {}
+        rng = random.Random(self.category)
+        for i, words in enumerate(self.words):
+            for lemma, lex_id in words:
+                tag_count = int(rng.expovariate(0.2)) if rng.random() < 0.3 else 0
+                senses.setdefault(lemma, []).append((tag_count, i, lex_id))
+        for lemma in senses:
+            senses[lemma].sort(key=lambda sense: (-sense[0], sense[1]))
+        return senses
+
+    def write_data(self, fname):
+        print("Writing", fname)
+        with open(fname, 'w') as fh:
+            fh.write(HEADER)
+            for i in range(len(self.words)):
+                fh.write(self.data_line(i, self.offsets))
+
+    def write_index(self, fname):
+        print("Writing", fname)
+        symbols = [sorted(set([p[0] for p in self.all_pointers(i)])) for i in range(len(self.words))]
+        with open(fname, 'w') as fh:
+            fh.write(HEADER)
+            for lemma, senses in sorted(self.senses().items()):
+                lemma_symbols = sorted(set([s for sense in senses for s in symbols[sense[1]]]))
+                tagged = len([sense for sense in senses if sense[0] > 0])
+                fields = [lemma.lower(), self.pos, str(len(senses)), str(len(lemma_symbols))] \
+                    + lemma_symbols + [str(len(senses)), str(tagged)] \
+                    + [self.offsets[sense[1]] for sense in senses]
+                fh.write("%s  \n" % ' '.join(fields))
+
+    def sense_lines(self):
+        """Return the lines for index.sense."""
+        lines = []
+        for lemma, senses in self.senses().items():
+            for number, (tag_count, i, lex_id) in enumerate(senses, 1):
+                lines.append("%s%%%d:%02d:%02d:: %s %d %d\n"
+                             % (lemma.lower(), self.ss_type, self.lex_filenums[i], lex_id,
+                                self.offsets[i], number, tag_count))
+        return lines
+
+
+def max_gloss_words(scale, margin=0.95):
+    """Return the largest average gloss length, up to the default of 10, for
+    which data.noun of a synthetic WordNet with the default parameters stays
+    within the margin of what eight digit offsets allow. Returns None if even
+    glosses of one word do not fit."""
+    words = (margin * MAX_OFFSET / scale - NOUN_BYTES) / NOUN_GLOSS_WORD_BYTES
+    return None if words < 1 else min(10, int(words))
+
+
+def _geometric(rng, mean):
+    """Return a random integer of zero or more with the geometric distribution
+    with the given mean."""
+    if mean <= 0:
+        return 0
+    return int(math.log(1.0 - rng.random()) / math.log(mean / (mean + 1.0)))
+
+
+def _syllables(number):
+    """Return a made-up word for the number, different numbers give different
+    words."""
+    word = []
+    while True:
+        number, syllable = divmod(number, len(SYLLABLES))
+        word.append(SYLLABLES[syllable])
+        if number == 0:
+            return ''.join(word)
+
+
+def _option(name, default):
+    return sys.argv[sys.argv.index(name) + 1] if name in sys.argv else default
+
+
+if __name__ == '__main__':
+
+    if len(sys.argv) < 2 or sys.argv[1].startswith('--'):
+        exit(__doc__)
+    swn = SyntheticWordNet(scale=float(_option('--scale', 1.0)),
+                           depth=int(_option('--depth', 18)),
+                           fanout=float(_option('--fanout', 5.0)),
+                           multiple=float(_option('--multiple', 0.02)),
+                           relations=float(_option('--relations', 0.3)),
+                           gloss_words=float(_option('--gloss-words', 10)),
+                           seed=int(_option('--seed', 0)))
+    print(swn)
+    swn.write(sys.argv[1])
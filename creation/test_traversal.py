@@ -0,0 +1,61 @@
+"""test_traversal.py
+
+Tests for traversal.py on a small synthetic WordNet (see synthetic.py), like
+test_workers.py it needs a config.py:
+
+   $ python3 test_traversal.py
+
+"""
+
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import wordnet
+from wordnet import NOUN, Pointer
+from traversal import neighbours, traverse
+from synthetic import SyntheticWordNet
+
+
+class CrossCategoryTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.directory = tempfile.mkdtemp()
+        cls.wordnet_dir = wordnet.WORDNET_DIR
+        SyntheticWordNet(scale=0.02).write(cls.directory)
+        wordnet.WORDNET_DIR = os.path.join(cls.directory, 'WordNet-%s/')
+        cls.wn = wordnet.WordNet('3.1')
+
+    @classmethod
+    def tearDownClass(cls):
+        wordnet.WORDNET_DIR = cls.wordnet_dir
+        shutil.rmtree(cls.directory)
+
+    def setUp(self):
+        # an attribute pointer to an adjective, adjectives are not loaded
+        self.synset = next(iter(self.wn.synset_index()[NOUN].values()))
+        self.pointers = dict(self.synset.pointers)
+        self.synset.pointers['='] = [Pointer(['=', '01234567', 'a', '0000'])]
+
+    def tearDown(self):
+        self.synset.pointers = self.pointers
+
+    def test_neighbours_skip_other_categories(self):
+        found = list(neighbours(self.synset))
+        expected = sum(len(pointers) for pointers in self.pointers.values())
+        self.assertEqual(len(found), expected)
+        self.assertNotIn('=', [symbol for symbol, target in found])
+
+    def test_traverse(self):
+        nodes = list(traverse(self.synset, max_depth=2, include_start=True))
+        self.assertIs(nodes[0].synset, self.synset)
+
+
+if __name__ == '__main__':
+
+    unittest.main()
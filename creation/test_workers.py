@@ -0,0 +1,54 @@
+"""test_workers.py
+
+Checks that creating the CoreLex files with several worker processes gives the
+same files, byte for byte, as creating them in one process. This uses a small
+synthetic WordNet (see synthetic.py), so it does not need the WordNet download,
+but like the other scripts it needs a config.py. Run it from this directory:
+
+   $ python3 test_workers.py
+
+"""
+
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+
+# corelex reads ../VERSION when it is imported
+os.chdir(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.getcwd())
+
+import cltypes
+import wordnet
+import corelex
+from synthetic import SyntheticWordNet
+
+
+class WorkersTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.directory = tempfile.mkdtemp()
+        cls.wordnet_dir = wordnet.WORDNET_DIR
+        cls.basic_types = cltypes.BASIC_TYPES_3_1
+        swn = SyntheticWordNet(scale=0.1)
+        swn.write(cls.directory)
+        wordnet.WORDNET_DIR = os.path.join(cls.directory, 'WordNet-%s/')
+        cltypes.BASIC_TYPES_3_1 = swn.basic_types()
+        cls.wn = wordnet.WordNet('3.1')
+        cls.wn.add_basic_types()
+
+    @classmethod
+    def tearDownClass(cls):
+        wordnet.WORDNET_DIR = cls.wordnet_dir
+        cltypes.BASIC_TYPES_3_1 = cls.basic_types
+        shutil.rmtree(cls.directory)
+
+    def test_three_workers(self):
+        self.assertTrue(corelex.check_workers(self.wn, 3))
+
+
+if __name__ == '__main__':
+
+    unittest.main()
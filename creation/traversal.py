@@ -0,0 +1,204 @@
+"""traversal.py
+
+Lazy traversal of the WordNet pointer graph. All traversals are generators that
+yield Node instances as soon as they are visited, so a caller can stop at any
+time without the rest of the graph being visited. Breadth-first and depth-first
+traversals both use an explicit queue or stack instead of recursion.
+
+Traversals can be restricted in several ways:
+
+- pointers: only follow pointers with the given symbols (see
+  wordnet.POINTER_SYMBOLS), the default is to follow all semantic pointers
+- max_depth: do not go further than this many steps from the start
+- unique: visit each synset once (the default), otherwise visit all paths,
+  avoiding only cycles within a path
+- follow: a predicate on synsets, a synset is only reached if the predicate is
+  true for it
+
+Print all hyponyms up to two levels below door.06.0:
+
+   >>> door = wn.get_noun_synset('03226423')
+   >>> for node in traverse(door, HYPONYMS, max_depth=2):
+   ...     print(node.depth, node.synset)
+
+Print all meronym chains of length 3 or less from artifacts to substances:
+
+   >>> for node in chains(wn, 'art', 'sub', MERONYMS, max_length=3):
+   ...     print(' '.join([ss.words_as_string() for ss in node.path()]))
+
+The same, but only the first ten chains:
+
+   >>> list(itertools.islice(chains(wn, 'art', 'sub', MERONYMS, 3), 10))
+
+"""
+
+from collections import deque
+
+from wordnet import NOUN, expand
+
+
+HYPERNYMS = ('@', '@i')
+HYPONYMS = ('~', '~i')
+HOLONYMS = ('#m', '#s', '#p')
+MERONYMS = ('%m', '%s', '%p')
+
+BFS = 'bfs'
+DFS = 'dfs'
+
+
+class Node(object):
+
+    """A synset as reached by a traversal. Besides the synset it stores the depth,
+    the pointer symbol that was followed to reach the synset and the node that
+    it was reached from. The path from the start can be reconstructed from
+    these back links so paths do not need to be copied while traversing."""
+
+    __slots__ = ('synset', 'depth', 'symbol', 'parent')
+
+    def __init__(self, synset, depth=0, symbol=None, parent=None):
+        self.synset = synset
+        self.depth = depth
+        self.symbol = symbol
+        self.parent = parent
+
+    def __str__(self):
+        return "<Node %d %s %s>" % (self.depth, self.symbol, self.synset)
+
+    def path(self):
+        """Return the list of synsets from the start to this node."""
+        synsets = []
+        node = self
+        while node is not None:
+            synsets.append(node.synset)
+            node = node.parent
+        return list(reversed(synsets))
+
+    def symbols(self):
+        """Return the list of pointer symbols followed from the start."""
+        symbols = []
+        node = self
+        while node.parent is not None:
+            symbols.append(node.symbol)
+            node = node.parent
+        return list(reversed(symbols))
+
+    def in_path(self, synset):
+        node = self
+        while node is not None:
+            if node.synset is synset:
+                return True
+            node = node.parent
+        return False
+
+
+def neighbours(synset, pointers=None, semantic_only=True):
+    """Generate (symbol, synset) pairs for all synsets that can be reached from
+    the synset in one step. Pointers to synsets of another category are resolved
+    using the category of the pointer, pointers to adjectives and adverbs, or to
+    any other category that is not loaded, are skipped."""
+    wordnet = synset.wn
+    synset_idx = wordnet.synset_index()
+    symbols = synset.pointers.keys() if pointers is None else pointers
+    for symbol in symbols:
+        for pointer in synset.pointers.get(symbol, ()):
+            if semantic_only and not pointer.is_semantic():
+                continue
+            category = expand(pointer.pos)
+            if category not in synset_idx:
+                continue
+            target = wordnet.get_synset(category, pointer.target_synset)
+            if target is not None:
+                yield symbol, target
+
+
+def traverse(start, pointers=None, max_depth=None, order=BFS, unique=True,
+             follow=None, include_start=False, semantic_only=True):
+    """Generate Nodes for all synsets reachable from the start, which is a synset
+    or a list of synsets. See the module docstring for the other arguments."""
+    starts = start if isinstance(start, (list, tuple, set)) else [start]
+    roots = [Node(synset) for synset in starts]
+    if order == BFS:
+        agenda = deque(roots)
+        next_node = agenda.popleft
+    elif order == DFS:
+        agenda = list(reversed(roots))
+        next_node = agenda.pop
+    else:
+        raise ValueError("unknown traversal order: %s" % order)
+    # Maps synsets to the smallest depth they were reached at. With depth-first
+    # search a synset can be reached again at a smaller depth, it is then
+    # expanded again (but not yielded again) so that the depth bound does not
+    # hide any synsets.
+    depths = {}
+    if order == BFS:
+        for root in roots:
+            depths[(root.synset.cat, root.synset.id)] = 0
+    while agenda:
+        node = next_node()
+        key = (node.synset.cat, node.synset.id)
+        if unique and order == DFS:
+            if key in depths and depths[key] <= node.depth:
+                continue
+            first_visit = key not in depths
+            depths[key] = node.depth
+        else:
+            first_visit = True
+        if first_visit and (node.depth > 0 or include_start):
+            yield node
+        if max_depth is not None and node.depth >= max_depth:
+            continue
+        children = []
+        for symbol, target in neighbours(node.synset, pointers, semantic_only):
+            if follow is not None and not follow(target):
+                continue
+            if unique:
+                target_key = (target.cat, target.id)
+                if order == BFS:
+                    if target_key in depths:
+                        continue
+                    depths[target_key] = node.depth + 1
+                elif depths.get(target_key, node.depth + 2) <= node.depth + 1:
+                    continue
+            elif node.in_path(target):
+                continue
+            children.append(Node(target, node.depth + 1, symbol, node))
+        if order == BFS:
+            agenda.extend(children)
+        else:
+            agenda.extend(reversed(children))
+
+
+def preorder(start, pointers=HYPONYMS, max_depth=None, follow=None):
+    """Generate Nodes in depth-first pre-order, starting with the start node
+    itself and without removing duplicates. This is the order in which the
+    synsets of a tree would be printed."""
+    stack = [Node(start)]
+    while stack:
+        node = stack.pop()
+        yield node
+        if max_depth is not None and node.depth >= max_depth:
+            continue
+        children = [Node(target, node.depth + 1, symbol, node)
+                    for symbol, target in neighbours(node.synset, pointers)
+                    if follow is None or follow(target)]
+        stack.extend(reversed(children))
+
+
+def has_basic_type(basic_type):
+    """Return a predicate that is true for synsets that have the basic type."""
+    return lambda synset: basic_type in synset.basic_types
+
+
+def chains(wordnet, source_type, target_type, pointers, max_length, cat=NOUN):
+    """Generate Nodes for all chains of pointers of length max_length or less that
+    lead from a synset with the source basic type to a synset with the target
+    basic type. Chains do not contain cycles. Call path() on a Node to get the
+    synsets in the chain."""
+    is_target = has_basic_type(target_type)
+    for synset in wordnet.get_all_synsets(cat):
+        if source_type not in synset.basic_types:
+            continue
+        for node in traverse(synset, pointers, max_depth=max_length, order=DFS,
+                             unique=False):
+            if is_target(node.synset):
+                yield node
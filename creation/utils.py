@@ -1,3 +1,22 @@
+import io
+import os
+import math
+import gzip
+import lzma
+import random
+import shutil
+import tarfile
+import zipfile
+import itertools
+import subprocess
+import collections
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
 def index_file(wn_dir, version, cat):
     """Return the relative path of the index file in the WordNet distribution."""
     if version == '1.5':
@@ -39,6 +58,224 @@ def flatten(some_list):
     return result
 
 
+def reservoir_sample(items, k, rng=random):
+    """Return a uniform random sample of at most k items from an iterable of
+    unknown length, in one pass over the items. This uses Algorithm L (Li 1994),
+    which computes how many items to skip before the next item that goes into
+    the sample, so random numbers are only drawn for items that are sampled.
+    Returns a list of (position, item) pairs in the order of the items. All
+    items are consumed, also when k is zero."""
+    iterator = iter(items)
+    # range() comes first so zip() does not take an item too many
+    reservoir = list(zip(range(k), iterator))
+    if k == 0:
+        collections.deque(iterator, maxlen=0)
+    if len(reservoir) < k or k == 0:
+        return reservoir
+    w = math.exp(math.log(_random(rng)) / k)
+    position = k - 1
+    while True:
+        skip = int(math.log(_random(rng)) / math.log(1 - w))
+        item = next(itertools.islice(iterator, skip, None), _END)
+        if item is _END:
+            break
+        position += skip + 1
+        reservoir[rng.randrange(k)] = (position, item)
+        w *= math.exp(math.log(_random(rng)) / k)
+    reservoir.sort(key=lambda pair: pair[0])
+    return reservoir
+
+
+# marks the end of the items in reservoir_sample()
+_END = object()
+
+
+def _random(rng):
+    """Return a random number larger than 0.0 and smaller than 1.0."""
+    number = rng.random()
+    while number == 0.0:
+        number = rng.random()
+    return number
+
+
+# Compressed files are opened by extension. Writing uses the command line tool if
+# it is installed since those can compress with several threads, otherwise the
+# Python module is used. For reading the Python modules are fast enough, except
+# that zstandard is not in the standard library, zstd is used if it is missing.
+COMPRESSION_EXTENSIONS = ('.gz', '.xz', '.zst')
+COMPRESSORS = {'.gz': ['pigz', '-c', '-6'],
+               '.xz': ['xz', '-T0', '-c', '-3'],
+               '.zst': ['zstd', '-T0', '-c', '-q', '-3']}
+DECOMPRESSORS = {'.zst': ['zstd', '-d', '-c', '-q']}
+
+# size of the buffer between the text layer and the file or the compressor
+BUFFER_SIZE = 2**20
+
+
+def compression_extension(fname):
+    """Return the compression extension of the file name or an empty string."""
+    for extension in COMPRESSION_EXTENSIONS:
+        if fname.endswith(extension):
+            return extension
+    return ''
+
+
+def find_file(fname):
+    """Return the name of the file or of one of its compressed versions, whichever
+    was written last if more than one exists, or the file name if none of them
+    exist. A file name that has a compression extension is returned as is."""
+    if compression_extension(fname):
+        return fname
+    existing = [name for name in _variants(fname) if os.path.exists(name)]
+    if not existing:
+        return fname
+    return max(existing, key=os.path.getmtime)
+
+
+def _variants(fname):
+    """Return the file name without compression extension followed by all its
+    compressed versions."""
+    extension = compression_extension(fname)
+    base = fname[:-len(extension)] if extension else fname
+    return [base] + [base + extension for extension in COMPRESSION_EXTENSIONS]
+
+
+def open_file(fname, mode='r', encoding='utf-8'):
+    """Open a text file for reading ('r'), writing ('w') or appending ('a'). Files
+    ending in .gz, .xz or .zst are compressed and decompressed while they are
+    written and read. When reading a file that does not exist, a compressed
+    version of the file is opened if there is one. Writing a file removes the
+    versions of the file with another compression, so they cannot be read
+    instead of it later. Writes go through a large buffer, so many small writes
+    do not each go to the file or compressor."""
+    mode = mode.replace('t', '')
+    if mode == 'r':
+        fname = find_file(fname)
+    elif mode == 'w':
+        for name in _variants(fname):
+            if name != fname and os.path.exists(name):
+                os.remove(name)
+    extension = compression_extension(fname)
+    if not extension:
+        return open(fname, mode, buffering=BUFFER_SIZE, encoding=encoding)
+    if mode == 'r':
+        if extension == '.gz':
+            binary = gzip.GzipFile(fname, 'rb')
+        elif extension == '.xz':
+            binary = lzma.LZMAFile(fname, 'rb')
+        elif zstandard is not None:
+            binary = zstandard.ZstdDecompressor().stream_reader(open(fname, 'rb'), closefd=True)
+        else:
+            return _process_file(DECOMPRESSORS[extension] + [fname], None, mode, encoding)
+        return io.TextIOWrapper(io.BufferedReader(binary, BUFFER_SIZE), encoding=encoding)
+    command = COMPRESSORS[extension]
+    if shutil.which(command[0]):
+        return _process_file(command, open(fname, mode + 'b'), mode, encoding)
+    if extension == '.gz':
+        binary = gzip.GzipFile(fname, mode + 'b', compresslevel=6)
+    elif extension == '.xz':
+        binary = lzma.LZMAFile(fname, mode + 'b', preset=3)
+    elif zstandard is not None:
+        compressor = zstandard.ZstdCompressor(level=3, threads=-1)
+        binary = compressor.stream_writer(open(fname, mode + 'b'), closefd=True)
+    else:
+        raise OSError("cannot write %s without zstd or the zstandard module" % fname)
+    return io.TextIOWrapper(io.BufferedWriter(binary, BUFFER_SIZE), encoding=encoding)
+
+
+def _process_file(command, fh, mode, encoding):
+    """Return a text file that writes to the input of the command, whose output
+    goes to the file handle, or, if fh is None, a text file that reads from the
+    output of the command."""
+    if fh is None:
+        process = subprocess.Popen(command, stdout=subprocess.PIPE, bufsize=BUFFER_SIZE)
+        return _ProcessFile(process, process.stdout, None, encoding)
+    process = subprocess.Popen(command, stdin=subprocess.PIPE, stdout=fh, bufsize=BUFFER_SIZE)
+    return _ProcessFile(process, process.stdin, fh, encoding)
+
+
+class _ProcessFile(io.TextIOWrapper):
+
+    """Text file on a pipe to or from a process, closing it waits for the process
+    to finish and closes the file the process writes to."""
+
+    def __init__(self, process, pipe, fh, encoding):
+        io.TextIOWrapper.__init__(self, pipe, encoding=encoding)
+        self._process = process
+        self._fh = fh
+
+    def close(self):
+        if self.closed:
+            return
+        try:
+            io.TextIOWrapper.close(self)
+        finally:
+            returncode = self._process.wait()
+            if self._fh is not None:
+                self._fh.close()
+        if returncode != 0 and self._fh is not None:
+            raise OSError("%s exited with status %d" % (self._process.args[0], returncode))
+
+
+# WORDNET_DIR can also name an archive with the WordNet distribution, the files
+# are then read from the archive without extracting them.
+ARCHIVE_EXTENSIONS = ('.tar.gz', '.tgz', '.tar.xz', '.txz', '.tar', '.zip')
+
+
+def archive_file(wn_dir):
+    """Return the path of the archive if the WordNet directory is an archive,
+    otherwise return None."""
+    path = wn_dir.rstrip('/')
+    if path.endswith(ARCHIVE_EXTENSIONS) and os.path.isfile(path):
+        return path
+    return None
+
+
+def open_members(archive, paths, encoding='utf-8'):
+    """Generate (path, text file) pairs for the files in a tar or zip archive,
+    in the order in which they are in the archive. A member of the archive is
+    returned when its name ends in one of the paths, ignoring case, so for
+    DICT/index.noun the member WordNet-3.1/dict/index.noun is found. Tar files
+    are read front to back, so a compressed tar file is decompressed only once,
+    and each text file has to be read before the next pair is generated.
+    Raises FileNotFoundError if one of the paths is not in the archive."""
+    wanted = {path.lower(): path for path in paths}
+    if archive.endswith('.zip'):
+        with zipfile.ZipFile(archive) as zf:
+            for info in zf.infolist():
+                path = _member_path(info.filename, wanted)
+                if path is not None:
+                    with zf.open(info) as member:
+                        yield path, io.TextIOWrapper(io.BufferedReader(member, BUFFER_SIZE),
+                                                     encoding=encoding)
+    else:
+        # the decompressed file only seeks forward when the members are read
+        # in order, which tarfile's stream mode does not allow text files for
+        if archive.endswith(('.gz', '.tgz')):
+            binary = gzip.GzipFile(archive, 'rb')
+        elif archive.endswith(('.xz', '.txz')):
+            binary = lzma.LZMAFile(archive, 'rb')
+        else:
+            binary = open(archive, 'rb')
+        with binary, tarfile.open(fileobj=binary, mode='r:') as tf:
+            for info in tf:
+                path = _member_path(info.name, wanted) if info.isfile() else None
+                if path is not None:
+                    member = io.BufferedReader(tf.extractfile(info), BUFFER_SIZE)
+                    yield path, io.TextIOWrapper(member, encoding=encoding)
+    if wanted:
+        raise FileNotFoundError("not in %s: %s" % (archive, ' '.join(sorted(wanted.values()))))
+
+
+def _member_path(name, wanted):
+    """Return and remove the path in wanted that the member name ends in."""
+    name = name.lower()
+    for lowered in wanted:
+        if name == lowered or name.endswith('/' + lowered):
+            return wanted.pop(lowered)
+    return None
+
+
 # for more color codes see
 # https://gist.github.com/chrisopedia/8754917
 
@@ -11,6 +11,17 @@ directory.
 See https://wordnet.princeton.edu/documentation/wndb5wn for the format of the
 data and index files.
 
+The index and data files can be compressed one by one, for example DICT/data.noun
+can be replaced by DICT/data.noun.gz or DICT/data.noun.xz. Instead of a directory
+WORDNET_DIR can also name an archive of the distribution, for example
+
+   WORDNET_DIR = '/DATA/resources/lexicons/wordnet/WordNet-%s.tar.gz'
+
+Tar files compressed with gzip or xz, plain tar files and zip files can be used.
+The files are read from the archive while it is decompressed, nothing is written
+to disk. The directories in the archive do not matter, so WordNet-3.1.tar.gz
+with WordNet-3.1/dict/data.noun works as well.
+
 Loading WordNet requires a version (1.5 or 3.1):
 
    >>> wn = WordNet('3.1')
@@ -43,11 +54,15 @@ Getting the synset object given a synset identifier:
 import sys
 import copy
 import textwrap
+import functools
 
 import cltypes
 from config import WORDNET_DIR
-from utils import flatten, blue, green, bold, boldgreen
+from utils import blue, green, bold, boldgreen
 from utils import index_file, data_file, sense_file
+from utils import open_file, find_file, archive_file, open_members
+from fuzzy import FuzzyLemmaIndex
+from glosses import GlossIndex
 
 
 if sys.version_info.major < 3:
@@ -94,6 +109,26 @@ def expand(category):
     return CATEGORY_ABBREVIATIONS.get(category)
 
 
+def normalize_lemma(lemma):
+    """Lemmas in the WordNet index are lower case and use underscores instead of
+    spaces."""
+    return lemma.strip().lower().replace(' ', '_')
+
+
+def changed_basic_types(old_btypes, new_btypes):
+    """Return the sorted list of basic types that were added or removed or that
+    have different synsets in the two inventories, where both inventories have
+    the format of cltypes.BASIC_TYPES_3_1. Differences in the descriptions of
+    the synsets are ignored."""
+    changed = []
+    for btype in set(old_btypes) | set(new_btypes):
+        old_ids = set([synset_id for synset_id, members in old_btypes.get(btype, [])])
+        new_ids = set([synset_id for synset_id, members in new_btypes.get(btype, [])])
+        if old_ids != new_ids:
+            changed.append(btype)
+    return sorted(changed)
+
+
 class WordNet(object):
 
     """Class to store all WordNet information that we want access to.
@@ -121,6 +156,14 @@ class WordNet(object):
         { synset_sense ==> synset_id }
         _sense_idx['zyrian%1:10:00::'] ==> '06969782'
 
+    _name_idx
+        Stores synset identifiers indexed on category and the names used for
+        synsets in cltypes and in the output of Synset.words_as_string(),
+        which are of the form lemma.lex_filenum.lex_id
+        Filled in by _load_synsets()
+        { NOUN|VERB ==> DICT { name ==> synset_id } }
+        _name_idx['noun']['door.06.0'] ==> '03226423'
+
     _all_relations
         A list of all relations where a relation is a pair of a Synset instance
         and a Pointer instance. Filled in by get_all_basic_type_relations().
@@ -130,6 +173,19 @@ class WordNet(object):
         that are basic types. Filled in if add_basic_types in the initialization
         method was set to True.
 
+    _basic_type_inventory
+        The basic types used for the noun synsets, in the format of
+        cltypes.BASIC_TYPES_3_1. Set by add_nominal_basic_types() and
+        update_nominal_basic_types().
+
+    _fuzzy_idx
+        Stores a FuzzyLemmaIndex for each category, used for approximate lemma
+        lookup. Filled in by fuzzy_lemma_index() the first time it is needed.
+
+    _gloss_idx
+        Stores a GlossIndex for each category, used for searching glosses.
+        Filled in by gloss_index() the first time it is needed.
+
     """
 
     def __init__(self, wn_version, add_basic_types=False):
@@ -139,14 +195,13 @@ class WordNet(object):
         self._lemma_idx = {NOUN: {}, VERB: {}}
         self._synset_idx = {NOUN: {}, VERB: {}}
         self._sense_idx = {}
+        self._name_idx = {NOUN: {}, VERB: {}}
         self._all_relations = None
         self._basic_types = {NOUN: [], VERB: []}
-        wn_dir = WORDNET_DIR % self.version
-        self._load_lemmas(NOUN, index_file(wn_dir, self.version, NOUN))
-        self._load_lemmas(VERB, index_file(wn_dir, self.version, VERB))
-        self._load_synsets(NOUN, data_file(wn_dir, self.version, NOUN))
-        self._load_synsets(VERB, data_file(wn_dir, self.version, VERB))
-        self._load_senses(sense_file(wn_dir, self.version))
+        self._basic_type_inventory = None
+        self._fuzzy_idx = {NOUN: None, VERB: None}
+        self._gloss_idx = {NOUN: None, VERB: None}
+        self._load_files(WORDNET_DIR % self.version)
         if add_basic_types:
             self.add_basic_types()
 
@@ -154,10 +209,34 @@ class WordNet(object):
         return "<WordNet %s nouns=%d verbs=%d>" \
             % (self.version, len(self._lemma_idx[NOUN]), len(self._lemma_idx[VERB]))
 
-    def _load_lemmas(self, cat, index_file):
-        """Load all lemmas from the index file."""
-        print('Loading %s ...' % index_file)
-        for line in open(index_file):
+    def _load_files(self, wn_dir):
+        """Load the index, data and sense files from the WordNet directory. The
+        files may be compressed (see utils.open_file). If the directory is an
+        archive (see utils.archive_file) the files are read from the archive in
+        the order in which they occur in it, without extracting them."""
+        loaders = {
+            index_file('', self.version, NOUN): functools.partial(self._load_lemmas, NOUN),
+            index_file('', self.version, VERB): functools.partial(self._load_lemmas, VERB),
+            data_file('', self.version, NOUN): functools.partial(self._load_synsets, NOUN),
+            data_file('', self.version, VERB): functools.partial(self._load_synsets, VERB)}
+        if self.version != '1.5':
+            # there is no index.sense file for version 1.5
+            loaders[sense_file('', self.version)] = self._load_senses
+        archive = archive_file(wn_dir)
+        if archive is None:
+            for path, load in loaders.items():
+                fname = find_file(wn_dir + path)
+                print('Loading %s ...' % fname)
+                with open_file(fname) as fh:
+                    load(fh)
+        else:
+            for path, fh in open_members(archive, loaders):
+                print('Loading %s:%s ...' % (archive, path))
+                loaders[path](fh)
+
+    def _load_lemmas(self, cat, lines):
+        """Load all lemmas from the lines of the index file."""
+        for line in lines:
             if line.startswith('  ') or len(line) < 25:
                 continue
             # Example input line:
@@ -165,11 +244,10 @@ class WordNet(object):
             word = Word(line.strip())
             self._lemma_idx[cat][word.lemma] = word
 
-    def _load_synsets(self, cat, data_file):
-        """Load all synsets from the data file."""
-        print('Loading %s ...' % data_file)
+    def _load_synsets(self, cat, lines):
+        """Load all synsets from the lines of the data file."""
         c = 0
-        for line in open(data_file):
+        for line in lines:
             c += 1
             # if c > 50: break
             if line.startswith('  ') or len(line) < 25:
@@ -181,15 +259,14 @@ class WordNet(object):
             #   once again"
             synset = Synset(self, line.strip(), cat)
             self._synset_idx[cat][synset.id] = synset
-
-    def _load_senses(self, sense_file):
-        """Load wordnet's index.sense file, which contains mappings from immutable sense
-        keys to synset offsets (which can change from version to version)."""
-        if self.version == '1.5':
-            # there is no index.sense file for version 1.5, so skip it
-            return
-        print('Loading %s ...' % sense_file)
-        for line in open(sense_file):
+            for name in synset.names():
+                self._name_idx[cat].setdefault(name, synset.id)
+
+    def _load_senses(self, lines):
+        """Load the lines of wordnet's index.sense file, which contains mappings from
+        immutable sense keys to synset offsets (which can change from version to
+        version)."""
+        for line in lines:
             # Example input line:
             #   bank%1:14:00:: 08437235 2 20
             # TODO: maybe nice to use a Sense class
@@ -206,9 +283,15 @@ class WordNet(object):
     def sense_index(self):
         return self._sense_idx
 
+    def name_index(self):
+        return self._name_idx
+
     def basic_types(self, cat=NOUN):
         return self._basic_types[cat]
 
+    def basic_type_inventory(self):
+        return self._basic_type_inventory
+
     def get_noun(self, lemma):
         """Return None or the Word instance for the noun."""
         return self._lemma_idx[NOUN].get(lemma)
@@ -222,6 +305,51 @@ class WordNet(object):
         a Word instance or None."""
         return {NOUN: self.get_noun(lemma), VERB: self.get_verb(lemma)}
 
+    def fuzzy_lemma_index(self, cat=NOUN):
+        """Return the FuzzyLemmaIndex for the category, building it first if
+        needed."""
+        if self._fuzzy_idx[cat] is None:
+            print('Building fuzzy lemma index for %ss ...' % cat)
+            self._fuzzy_idx[cat] = FuzzyLemmaIndex(self._lemma_idx[cat].keys())
+        return self._fuzzy_idx[cat]
+
+    def get_similar_lemmas(self, lemma, cat=NOUN, max_distance=2, limit=None):
+        """Return a list of (lemma, distance) pairs for all lemmas within the edit
+        distance of the given lemma, sorted on distance."""
+        lemma = normalize_lemma(lemma)
+        return self.fuzzy_lemma_index(cat).lookup(lemma, max_distance, limit)
+
+    def clean_lemmas(self, lemmas, cat=NOUN, max_distance=2):
+        """Map a list of possibly misspelled lemmas to lemmas in WordNet. Returns a
+        list of triples with the input lemma, the closest WordNet lemma and the
+        edit distance, the last two are None if nothing was found."""
+        idx = self.fuzzy_lemma_index(cat)
+        result = []
+        for lemma in lemmas:
+            match = idx.best_match(normalize_lemma(lemma), max_distance)
+            if match is None:
+                result.append((lemma, None, None))
+            else:
+                result.append((lemma, match[0], match[1]))
+        return result
+
+    def gloss_index(self, cat=NOUN):
+        """Return the GlossIndex for the category, building it first if needed."""
+        if self._gloss_idx[cat] is None:
+            print('Building gloss index for %ss ...' % cat)
+            self._gloss_idx[cat] = GlossIndex(self, cat)
+        return self._gloss_idx[cat]
+
+    def search_glosses(self, query, cat=NOUN, basic_type=None):
+        """Return all synsets of the category whose gloss contains all query
+        terms. Terms preceded by a minus sign must not occur in the gloss."""
+        return self.gloss_index(cat).boolean_search(query, basic_type=basic_type)
+
+    def rank_glosses(self, query, cat=NOUN, basic_type=None, limit=20):
+        """Return a list of (synset, score) pairs for the synsets of the category,
+        ordered on the BM25 score of their gloss for the query."""
+        return self.gloss_index(cat).ranked_search(query, basic_type=basic_type, limit=limit)
+
     def get_noun_synset(self, synset_offset):
         """Return the synset object for the synset identifier."""
         return self.get_synset(NOUN, synset_offset)
@@ -232,6 +360,41 @@ class WordNet(object):
     def get_synset(self, category, synset_offset):
         return self._synset_idx[category].get(synset_offset)
 
+    def get_synset_by_name(self, name, cat=NOUN):
+        """Return the synset for a name like door.06.0 or None if there is no such
+        synset."""
+        synset_id = self._name_idx[cat].get(name)
+        return None if synset_id is None else self.get_synset(cat, synset_id)
+
+    def resolve_names(self, names, cat=NOUN):
+        """Return a dictionary that maps each name to a synset identifier, or to
+        None if the name does not occur in this version of WordNet."""
+        name_idx = self._name_idx[cat]
+        return {name: name_idx.get(name) for name in names}
+
+    def check_basic_types(self, btypes=None):
+        """Check a basic type inventory against WordNet, where the inventory has
+        the same format as cltypes.BASIC_TYPES_3_1. Every synset name in the
+        descriptions is resolved and a list of problems is returned, each problem
+        is a tuple <basic_type, synset_id, name, resolved_id> where resolved_id
+        is None if the name was not found and differs from synset_id if the name
+        refers to another synset, which is typical when the inventory was
+        created for another WordNet version."""
+        if btypes is None:
+            btypes = cltypes.get_basic_types(self.version)
+        names = set()
+        for btype in btypes:
+            for synset_id, description in btypes[btype]:
+                names.update(description.split())
+        resolved = self.resolve_names(names)
+        problems = []
+        for btype in sorted(btypes):
+            for synset_id, description in btypes[btype]:
+                for name in description.split():
+                    if resolved[name] != synset_id:
+                        problems.append((btype, synset_id, name, resolved[name]))
+        return problems
+
     def get_basic_types(self, cat):
         """return all synsets that are basic types."""
         return [ss for ss in self.get_all_synsets(cat) if ss.is_basic_type()]
@@ -239,28 +402,31 @@ class WordNet(object):
     def reset_nominal_basic_types(self):
         for synset in self._synset_idx[NOUN].values():
             synset.reset_basic_types()
+        self._basic_types[NOUN] = []
+        self._basic_type_inventory = None
 
     def add_basic_types(self):
         """Add basic type information to verb and noun synsets."""
         self.add_nominal_basic_types()
         self.add_verbal_basic_types()
 
-    def add_nominal_basic_types(self, btypes=None):
+    def add_nominal_basic_types(self, btypes=None, propagate=True):
         """Add basic type information to noun synsets. This starts with the manually
         created lists in cltypes and adds information to the synsets mentioned
         in those lists. As a next step it descends down the hyponym tree for
         each marked synset and adds the basic types to sub synsets. If a synset
         is assigned two basic types bt1 and bt2 and bt1 is a subtype of bt2 then
-        bt2 will not be included."""
+        bt2 will not be included. With propagate=False only the synsets in the
+        lists are marked, the basic types of other synsets can then be added
+        when needed with Synset.inherit_basic_types()."""
         if btypes is None:
             # use the default if no basic types were handed in
             btypes = cltypes.get_basic_types(self.version)
-        for btype in btypes:
-            for synset_id, members in btypes[btype]:
-                synset = self.get_noun_synset(synset_id)
-                synset.basic_type = btype
-                synset.basic_types = {btype}
-                self._basic_types[NOUN].append(synset)
+        self._mark_nominal_basic_types(btypes)
+        for synset in self.basic_types(NOUN):
+            synset.basic_types = {synset.basic_type}
+        if not propagate:
+            return
         for synset in self.basic_types(NOUN):
             for hyponym in synset.hyponyms():
                 hyponym.add_basic_type(synset)
@@ -268,6 +434,45 @@ class WordNet(object):
         for synset in self.get_all_noun_synsets():
             synset.reduce_basic_types(type_relations)
 
+    def _mark_nominal_basic_types(self, btypes):
+        for btype in btypes:
+            for synset_id, members in btypes[btype]:
+                synset = self.get_noun_synset(synset_id)
+                synset.basic_type = btype
+                self._basic_types[NOUN].append(synset)
+        self._basic_type_inventory = btypes
+
+    def basic_type_subtrees(self, btypes):
+        """Return the set of noun synsets whose basic types may change when the
+        current basic type inventory is replaced with btypes. These are the old
+        and new synsets of all changed basic types and all their hyponyms."""
+        from traversal import traverse, HYPONYMS
+        old_btypes = self._basic_type_inventory or {}
+        tops = set()
+        for btype in changed_basic_types(old_btypes, btypes):
+            for synset_id, members in list(old_btypes.get(btype, [])) + list(btypes.get(btype, [])):
+                tops.add(self.get_noun_synset(synset_id))
+        if not tops:
+            return set()
+        return set([node.synset for node in traverse(list(tops), HYPONYMS, include_start=True)])
+
+    def update_nominal_basic_types(self, btypes):
+        """Replace the basic type inventory of the noun synsets with btypes. Unlike
+        add_nominal_basic_types() this only recalculates the basic types of the
+        synsets in the hyponym trees of the types that changed (as returned by
+        basic_type_subtrees()), the basic types of all other synsets stay as
+        they were. Returns the set of synsets that were recalculated."""
+        subtrees = self.basic_type_subtrees(btypes)
+        for synset in self._basic_types[NOUN]:
+            synset.basic_type = None
+        self._basic_types[NOUN] = []
+        self._mark_nominal_basic_types(btypes)
+        type_relations = cltypes.get_type_relations(self.version)
+        inherited = {}
+        for synset in subtrees:
+            synset.inherit_basic_types(type_relations, inherited)
+        return subtrees
+
     def add_verbal_basic_types(self):
         count = 0
         for synset in self.get_all_verb_synsets():
@@ -314,13 +519,21 @@ class WordNet(object):
     def pp_basic_types(self, cat):
         basic_types = self.get_basic_types(cat)
         for bt in basic_types:
-            synsets = [ss for ss in flatten(bt.paths_to_top())
+            synsets = [ss for ss in bt.ancestors(include_self=True)
                        if ss.is_basic_type()]
             super_types = set([ss.basic_type for ss in synsets])
             super_types.remove(bt.basic_type)
             print(bt, ' '.join(super_types))
         print("\nNumber of basic types: %d\n" % len(basic_types))
 
+    def hypernym_path_counts(self, cat=NOUN):
+        """Return a dictionary with for each synset of the category the number of
+        distinct paths to a top synset."""
+        counts = {}
+        for synset in self.get_all_synsets(cat):
+            synset.count_paths_to_top(counts)
+        return counts
+
     def get_all_noun_synsets(self):
         return self.get_all_synsets(NOUN)
 
@@ -379,7 +592,7 @@ class WordNet(object):
         types. Results from this can be hand-fed into the cltypes module."""
         pairs = []
         for bt in self.get_basic_types(NOUN):
-            synsets = [ss for ss in flatten(bt.paths_to_top())
+            synsets = [ss for ss in bt.ancestors(include_self=True)
                        if ss.is_basic_type()]
             super_types = set([ss.basic_type for ss in synsets])
             super_types.remove(bt.basic_type)
@@ -465,8 +678,13 @@ class Synset(object):
         return self.as_formatted_string()
 
     def words_as_string(self):
-        return ' '.join(["%s.%s.%s" % (word_lex[0], self.lex_filenum, word_lex[1])
-                         for word_lex in self.words])
+        return ' '.join(self.names())
+
+    def names(self):
+        """Return the names of the synset, one for each word, using the format
+        lemma.lex_filenum.lex_id."""
+        return ["%s.%s.%s" % (word_lex[0], self.lex_filenum, word_lex[1])
+                for word_lex in self.words]
 
     def as_formatted_string(self):
         words = ' '.join(["%s.%s.%s" % (blue(word_lex[0]), self.lex_filenum, word_lex[1])
@@ -597,13 +815,79 @@ class Synset(object):
         return [self.wn.get_synset(self.cat, p.target_synset)
                 for p in pointers if p.is_semantic()]
 
+    def traverse(self, pointers=None, max_depth=None, order='bfs', **kwargs):
+        """Generate the synsets reachable from this synset, wrapped in Node
+        instances. See traversal.traverse() for all arguments."""
+        from traversal import traverse
+        return traverse(self, pointers, max_depth=max_depth, order=order, **kwargs)
+
     def paths_to_top(self):
+        """Returns a nested list with all paths to the top. Shared ancestors are
+        repeated for each path, so this can get big. Use ancestors(),
+        count_paths_to_top() or iter_paths_to_top() if possible."""
         hypernyms = self.hypernyms()
         if not hypernyms:
             return [self]
         else:
             return [self] + [hyper.paths_to_top() for hyper in hypernyms]
 
+    def ancestors(self, include_self=False):
+        """Returns the set of all synsets that can be reached by following
+        hypernym pointers, each ancestor is included once."""
+        result = {self} if include_self else set()
+        agenda = [self]
+        while agenda:
+            synset = agenda.pop()
+            for hyper in synset.hypernyms():
+                if hyper not in result:
+                    result.add(hyper)
+                    agenda.append(hyper)
+        return result
+
+    def count_paths_to_top(self, counts=None):
+        """Returns the number of distinct paths from the synset to a top synset.
+        This is calculated bottom-up over the hypernym graph so that the count
+        for each ancestor is calculated once. The counts dictionary, which maps
+        synset identifiers to counts, can be handed in to reuse results over
+        many calls."""
+        counts = {} if counts is None else counts
+        stack = [self]
+        while stack:
+            synset = stack[-1]
+            if synset.id in counts:
+                stack.pop()
+                continue
+            hypernyms = synset.hypernyms()
+            pending = [hyper for hyper in hypernyms if hyper.id not in counts]
+            if pending:
+                stack.extend(pending)
+            else:
+                counts[synset.id] = sum([counts[hyper.id] for hyper in hypernyms]) or 1
+                stack.pop()
+        return counts[self.id]
+
+    def iter_paths_to_top(self):
+        """Generates all paths to the top, one at a time, each path is a list of
+        synsets starting with this synset and ending with a top synset."""
+        path = [self]
+        iterators = [iter(self.hypernyms())]
+        if not self.has_hypernyms():
+            yield [self]
+            return
+        while iterators:
+            hyper = next(iterators[-1], None)
+            if hyper is None:
+                iterators.pop()
+                path.pop()
+                continue
+            path.append(hyper)
+            hypernyms = hyper.hypernyms()
+            if hypernyms:
+                iterators.append(iter(hypernyms))
+            else:
+                yield list(path)
+                path.pop()
+
     def add_basic_type(self, synset):
         """Recursively add a basic type to a synset. This would be the basic type
         that dominates the synset in the WordNet tree. Note that the synset given
@@ -614,6 +898,36 @@ class Synset(object):
         for hyponym in self.hyponyms():
             hyponym.add_basic_type(synset)
 
+    def inherit_basic_types(self, type_relations, inherited=None):
+        """Set the basic types of the synset from the basic type synsets among its
+        ancestors and itself and return them. This gives the same basic types
+        as the propagation down the hyponym trees in add_nominal_basic_types(),
+        but only for this synset. As with count_paths_to_top() this works bottom
+        up over the hypernym graph. The inherited dictionary maps synset
+        identifiers to the basic types before they are reduced, it can be
+        handed in to reuse results over many calls with the same basic type
+        synsets."""
+        inherited = {} if inherited is None else inherited
+        stack = [self]
+        while stack:
+            synset = stack[-1]
+            if synset.id in inherited:
+                stack.pop()
+                continue
+            hypernyms = synset.hypernyms()
+            pending = [hyper for hyper in hypernyms if hyper.id not in inherited]
+            if pending:
+                stack.extend(pending)
+            else:
+                btypes = {synset.basic_type} if synset.is_basic_type() else set()
+                for hyper in hypernyms:
+                    btypes.update(inherited[hyper.id])
+                inherited[synset.id] = btypes
+                stack.pop()
+        self.basic_types = set(inherited[self.id])
+        self.reduce_basic_types(type_relations)
+        return self.basic_types
+
     def reduce_basic_types(self, type_relations):
         btypes = copy.copy(self.basic_types)
         for (subtype, supertype) in type_relations:
@@ -694,11 +1008,11 @@ class Synset(object):
         self.pp_related_synsets('attributes', self.attributes())
 
     def pp_tree(self, levels, indent=''):
+        from traversal import preorder
         if levels == 0:
             return
-        print("%s%s" % (indent, self))
-        for hypo in self.hyponyms():
-            hypo.pp_tree(levels - 1, indent + '  ')
+        for node in preorder(self, max_depth=levels - 1):
+            print("%s%s%s" % (indent, '  ' * node.depth, node.synset))
 
 
 class Pointer(object):
@@ -756,7 +1070,7 @@ class Pointer(object):
         return self.source_target == '0000'
 
     def is_hypernym_or_hyponym(self):
-        return pointer.symbol in ('~', '~i', '@', '@i')
+        return self.symbol in ('~', '~i', '@', '@i')
 
 
 if __name__ == '__main__':